@@ -0,0 +1,96 @@
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+MINUTE_MS = 60 * 1000
+
+
+def compact_timeline(timestamps):
+    """Sorted, de-duplicated int64 array of ms timestamps"""
+    return array('q', sorted(set(int(ts) for ts in timestamps)))
+
+
+class MatchAnalytics:
+    """Live match dynamics updated one kill/death at a time.
+
+    Keeps, per team, a sorted array of kill timestamps (for momentum over a
+    trailing window via bisect; teammates may share a millisecond, so it
+    keeps repeats) and kill counts bucketed by minute; per
+    player, the current kill streak; plus the longest streak and first
+    blood seen so far. Time-based figures only use events that carried a
+    game timestamp; streaks count every kill/death in arrival order.
+    """
+
+    def __init__(self, players=()):
+        self.rebuild(players)
+
+    def rebuild(self, players):
+        """Recompute everything from the players' stored timelines"""
+        self._team_kills = {}
+        self._per_minute = {}
+        self._streaks = {}
+        self._longest = (0, None)
+        self._first_blood = None
+
+        events = []
+        for player in players:
+            events.extend((ts, 1, player) for ts in player.get('killTimestamps', ()))
+            events.extend((ts, 0, player) for ts in player.get('deathTimestamps', ()))
+        # Deaths sort before kills at the same timestamp
+        events.sort(key=lambda e: (e[0], e[1]))
+        for ts, is_kill, player in events:
+            if is_kill:
+                self.record_kill(player, ts)
+            else:
+                self.record_death(player, ts)
+
+    def record_kill(self, player, ts=None):
+        """ts is the kill's timestamp, or None if the event carried none"""
+        pid = player['id']
+        streak = self._streaks.get(pid, 0) + 1
+        self._streaks[pid] = streak
+        if streak > self._longest[0]:
+            self._longest = (streak, pid)
+        if ts is None:
+            return
+        team = player.get('teamId')
+        insort(self._team_kills.setdefault(team, array('q')), ts)
+        self._per_minute.setdefault(team, Counter())[ts // MINUTE_MS] += 1
+        if self._first_blood is None or ts < self._first_blood[0]:
+            self._first_blood = (ts, pid)
+
+    def record_death(self, player, ts=None):
+        self._streaks[player['id']] = 0
+
+    def kills_per_minute(self, teams=(1, 2)):
+        """{'minutes': [0..m], 'team1': [...], ...} aligned per minute bucket"""
+        last = max((max(c) for c in self._per_minute.values() if c), default=-1)
+        minutes = list(range(last + 1))
+        result = {'minutes': minutes}
+        for team in teams:
+            counts = self._per_minute.get(team, Counter())
+            result[f"team{team}"] = [counts.get(m, 0) for m in minutes]
+        return result
+
+    def momentum(self, window_ms, teams=(1, 2)):
+        """Kills per team in the window_ms before the latest timed kill"""
+        as_of = max((k[-1] for k in self._team_kills.values() if k), default=None)
+        result = {'windowSec': window_ms / 1000, 'asOf': as_of}
+        for team in teams:
+            kills = self._team_kills.get(team, ())
+            result[f"team{team}"] = len(kills) - bisect_left(kills, as_of - window_ms) if as_of is not None else 0
+        return result
+
+    def current_streaks(self, limit=5):
+        """[(player_id, streak)] for the players on the longest live streaks"""
+        live = [(pid, n) for pid, n in self._streaks.items() if n > 0]
+        live.sort(key=lambda item: -item[1])
+        return live[:limit]
+
+    def longest_streak(self):
+        """(length, player_id) of the best streak this match"""
+        return self._longest
+
+    def first_blood(self):
+        """(timestamp, player_id) of the earliest timed kill, or None"""
+        return self._first_blood
@@ -0,0 +1,100 @@
+import os
+import re
+import threading
+
+from game_state import GameState
+
+ARENA_ID = re.compile(r'^[A-Za-z0-9_-]{1,32}$')
+
+
+class Arena:
+    """One independent match shard.
+
+    Owns its own GameState (and with it its own stats file, event log,
+    lock and compactor) plus the per-match bits that used to be module
+    globals in server.py. Events in one arena never take another arena's
+    lock or wait behind another arena's fsync.
+    """
+
+    def __init__(self, arena_id, stats_file, log_file, legacy_file=None):
+        self.id = arena_id
+        self.room = f"arena:{arena_id}"
+        self.state = GameState(stats_file, log_file, legacy_file=legacy_file)
+        self.match_state = {
+            'ended': False,
+            'victory_data': None,
+            'report': None,  # pre-serialized post-match report, see match_report.py
+            'report_error': None  # why the report for the current victory_data could not be built
+        }
+        self.match_listeners = []
+
+    def update_match(self, **changes):
+        """Change match_state and call each fn(arena) in match_listeners; caller holds the state lock"""
+        self.match_state.update(changes)
+        for fn in self.match_listeners:
+            fn(self)
+
+
+class ArenaRegistry:
+    """Arenas by id; the default one uses the legacy top-level files.
+
+    Other arenas keep their files under ``root/<arena_id>/`` and are
+    re-opened at startup, so an arena created once survives restarts.
+    ``on_create(arena)`` runs once per arena, before it is visible to
+    requests, to attach caches, broadcasters and the like.
+    """
+
+    def __init__(self, root, default_id, stats_file, log_file, legacy_file=None, on_create=None):
+        self.root = root
+        self.default_id = default_id
+        self.on_create = on_create
+        self._lock = threading.Lock()
+        self._arenas = {}
+        self._open(default_id, stats_file, log_file, legacy_file)
+        if os.path.isdir(root):
+            for arena_id in sorted(os.listdir(root)):
+                if ARENA_ID.match(arena_id) and arena_id not in self._arenas:
+                    self._open(arena_id, *self._files(arena_id))
+
+    def _files(self, arena_id):
+        directory = os.path.join(self.root, arena_id)
+        return (
+            os.path.join(directory, 'game_stats.snap'),
+            os.path.join(directory, 'game_events.log'),
+            os.path.join(directory, 'game_stats.json')
+        )
+
+    def _open(self, arena_id, stats_file, log_file, legacy_file=None):
+        arena = Arena(arena_id, stats_file, log_file, legacy_file)
+        if self.on_create:
+            self.on_create(arena)
+        arena.state.start()
+        self._arenas[arena_id] = arena
+        return arena
+
+    @property
+    def default(self):
+        return self._arenas[self.default_id]
+
+    def get(self, arena_id):
+        """The arena, or None if no such arena exists"""
+        return self._arenas.get(arena_id)
+
+    def create(self, arena_id):
+        """Returns (arena, created); raises ValueError for a malformed id"""
+        if not isinstance(arena_id, str) or not ARENA_ID.match(arena_id):
+            raise ValueError('Arena id must be 1-32 letters, digits, "-" or "_"')
+        with self._lock:
+            arena = self._arenas.get(arena_id)
+            if arena is not None:
+                return arena, False
+            files = self._files(arena_id)
+            os.makedirs(os.path.dirname(files[0]), exist_ok=True)
+            return self._open(arena_id, *files), True
+
+    def all(self):
+        return list(self._arenas.values())
+
+    def stop(self):
+        for arena in self.all():
+            arena.state.stop()
@@ -0,0 +1,282 @@
+"""Load generator and benchmark for the scoring API.
+
+Generates a synthetic match, drives it against the Flask app with N
+concurrent clients and reports throughput, latency percentiles and lost
+updates (final kills/deaths vs. acknowledged events) as JSON.
+
+    python benchmark.py --players 40 --events 20000 --concurrency 16
+    python benchmark.py --mode batch --batch-size 50 --output run.json
+    python benchmark.py --url http://localhost:5000 --baseline run.json
+
+Without --url the app runs in-process (Flask test client) inside a
+temporary directory. With --url the target server is RESET and gets
+BENCHxxxx players registered, so only point it at a scratch server.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+STATS_FILE = 'game_stats.json'
+
+
+def load_gap_profile(path=STATS_FILE):
+    """Inter-event gaps (ms) observed in a recorded match, or None"""
+    try:
+        with open(path, 'r') as f:
+            players = json.load(f).get('players', [])
+    except (OSError, ValueError):
+        return None
+    timestamps = sorted(
+        ts for p in players for ts in p.get('killTimestamps', []) + p.get('deathTimestamps', [])
+    )
+    gaps = [b - a for a, b in zip(timestamps, timestamps[1:])]
+    return gaps or None
+
+
+def generate_match(players, events, seed=1, gap_profile=None, burst_prob=0.2, max_burst=6):
+    """(roster, timeline) for a synthetic match.
+
+    Hits arrive with gaps sampled from ``gap_profile`` (exponential if None);
+    with probability ``burst_prob`` a hit is a burst of up to ``max_burst``
+    hits at the same timestamp, like the repeated timestamps in recorded
+    matches. Every hit is a kill for the shooter and a death for a victim
+    on the other team.
+    """
+    rng = random.Random(seed)
+    roster = [
+        {'rfid': f"BENCH{i:04d}", 'name': f"Bench {i}", 'team': 'team1' if i % 2 == 0 else 'team2'}
+        for i in range(players)
+    ]
+    by_team = {
+        'team1': [p['rfid'] for p in roster if p['team'] == 'team1'],
+        'team2': [p['rfid'] for p in roster if p['team'] == 'team2'],
+    }
+    other = {'team1': 'team2', 'team2': 'team1'}
+
+    timeline = []
+    t = 0
+    while len(timeline) < events:
+        t += rng.choice(gap_profile) if gap_profile else int(rng.expovariate(1 / 800))
+        burst = rng.randint(2, max_burst) if rng.random() < burst_prob else 1
+        for _ in range(burst):
+            shooter = rng.choice(roster)
+            victim = rng.choice(by_team[other[shooter['team']]])
+            timeline.append({'type': 'kill', 'rfid': shooter['rfid'], 'timestamp': t})
+            timeline.append({'type': 'death', 'rfid': victim, 'timestamp': t})
+    return roster, timeline[:events]
+
+
+class HttpTarget:
+    """Talks to a running server; one keep-alive session per worker thread"""
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        self._local = threading.local()
+
+    def request(self, method, path, payload=None):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        response = session.request(method, f"{self.url}{path}", json=payload, timeout=30)
+        return response.status_code, response.json()
+
+
+class InProcessTarget:
+    """Runs server.py in this process against scratch files in a temp dir"""
+
+    def __init__(self):
+        self.workdir = tempfile.mkdtemp(prefix='blaze-bench-')
+        backend_dir = os.path.dirname(os.path.abspath(__file__))
+        sys.path.insert(0, backend_dir)
+        os.chdir(self.workdir)
+        # Keep the server's logging out of the report
+        os.environ.setdefault('BLAZE_LOG_LEVEL', 'WARNING')
+        import server
+        self.server = server
+        self.app = server.app
+        self._local = threading.local()
+
+    def close(self):
+        self.server.arenas.stop()
+
+    def request(self, method, path, payload=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=payload)
+        return response.status_code, response.get_json()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_benchmark(target, roster, timeline, concurrency, mode='single', batch_size=50):
+    """Drive the timeline against target; returns the metrics dict"""
+    target.request('POST', '/api/reset')
+    status, _ = target.request('POST', '/api/register_bulk', {'players': roster})
+    if status != 200:
+        raise RuntimeError(f"Registering benchmark players failed ({status})")
+
+    if mode == 'batch':
+        units = [timeline[i:i + batch_size] for i in range(0, len(timeline), batch_size)]
+    else:
+        units = [[event] for event in timeline]
+
+    latencies = []
+    acked = Counter()
+    errors = 0
+    lock = threading.Lock()
+
+    def send(unit):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            if mode == 'batch':
+                status, body = target.request('POST', '/api/events', {'events': unit})
+                ok = [e for e, r in zip(unit, body['results']) if r['success']] if status == 200 else []
+            else:
+                event = unit[0]
+                status, _ = target.request('POST', f"/api/{event['type']}", {
+                    'rfid': event['rfid'], 'timestamp': event['timestamp']
+                })
+                ok = unit if status == 200 else []
+        except Exception:
+            status, ok = None, []
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if status != 200 or len(ok) != len(unit):
+                errors += 1
+            for event in ok:
+                acked[(event['rfid'], event['type'])] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, units))
+    duration = time.perf_counter() - started
+
+    # Lost updates: acknowledged events that are missing from the final totals
+    _, board = target.request('GET', '/api/players')
+    final = {p['rfid']: p for p in board['team1'] + board['team2']}
+    lost = extra = 0
+    for player in roster:
+        row = final.get(player['rfid'], {'kills': 0, 'deaths': 0})
+        for kind, field in (('kill', 'kills'), ('death', 'deaths')):
+            diff = acked[(player['rfid'], kind)] - row[field]
+            lost += max(diff, 0)
+            extra += max(-diff, 0)
+
+    latencies.sort()
+
+    def ms(seconds):
+        return round(seconds * 1000, 3)
+
+    return {
+        'requests': len(units),
+        'events': len(timeline),
+        'errors': errors,
+        'durationSec': round(duration, 3),
+        'requestsPerSec': round(len(units) / duration, 1) if duration else 0.0,
+        'eventsPerSec': round(len(timeline) / duration, 1) if duration else 0.0,
+        'latencyMs': {
+            'mean': ms(sum(latencies) / len(latencies)) if latencies else 0.0,
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+            'max': ms(latencies[-1]) if latencies else 0.0,
+        },
+        'lostUpdates': lost,
+        'extraUpdates': extra,
+    }
+
+
+def compare(result, baseline):
+    """Print relative change of the headline metrics against a previous run"""
+    rows = [
+        ('eventsPerSec', result['eventsPerSec'], baseline['eventsPerSec']),
+        ('p50 ms', result['latencyMs']['p50'], baseline['latencyMs']['p50']),
+        ('p99 ms', result['latencyMs']['p99'], baseline['latencyMs']['p99']),
+        ('lostUpdates', result['lostUpdates'], baseline['lostUpdates']),
+    ]
+    print("\n📈 Compared with baseline:", file=sys.stderr)
+    for name, now, before in rows:
+        change = f"{(now - before) / before * 100:+.1f}%" if before else 'n/a'
+        print(f"  {name:<13} {before:>10} -> {now:<10} ({change})", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='benchmark a running server instead of the in-process app')
+    parser.add_argument('--players', type=int, default=16)
+    parser.add_argument('--events', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--mode', choices=['single', 'batch'], default='single',
+                        help='single: one /api/kill|death per event; batch: /api/events')
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--burst-prob', type=float, default=0.2)
+    parser.add_argument('--profile', default=STATS_FILE, help='recorded match to take hit gaps from')
+    parser.add_argument('--output', help='write the JSON result here as well as stdout')
+    parser.add_argument('--baseline', help='previous JSON result to compare against')
+    args = parser.parse_args(argv)
+
+    if args.players < 2:
+        parser.error('--players must be at least 2')
+    # The in-process target chdirs into a temp dir; resolve user paths first
+    output_path = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    gaps = load_gap_profile(args.profile)
+    roster, timeline = generate_match(args.players, args.events, args.seed, gaps, args.burst_prob)
+    target = HttpTarget(args.url) if args.url else InProcessTarget()
+
+    print(f"🔥 Benchmarking {len(timeline)} events, {args.players} players, "
+          f"concurrency {args.concurrency} ({args.mode})", file=sys.stderr)
+    metrics = run_benchmark(target, roster, timeline, args.concurrency, args.mode, args.batch_size)
+    if not args.url:
+        target.close()
+
+    result = {
+        'benchmark': 'scoring-api',
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'target': args.url or 'in-process',
+        'config': {
+            'players': args.players,
+            'events': args.events,
+            'concurrency': args.concurrency,
+            'mode': args.mode,
+            'batchSize': args.batch_size if args.mode == 'batch' else 1,
+            'seed': args.seed,
+            'burstProb': args.burst_prob,
+            'gapProfile': args.profile if gaps else 'exponential',
+        },
+        **metrics,
+    }
+
+    output = json.dumps(result, indent=2)
+    print(output)
+    if output_path:
+        with open(output_path, 'w') as f:
+            f.write(output + '\n')
+    if baseline_path:
+        with open(baseline_path, 'r') as f:
+            compare(result, json.load(f))
+    return 1 if result['lostUpdates'] or result['extraUpdates'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
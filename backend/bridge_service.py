@@ -1,59 +1,170 @@
-import requests
+import json
+import os
 import time
-from pymongo import MongoClient
 
-# Connect to MongoDB to watch for new registrations
-client = MongoClient('mongodb://localhost:27017/')
-db = client['lasertag']
-registered_collection = db['registered']
+import requests
+from requests.adapters import HTTPAdapter
+from pymongo import MongoClient
+from pymongo.errors import OperationFailure, PyMongoError
 
 API_URL = 'http://localhost:5000'
+CHECKPOINT_FILE = 'bridge_checkpoint.json'
+POLL_INTERVAL = 2
+
+
+def game_roster(game):
+    """{rfid: {'name', 'team'}} for every player in a Mongo game document"""
+    roster = {}
+    for team, key in (('team1', 'team_one'), ('team2', 'team_two')):
+        for i, player in enumerate(game.get(key, [])):
+            # Fallback ids must be stable so re-reading the same game diffs to nothing
+            rfid = player.get('rollNumber', player.get('roll', f"G{game['game_no']}{team}P{i}"))
+            roster[str(rfid)] = {'name': player.get('name', 'Unknown'), 'team': team}
+    return roster
+
+
+def diff_rosters(pushed, current):
+    """(players to register or update, rfids to remove) to go from pushed to current"""
+    upserts = [
+        {'rfid': rfid, 'name': p['name'], 'team': p['team']}
+        for rfid, p in current.items()
+        if pushed.get(rfid) != p
+    ]
+    removals = [rfid for rfid in pushed if rfid not in current]
+    return upserts, removals
+
+
+class Bridge:
+    """Mirrors the Mongo `registered` collection into the leaderboard.
+
+    Changes are tailed with a change stream when Mongo runs as a replica
+    set, otherwise with a resumable cursor over game_no. Each game document
+    is diffed against the roster already pushed for it, and only the
+    difference is sent, as one /api/register_bulk call over a keep-alive
+    session. The last game, its pushed roster and the change stream resume
+    token are checkpointed to disk after every successful push, so a restart
+    neither re-registers nor skips games. Without a checkpoint only the
+    newest game is registered; older ones are history, not the live roster.
+
+    ``collection`` only needs ``find(filter).sort(key, direction).limit(n)``
+    and optionally ``watch(...)``, so an in-process fake works in place of
+    Mongo.
+    """
 
-last_game_no = 0
+    def __init__(self, collection, api_url=API_URL, checkpoint_file=CHECKPOINT_FILE, session=None):
+        self.collection = collection
+        self.api_url = api_url
+        self.checkpoint_file = checkpoint_file
+        self.session = session or self._make_session()
+        self.game_no = None  # None until a game has been pushed
+        self.pushed = {}
+        self.resume_token = None
+        self.load_checkpoint()
 
-print("🌉 Bridge service started - watching for new games...")
+    @staticmethod
+    def _make_session():
+        session = requests.Session()
+        session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=3))
+        return session
 
-while True:
-    try:
-        # Get latest game
-        latest = registered_collection.find_one(sort=[('game_no', -1)])
-        
-        if latest and latest['game_no'] > last_game_no:
-            game_no = latest['game_no']
-            team_one = latest['team_one']
-            team_two = latest['team_two']
-            
+    def load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_file):
+            return
+        with open(self.checkpoint_file, 'r') as f:
+            data = json.load(f)
+        self.game_no = data.get('game_no', 0)
+        self.pushed = data.get('pushed', {})
+        self.resume_token = data.get('resume_token')
+        print(f"📍 Resuming from Game #{self.game_no} ({len(self.pushed)} players pushed)")
+
+    def save_checkpoint(self):
+        tmp_path = f"{self.checkpoint_file}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'game_no': self.game_no, 'pushed': self.pushed, 'resume_token': self.resume_token}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_file)
+
+    def sync_game(self, game):
+        """Push whatever changed in one game document; returns True if the checkpoint moved"""
+        game_no = game.get('game_no', 0)
+        if self.game_no is not None and game_no < self.game_no:
+            return False
+
+        is_new = game_no != self.game_no
+        current = game_roster(game)
+        upserts, removals = diff_rosters({} if is_new else self.pushed, current)
+        if not (is_new or upserts or removals):
+            return False
+
+        if is_new:
             print(f"\n🎮 New game detected: Game #{game_no}")
-            
-            # Register team 1 players
-            for player in team_one:
-                rfid = player.get('rollNumber', player.get('roll', f"P{time.time()}"))
-                name = player.get('name', 'Unknown')
-                
-                requests.post(f'{API_URL}/api/register', json={
-                    'rfid': rfid,
-                    'name': name,
-                    'team': 'team1'
-                })
-                print(f"  ✓ Registered {name} to Team Hearts")
-            
-            # Register team 2 players
-            for player in team_two:
-                rfid = player.get('rollNumber', player.get('roll', f"P{time.time()}"))
-                name = player.get('name', 'Unknown')
-                
-                requests.post(f'{API_URL}/api/register', json={
-                    'rfid': rfid,
-                    'name': name,
-                    'team': 'team2'
-                })
-                print(f"  ✓ Registered {name} to Team Spades")
-            
-            last_game_no = game_no
-            print(f"✅ Game #{game_no} registered to leaderboard!\n")
-        
-        time.sleep(2)
-        
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        time.sleep(5)
+        if upserts or removals:
+            response = self.session.post(f'{self.api_url}/api/register_bulk', json={
+                'players': upserts,
+                'remove': removals
+            }, timeout=10)
+            response.raise_for_status()
+            print(f"✅ Game #{game_no}: {len(upserts)} registered/updated, {len(removals)} removed")
+
+        self.game_no = game_no
+        self.pushed = current
+        self.save_checkpoint()
+        return True
+
+    def poll_once(self):
+        """Sync the current game (to catch edits) and any newer ones"""
+        if self.game_no is None:
+            # First start: the newest game is the one being played
+            games = self.collection.find({}).sort('game_no', -1).limit(1)
+        else:
+            games = self.collection.find({'game_no': {'$gte': self.game_no}}).sort('game_no', 1)
+        for game in games:
+            self.sync_game(game)
+
+    def watch(self):
+        """Follow the change stream until it fails; raises OperationFailure if unsupported"""
+        with self.collection.watch(full_document='updateLookup', resume_after=self.resume_token) as stream:
+            print("👀 Tailing change stream")
+            # Catch anything that changed between the last poll and opening the stream
+            self.poll_once()
+            for change in stream:
+                game = change.get('fullDocument')
+                if game:
+                    self.sync_game(game)
+                self.resume_token = stream.resume_token
+                self.save_checkpoint()
+
+    def run(self):
+        print("🌉 Bridge service started - watching for new games...")
+        use_change_stream = True
+        while True:
+            try:
+                self.poll_once()
+                if use_change_stream:
+                    self.watch()
+                else:
+                    time.sleep(POLL_INTERVAL)
+            except OperationFailure as e:
+                if self.resume_token is not None:
+                    # Token fell off the oplog; the game_no cursor covers the gap
+                    print(f"⚠️ Cannot resume change stream ({e}); starting a fresh one")
+                    self.resume_token = None
+                    continue
+                # Standalone servers have no change streams; poll the game_no cursor instead
+                print(f"⚠️ Change stream unavailable ({e}); polling every {POLL_INTERVAL}s")
+                use_change_stream = False
+            except (PyMongoError, requests.RequestException) as e:
+                print(f"❌ Error: {e}")
+                time.sleep(5)
+
+
+def main():
+    # Connect to MongoDB to watch for new registrations
+    client = MongoClient('mongodb://localhost:27017/')
+    db = client['lasertag']
+    Bridge(db['registered']).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+from metrics import REGISTRY, STORAGE_SECONDS
+
+log = logging.getLogger('blaze.event_log')
+
+_fsync = os.fsync
+
+
+def fsync(fd):
+    """os.fsync, or whatever set_fsync() installed"""
+    _fsync(fd)
+
+
+def set_fsync(fn):
+    """Swap the fsync used for durability (serve.py moves it off the eventlet hub)"""
+    global _fsync
+    _fsync = fn
+
+COMMIT_BATCH_SIZE = REGISTRY.histogram(
+    'blaze_event_log_commit_batch_size', 'Events written per group commit (one fsync each)',
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+)
+
+
+def _trim_torn_tail(path):
+    """Cut a partial last line left by a crash so new records start cleanly"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+
+
+class EventLog:
+    """Append-only JSON-lines log of state mutations with group commit.
+
+    ``append()`` only queues the encoded line and hands back a sequence
+    number; a committer thread writes everything queued so far with a single
+    write + fsync and then wakes every waiter in ``wait_durable()``. Under
+    load many events share one fsync, so an event costs O(1) disk work and is
+    never acknowledged before it is on disk.
+
+    ``request_rotation()`` marks the last appended record as the end of the
+    current segment; the committer writes up to it, moves the segment aside
+    (``<path>.1``) and carries on in a fresh file, and ``wait_rotated()``
+    returns once that is done. Only the cheap marking needs appends held
+    still, so a snapshot can be cut under the state lock and the fsyncs wait
+    outside it. Once the snapshot is durable the rotated segment is dropped
+    with ``discard_rotated()``.
+    """
+
+    def __init__(self, path, last_seq=0):
+        self.path = path
+        self.rotated_path = f"{path}.1"
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._pending = []  # (seq, encoded line)
+        self._rotate_after = None  # seq that ends the current segment, while a rotation is pending
+        self._last_seq = last_seq
+        self._durable_seq = last_seq
+        self._error = None
+        self._closed = False
+        _trim_torn_tail(path)
+        self._file = open(path, 'ab')
+        self._committer = threading.Thread(target=self._commit_loop, name='event-log-committer', daemon=True)
+        self._committer.start()
+
+    @property
+    def last_seq(self):
+        return self._last_seq
+
+    def append(self, event):
+        """Queue one event; returns its sequence number"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('event log is closed')
+            self._last_seq += 1
+            record = dict(event, seq=self._last_seq)
+            self._pending.append((self._last_seq, json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n'))
+            self._cond.notify_all()
+            return self._last_seq
+
+    def wait_durable(self, seq):
+        """Block until the event with this sequence number has been fsynced"""
+        with self._cond:
+            while self._durable_seq < seq:
+                if self._error is not None:
+                    raise IOError(f"event log write failed: {self._error}")
+                self._cond.wait()
+
+    def _commit_batch(self):
+        """Write + fsync everything queued so far, switching segments if asked; caller holds ``_io_lock``"""
+        with self._cond:
+            batch, self._pending = self._pending, []
+            upto = self._last_seq
+            cut = self._rotate_after
+        try:
+            if cut is None:
+                self._write([line for _, line in batch])
+            else:
+                self._write([line for seq, line in batch if seq <= cut])
+                self._switch_segment()
+                self._write([line for seq, line in batch if seq > cut])
+        except Exception as e:
+            with self._cond:
+                self._error = e
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._durable_seq = upto
+            if cut is not None:
+                self._rotate_after = None
+            self._cond.notify_all()
+
+    def _write(self, lines):
+        if not lines:
+            return
+        start = time.perf_counter()
+        self._file.write(b''.join(lines))
+        self._file.flush()
+        fsync(self._file.fileno())
+        STORAGE_SECONDS.observe(time.perf_counter() - start, operation='log_commit')
+        COMMIT_BATCH_SIZE.observe(len(lines))
+
+    def _switch_segment(self):
+        """Move the written segment to ``rotated_path`` and open a fresh one"""
+        self._file.close()
+        if os.path.exists(self.rotated_path):
+            # A previous snapshot never completed - keep both segments
+            with open(self.path, 'rb') as src, open(self.rotated_path, 'ab') as dst:
+                shutil.copyfileobj(src, dst)
+                dst.flush()
+                fsync(dst.fileno())
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self.rotated_path)
+        self._file = open(self.path, 'ab')
+
+    def _commit_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and self._rotate_after is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+            with self._io_lock:
+                try:
+                    self._commit_batch()
+                except Exception as e:
+                    log.error(f"❌ Error writing event log: {e}")
+                    return
+
+    def request_rotation(self):
+        """End the current segment after the last appended record; returns its seq.
+
+        Call with appends held still (e.g. under the state lock), then
+        ``wait_rotated()`` without it.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('event log is closed')
+            self._rotate_after = self._last_seq
+            self._cond.notify_all()
+            return self._last_seq
+
+    def wait_rotated(self):
+        """Block until the requested rotation is done; raises IOError if the log failed"""
+        with self._cond:
+            while self._rotate_after is not None:
+                if self._error is not None:
+                    raise IOError(f"event log write failed: {self._error}")
+                self._cond.wait()
+
+    def discard_rotated(self):
+        """Drop the rotated segment once a snapshot covering it is on disk"""
+        try:
+            os.remove(self.rotated_path)
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        with self._io_lock:
+            if self._error is None:
+                self._commit_batch()
+            with self._cond:
+                self._closed = True
+                self._cond.notify_all()
+            self._file.close()
+        self._committer.join(timeout=5)
+
+    @staticmethod
+    def replay(path, after_seq=0):
+        """Yield logged events with seq > after_seq from the rotated and live segments"""
+        for segment in (f"{path}.1", path):
+            if not os.path.exists(segment):
+                continue
+            with open(segment, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # Torn tail from a crash mid-write; it was never acknowledged
+                        log.warning(f"⚠️ Ignoring incomplete record at end of {segment}")
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        log.warning(f"⚠️ Skipping corrupt record in {segment}")
+                        continue
+                    if record.get('seq', 0) > after_seq:
+                        yield record
@@ -0,0 +1,198 @@
+import json
+import os
+import queue
+import re
+import threading
+from concurrent.futures import Future
+
+from event_log import fsync
+
+EMAIL_PATTERN = re.compile(r'^[^\s@]+@[^\s@]+\.[^\s@]+$')
+MOBILE_PATTERN = re.compile(r'^[0-9]{10}$')
+
+
+class DuplicateContact(ValueError):
+    """Raised when an email or mobile number is already registered"""
+
+
+class BlockIdAllocator:
+    """Race-free external player ids handed out from leased blocks.
+
+    The counter file records the highest id ever leased. Taking a block of
+    ``block_size`` ids costs one atomic rewrite of that file; ids inside the
+    block then come from memory under a lock. After a restart the unused
+    rest of the last block is skipped, so ids can have gaps but are never
+    handed out twice.
+    """
+
+    def __init__(self, path, block_size=100, prefix='EXT'):
+        self.path = path
+        self.block_size = block_size
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._leased = self._read_counter()
+        self._next = self._leased + 1
+
+    def _read_counter(self):
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, 'r') as f:
+            return int(json.load(f).get('counter', 0))
+
+    def _lease_block(self):
+        leased = self._leased + self.block_size
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'counter': leased}, f)
+            f.flush()
+            fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._leased = leased
+
+    def advance_past(self, value):
+        """Never hand out an id numbered value or lower (e.g. ids a former primary used)"""
+        with self._lock:
+            if value >= self._next:
+                self._leased = max(self._leased, value)
+                self._lease_block()
+                self._next = value + 1
+
+    def next_id(self):
+        with self._lock:
+            if self._next > self._leased:
+                self._lease_block()
+            value = self._next
+            self._next += 1
+        return f"{self.prefix}{value:04d}"
+
+
+class RegistrationBatcher:
+    """Applies queued events to a GameState with one submit_batch per drain.
+
+    Callers block in ``submit()`` until their event is applied and durable.
+    A single worker takes everything queued so far (up to ``max_batch``),
+    so a signup rush costs one lock acquisition and one durability wait per
+    batch instead of per registration.
+    """
+
+    def __init__(self, state, max_batch=256):
+        self.state = state
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='registration-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, event, timeout=30):
+        future = Future()
+        self._queue.put((event, future))
+        return future.result(timeout)
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.max_batch:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                outcomes = self.state.submit_batch([event for event, _ in items])
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            for (_, future), outcome in zip(items, outcomes):
+                if isinstance(outcome, Exception):
+                    future.set_exception(outcome)
+                else:
+                    future.set_result(outcome)
+
+
+class ExternalRegistry:
+    """External signups of one arena, indexed by email and mobile.
+
+    ``register()`` claims the email and mobile in the unique index before
+    the player exists, so two concurrent signups with the same contact
+    cannot both succeed, then allocates an id and applies the register
+    event through the batcher. The index follows the roster through a
+    GameState listener (removals free the contact details again) and is
+    what ``candidates()`` is served from.
+    """
+
+    def __init__(self, state, allocator, batcher=None):
+        self.state = state
+        self.allocator = allocator
+        self.batcher = batcher or RegistrationBatcher(state)
+        self._lock = threading.Lock()
+        self._emails = {}
+        self._mobiles = {}
+        self._candidates = {}
+        with state.lock:
+            for player in state.players():
+                if player.get('external'):
+                    self._add(player)
+            state.add_listener(self.on_event)
+
+    @staticmethod
+    def normalize(email, mobile):
+        return str(email).strip().lower(), re.sub(r'\D', '', str(mobile))
+
+    def _add(self, player):
+        email, mobile = self.normalize(player.get('email', ''), player.get('mobile', ''))
+        self._emails[email] = player['id']
+        self._mobiles[mobile] = player['id']
+        self._candidates[player['id']] = player
+
+    def _discard(self, player_id, email, mobile):
+        if self._emails.get(email) == player_id:
+            del self._emails[email]
+        if self._mobiles.get(mobile) == player_id:
+            del self._mobiles[mobile]
+        self._candidates.pop(player_id, None)
+
+    def on_event(self, event, result):
+        """GameState listener; called with the state lock held"""
+        op = event['op']
+        with self._lock:
+            if op == 'register' and event.get('external'):
+                # Also indexes signups that did not come through register(), e.g. replicated ones
+                self._add(result[0])
+            elif op == 'remove' and event['id'] in self._candidates:
+                self._discard(event['id'], *self.normalize(result.get('email', ''), result.get('mobile', '')))
+            elif op == 'clear_team':
+                for player_id, player in list(self._candidates.items()):
+                    if self.state.find_player(player_id) is None:
+                        self._discard(player_id, *self.normalize(player.get('email', ''), player.get('mobile', '')))
+
+    def register(self, name, email, mobile, team_id, college=''):
+        """Returns the new player id; raises DuplicateContact or ValueError"""
+        if not EMAIL_PATTERN.match(str(email).strip()):
+            raise ValueError('Invalid email')
+        email, mobile = self.normalize(email, mobile)
+        if not MOBILE_PATTERN.match(mobile):
+            raise ValueError('Invalid mobile number')
+
+        with self._lock:
+            if email in self._emails:
+                raise DuplicateContact('Email already registered')
+            if mobile in self._mobiles:
+                raise DuplicateContact('Mobile number already registered')
+            player_id = self.allocator.next_id()
+            self._emails[email] = player_id
+            self._mobiles[mobile] = player_id
+
+        try:
+            self.batcher.submit({
+                'op': 'register', 'id': player_id, 'name': name, 'teamId': team_id,
+                'external': True, 'email': email, 'mobile': mobile, 'college': college or 'External'
+            })
+        except Exception:
+            with self._lock:
+                self._discard(player_id, email, mobile)
+            raise
+        return player_id
+
+    def candidates(self):
+        """Externally registered players in signup order"""
+        with self._lock:
+            return list(self._candidates.values())
@@ -0,0 +1,120 @@
+"""Local stand-in for the vests: sends hit records to hit_gateway.py.
+
+    python fake_vests.py --register --hits 5000 --duplicates 0.2 --verify
+    python fake_vests.py --tcp --rate 200
+
+Shots are random shooter/victim pairs from opposite teams of the roster in
+a match file. With probability --duplicates a record is sent again (as a
+retransmit with the same sequence, or as a second receiver reporting the
+same shot), which the gateway must not count twice. --verify compares the
+kills on the leaderboard before and after with the number of unique hits.
+"""
+import argparse
+import json
+import random
+import socket
+import time
+
+import requests
+
+from hit_gateway import API_URL, DEFAULT_PORT, FLAG_RETRANSMIT, encode_hit
+
+
+def load_roster(path):
+    with open(path, 'r') as f:
+        players = json.load(f)['players']
+    return {team: [p['id'] for p in players if p.get('teamId') == team] for team in (1, 2)}
+
+
+def total_kills(api_url, arena=None):
+    prefix = f"{api_url}/api/arenas/{arena}" if arena else f"{api_url}/api"
+    board = requests.get(f"{prefix}/players", timeout=5).json()
+    return sum(p['kills'] for team in ('team1', 'team2') for p in board[team])
+
+
+class FakeVests:
+    def __init__(self, roster, host='127.0.0.1', port=DEFAULT_PORT, tcp=False):
+        self.roster = roster
+        # Random starting points, so a second run never looks like a replay of the first
+        self.clock_ms = random.getrandbits(40)
+        self.seq = {rfid: random.getrandbits(32) for team in roster.values() for rfid in team}
+        if tcp:
+            self.sock = socket.create_connection((host, port))
+            self.send = self.sock.sendall
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.send = lambda record: self.sock.sendto(record, (host, port))
+
+    def shot(self):
+        """One new hit record between random players of opposite teams"""
+        team = random.choice((1, 2))
+        shooter = random.choice(self.roster[team])
+        victim = random.choice(self.roster[3 - team])
+        self.seq[shooter] = (self.seq[shooter] + 1) % (1 << 32)
+        self.clock_ms += random.randint(1, 50)
+        return shooter, victim, self.clock_ms, self.seq[shooter]
+
+    def run(self, hits, duplicates=0.0, rate=0.0):
+        """Sends hits unique shots plus repeats; returns how many records went out"""
+        sent = 0
+        started = time.perf_counter()
+        for i in range(hits):
+            shooter, victim, timestamp, seq = self.shot()
+            self.send(encode_hit(shooter, victim, timestamp, seq))
+            sent += 1
+            while random.random() < duplicates:
+                flags = FLAG_RETRANSMIT if random.random() < 0.5 else 0
+                self.send(encode_hit(shooter, victim, timestamp, seq, flags))
+                sent += 1
+            if rate:
+                delay = started + (i + 1) / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        return sent
+
+    def close(self):
+        self.sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--roster', default='game_stats.json', help='match file to take players from')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--tcp', action='store_true', help='one TCP stream instead of UDP datagrams')
+    parser.add_argument('--hits', type=int, default=1000)
+    parser.add_argument('--duplicates', type=float, default=0.1, help='chance each record is sent again')
+    parser.add_argument('--rate', type=float, default=0, help='hits per second, 0 for as fast as possible')
+    parser.add_argument('--api-url', default=API_URL)
+    parser.add_argument('--arena')
+    parser.add_argument('--register', action='store_true', help='register the roster first')
+    parser.add_argument('--verify', action='store_true', help='check the leaderboard counted every unique hit once')
+    args = parser.parse_args(argv)
+
+    roster = load_roster(args.roster)
+    prefix = f"{args.api_url}/api/arenas/{args.arena}" if args.arena else f"{args.api_url}/api"
+    if args.register:
+        requests.post(f"{prefix}/register_bulk", json={'players': [
+            {'rfid': rfid, 'name': rfid, 'team': f"team{team}"} for team, ids in roster.items() for rfid in ids
+        ]}, timeout=10).raise_for_status()
+    before = total_kills(args.api_url, args.arena) if args.verify else 0
+
+    vests = FakeVests(roster, args.host, args.port, args.tcp)
+    started = time.perf_counter()
+    sent = vests.run(args.hits, args.duplicates, args.rate)
+    vests.close()
+    print(f"🔫 Sent {args.hits} hits as {sent} records in {time.perf_counter() - started:.2f}s")
+
+    if args.verify:
+        deadline = time.time() + 10
+        while True:
+            counted = total_kills(args.api_url, args.arena) - before
+            if counted >= args.hits or time.time() > deadline:
+                break
+            time.sleep(0.2)
+        icon = '✅' if counted == args.hits else '❌'
+        print(f"{icon} Leaderboard counted {counted} of {args.hits} unique hits")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,469 @@
+import logging
+import os
+import threading
+import time
+import atexit
+from array import array
+from bisect import insort
+from collections import OrderedDict
+
+from analytics import MatchAnalytics
+from event_log import EventLog, fsync
+from metrics import STORAGE_SECONDS
+from ranking import RankingIndex
+from snapshot_format import decode_snapshot, empty_stats, encode_snapshot, export_json, read_legacy_json
+from structured_log import flush_logging
+
+log = logging.getLogger('blaze.state')
+
+
+# Optional registration details a register event may carry (external signups)
+PROFILE_FIELDS = ('external', 'email', 'mobile', 'college')
+# How many recent hit ids are remembered to turn away a repeated hit
+RECENT_HIT_IDS = 65536
+
+
+def load_stats(path, legacy_path=None):
+    """(stats, migrated): the snapshot at path, else a one-time import of legacy_path"""
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            data = decode_snapshot(f.read())
+        log.info(f"📖 Loaded game stats snapshot: {len(data['players'])} players")
+        return data, False
+    if legacy_path and os.path.exists(legacy_path):
+        data = read_legacy_json(legacy_path)
+        log.info(f"📦 Migrating {legacy_path} ({len(data['players'])} players) to {path}")
+        return data, True
+    return empty_stats(), False
+
+
+def write_stats_file(path, payload):
+    """Atomically replace path with payload (bytes): write temp file, fsync, rename"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def stop_process(error):
+    """Exit right away, skipping the final snapshot, so a restart rebuilds state from the log"""
+    flush_logging()
+    os._exit(1)
+
+
+class PlayerNotFound(LookupError):
+    """Raised when an event references an RFID that isn't registered"""
+
+
+class DuplicateHit(ValueError):
+    """Raised when a hit carries a hitId that was already applied"""
+
+
+class GameState:
+    """Authoritative in-memory game stats backed by an event log.
+
+    Every mutation is an event dict (``{'op': 'kill', 'id': 'RFID001'}``)
+    passed to ``submit()``: it is applied in memory under ``lock``, appended
+    to the event log and acknowledged only once the log has fsynced it.
+    Readers take ``lock`` and use ``players()``/``team()``/``find_player()``;
+    nothing on the request path reads or writes the snapshot file.
+
+    The roster is indexed by id (a dict, so insertion order is the persisted
+    ``players`` array order) and by team, which makes lookups, registration
+    and removal O(1) and team views a direct read of the index. ``data``
+    holds the remaining top-level fields (gameIsActive, ...). ``ranking``
+    keeps the kill ranking and team totals (team1Score/team2Score) current
+    on every event and ``analytics`` the live match dynamics. Kill/death
+    timelines are held as sorted ``array('q')``.
+
+    A tag is one ``hit`` event (shooter and victim together), so the two
+    sides can never disagree. A hit may carry a ``hitId`` (the gateway uses
+    the vest's shooter and sequence); one seen among the last
+    ``RECENT_HIT_IDS`` since startup raises DuplicateHit instead of counting
+    again. Each player's ``victims`` ({id: kills}) is
+    persisted with it and mirrored in memory as ``_killed_by``, so both
+    directions of the pair stats (most killed, nemesis) are direct reads.
+
+    ``version`` is the seq of the last event published: it moves (and
+    listeners hear of an event) only once the event is durable, and it
+    continues from the event log seq across restarts. Readers can cache
+    anything derived from the state per version and ``wait_for_change()``
+    lets long-polling clients block until it moves. If the log cannot commit,
+    memory is ahead of what a restart would rebuild, so the state stops:
+    ``on_commit_failure`` runs (by default the process exits) and later
+    submits raise.
+
+    At startup the last snapshot is loaded and the log replayed on top of it.
+    A background thread periodically compacts: it writes a fresh snapshot
+    (tagged with the last event seq it covers) and drops the old log segment.
+    Snapshots use the compact format in snapshot_format.py; when there is no
+    snapshot yet, ``legacy_file`` (a game_stats.json) is imported once and
+    written straight back as a snapshot. ``export()`` gives the readable JSON.
+    """
+
+    def __init__(self, stats_file, log_file, snapshot_interval=5.0, legacy_file=None):
+        self.stats_file = stats_file
+        self.snapshot_interval = snapshot_interval
+        self.lock = threading.RLock()
+        self._changed = threading.Condition(self.lock)
+        load_started = time.perf_counter()
+        self.data, migrated = load_stats(stats_file, legacy_file)
+        self._by_id = {}
+        self._teams = {}
+        for player in self.data.pop('players'):
+            if player.get('id') not in self._by_id:
+                player.setdefault('victims', {})
+                self._index(player)
+        self._rebuild_rivals()
+        self._recent_hits = OrderedDict()
+        # Team scores are derived from the roster, not trusted from the file
+        self.data.pop('team1Score', None)
+        self.data.pop('team2Score', None)
+        self.ranking = RankingIndex(self._by_id.values())
+        self.analytics = MatchAnalytics(self._by_id.values())
+        self._dirty = threading.Event()
+        self._flushing = threading.Lock()
+        self._stopped = threading.Event()
+        self._flusher = None
+        self._listeners = []
+        self._commit_waiters = []
+        self._failed = None
+        # Called once the log fails to commit; the default exits the process (tests swap it)
+        self.on_commit_failure = stop_process
+
+        last_seq = self.data.pop('lastEventSeq', 0)
+        replayed = 0
+        for record in EventLog.replay(log_file, after_seq=last_seq):
+            try:
+                self.apply(record)
+            except PlayerNotFound:
+                pass
+            last_seq = record['seq']
+            replayed += 1
+        if replayed:
+            log.info(f"♻️ Replayed {replayed} events from {log_file}")
+            self._dirty.set()
+        STORAGE_SECONDS.observe(time.perf_counter() - load_started, operation='load')
+        self.log = EventLog(log_file, last_seq=last_seq)
+        self.version = last_seq
+        if migrated:
+            # Write the snapshot now so the legacy file is never parsed again
+            self._dirty.set()
+            self.flush()
+
+    # --- mutations -------------------------------------------------------
+
+    def add_listener(self, fn):
+        """Call fn(event, result) for every submitted event once it is durable.
+
+        Listeners run with the lock held, on the submitting thread, in event
+        seq order. By then the state may already hold later events.
+        """
+        self._listeners.append(fn)
+
+    def submit(self, event):
+        """Apply, log and durably commit one event; returns the apply result"""
+        with self.lock:
+            self._check_usable()
+            result = self.apply(event)
+            seq = self.log.append(event)
+        self._commit(seq, [(event, result)])
+        return result
+
+    def submit_batch(self, events):
+        """Apply and log many events with a single durability wait.
+
+        Returns one entry per event: the apply result, or the exception that
+        rejected it (rejected events are not logged).
+        """
+        results = []
+        applied = []
+        first = 0
+        with self.lock:
+            self._check_usable()
+            for event in events:
+                try:
+                    result = self.apply(event)
+                except (PlayerNotFound, ValueError) as e:
+                    results.append(e)
+                    continue
+                seq = self.log.append(event)
+                first = first or seq
+                applied.append((event, result))
+                results.append(result)
+        if applied:
+            self._commit(first, applied)
+        return results
+
+    def add_commit_waiter(self, fn):
+        """Before acknowledging an event, also wait for fn(seq) (e.g. a standby's ack)"""
+        self._commit_waiters.append(fn)
+
+    def _commit(self, first, applied):
+        """Publish the events logged as first, first + 1, ... once durable, then run the commit waiters"""
+        last = first + len(applied) - 1
+        try:
+            self.log.wait_durable(last)
+        except Exception as e:
+            self._fail(e)
+            raise
+        with self.lock:
+            # Earlier events are durable too; their submitters publish them first
+            self._changed.wait_for(lambda: self.version == first - 1)
+            for event, result in applied:
+                self._bump_version(event, result)
+        for fn in self._commit_waiters:
+            fn(last)
+        self._dirty.set()
+
+    def _bump_version(self, event, result):
+        """Publish one durable event; caller holds the lock"""
+        self.version += 1
+        for fn in self._listeners:
+            fn(event, result)
+        self._changed.notify_all()
+
+    def _check_usable(self):
+        if self._failed is not None:
+            raise IOError(f"game state stopped after a failed commit: {self._failed}")
+
+    def _fail(self, error):
+        """An applied event could not be made durable: memory is ahead of the log for good"""
+        with self.lock:
+            if self._failed is not None:
+                return
+            self._failed = error
+        log.critical(f"💥 Event log commit failed, stopping: {error}")
+        self.on_commit_failure(error)
+
+    def wait_for_change(self, since, timeout):
+        """Block until version != since or timeout; returns the current version"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != since, timeout)
+            return self.version
+
+    def apply(self, event):
+        """Apply an event to memory without logging it (used by submit and replay)"""
+        handler = getattr(self, f"_apply_{event['op']}", None)
+        if handler is None:
+            raise ValueError(f"Unknown event op: {event['op']}")
+        return handler(event)
+
+    def find_player(self, player_id):
+        return self._by_id.get(player_id)
+
+    def players(self):
+        """All players in roster order"""
+        return self._by_id.values()
+
+    def team(self, team_id):
+        """Players of one team in roster order"""
+        return self._teams.get(team_id, {}).values()
+
+    def rivals(self, player_id):
+        """({victim id: kills}, {shooter id: kills}) of one player; caller holds the lock"""
+        player = self._require_player(player_id)
+        return player['victims'], self._killed_by.get(player_id, {})
+
+    def _rebuild_rivals(self):
+        self._killed_by = {}
+        for player in self._by_id.values():
+            for victim_id, kills in player['victims'].items():
+                self._killed_by.setdefault(victim_id, {})[player['id']] = kills
+
+    def _index(self, player):
+        self._by_id[player['id']] = player
+        self._teams.setdefault(player.get('teamId'), {})[player['id']] = player
+
+    def _unindex(self, player):
+        del self._by_id[player['id']]
+        del self._teams[player.get('teamId')][player['id']]
+
+    def _require_player(self, player_id):
+        player = self.find_player(player_id)
+        if player is None:
+            raise PlayerNotFound(player_id)
+        return player
+
+    def _apply_register(self, event):
+        """Returns (player, created)"""
+        player = self.find_player(event['id'])
+        profile = {key: event[key] for key in PROFILE_FIELDS if key in event}
+        if player:
+            player['name'] = event['name']
+            player.update(profile)
+            if player.get('teamId') != event['teamId']:
+                del self._teams[player.get('teamId')][player['id']]
+                player['teamId'] = event['teamId']
+                # Rare: rebuild the team view so it keeps roster order
+                self._teams[event['teamId']] = {
+                    pid: p for pid, p in self._by_id.items() if p.get('teamId') == event['teamId']
+                }
+                self.ranking.update(player)
+            return player, False
+        player = {
+            'id': event['id'],
+            'teamId': event['teamId'],
+            'name': event['name'],
+            'kills': 0,
+            'deaths': 0,
+            'killTimestamps': array('q'),
+            'deathTimestamps': array('q'),
+            'victims': {},
+            **profile
+        }
+        self._index(player)
+        self.ranking.update(player)
+        return player, True
+
+    def _apply_kill(self, event):
+        player = self._require_player(event['id'])
+        self._record_kill(player, event.get('ts'))
+        return player
+
+    def _apply_death(self, event):
+        player = self._require_player(event['id'])
+        self._record_death(player, event.get('ts'))
+        return player
+
+    def _apply_hit(self, event):
+        """Returns (shooter, victim); nothing changes unless both are registered"""
+        shooter = self._require_player(event['shooter'])
+        victim = self._require_player(event['victim'])
+        if shooter is victim:
+            raise ValueError('Shooter and victim must be different players')
+        hit_id = event.get('hitId')
+        if hit_id is not None:
+            if hit_id in self._recent_hits:
+                raise DuplicateHit(f"Duplicate hit: {hit_id}")
+            self._recent_hits[hit_id] = None
+            if len(self._recent_hits) > RECENT_HIT_IDS:
+                self._recent_hits.popitem(last=False)
+        ts = event.get('ts')
+        self._record_kill(shooter, ts)
+        self._record_death(victim, ts)
+        victims = shooter['victims']
+        victims[victim['id']] = victims.get(victim['id'], 0) + 1
+        self._killed_by.setdefault(victim['id'], {})[shooter['id']] = victims[victim['id']]
+        return shooter, victim
+
+    # Every applied kill/death counts; events sharing a millisecond (one
+    # shooter tagging two players at once) all land on the timeline, so
+    # kills == len(killTimestamps) + untimed kills.
+    def _record_kill(self, player, ts):
+        player['kills'] += 1
+        if ts is not None:
+            insort(player['killTimestamps'], ts)
+        self.ranking.update(player)
+        self.analytics.record_kill(player, ts)
+
+    def _record_death(self, player, ts):
+        player['deaths'] += 1
+        if ts is not None:
+            insort(player['deathTimestamps'], ts)
+        self.ranking.update(player)
+        self.analytics.record_death(player, ts)
+
+    def _apply_remove(self, event):
+        player = self._require_player(event['id'])
+        self._unindex(player)
+        self.ranking.remove(player['id'])
+        # Rare; drop the player's kills from the team timelines and pair stats
+        self.analytics.rebuild(self._by_id.values())
+        self._rebuild_rivals()
+        return player
+
+    def _apply_clear_team(self, event):
+        for player_id in self._teams.pop(event['teamId'], {}):
+            del self._by_id[player_id]
+        self.ranking.rebuild(self._by_id.values())
+        self.analytics.rebuild(self._by_id.values())
+        self._rebuild_rivals()
+
+    def _apply_reset(self, event):
+        for player in self._by_id.values():
+            player['kills'] = 0
+            player['deaths'] = 0
+            player['killTimestamps'] = array('q')
+            player['deathTimestamps'] = array('q')
+            player['victims'] = {}
+        self._killed_by = {}
+        self._recent_hits.clear()
+        self.ranking.rebuild(self._by_id.values())
+        self.analytics.rebuild(())
+
+    # --- snapshots / compaction -----------------------------------------
+
+    def start(self):
+        """Start the background compactor (idempotent)"""
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name='stats-compactor', daemon=True)
+            self._flusher.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the compactor, write a final snapshot and close the log"""
+        self._stopped.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+        self.flush()
+        self.log.close()
+
+    def flush(self):
+        """Fold the event log into a fresh snapshot file"""
+        # One at a time: each snapshot must match the segment its rotation cut
+        with self._flushing, STORAGE_SECONDS.time(operation='snapshot'):
+            return self._flush()
+
+    def _flush(self):
+        with self.lock:
+            if not self._dirty.is_set() or self._failed is not None:
+                return False
+            self._dirty.clear()
+            snapshot = self._snapshot()
+            payload = encode_snapshot(snapshot)
+            # Cut the log where the snapshot ends; the committer does the fsyncs
+            self.log.request_rotation()
+        try:
+            self.log.wait_rotated()
+        except Exception as e:
+            self._dirty.set()
+            log.error(f"❌ Error rotating event log: {e}")
+            return False
+        try:
+            write_stats_file(self.stats_file, payload)
+        except Exception as e:
+            # Keep the rotated segment; the next compaction folds it in
+            self._dirty.set()
+            log.error(f"❌ Error saving stats: {e}")
+            return False
+        self.log.discard_rotated()
+        log.info(f"💾 Saved game stats: {len(snapshot['players'])} players (event seq {snapshot['lastEventSeq']})")
+        return True
+
+    def _snapshot(self):
+        """Everything a snapshot holds; caller holds the lock"""
+        return {
+            'players': list(self._by_id.values()),
+            **self.data,
+            'team1Score': self.ranking.team_totals(1)['kills'],
+            'team2Score': self.ranking.team_totals(2)['kills'],
+            'lastEventSeq': self.log.last_seq
+        }
+
+    def export(self):
+        """Current state as human-readable JSON (the legacy game_stats.json layout)"""
+        with self.lock:
+            snapshot = self._snapshot()
+            snapshot['players'] = [
+                dict(p, killTimestamps=p['killTimestamps'].tolist(), deathTimestamps=p['deathTimestamps'].tolist())
+                for p in snapshot['players']
+            ]
+        return export_json(snapshot)
+
+    def _flush_loop(self):
+        while not self._stopped.wait(self.snapshot_interval):
+            if self._dirty.is_set():
+                self.flush()
@@ -0,0 +1,273 @@
+"""Hardware hit ingest: vests report hits over UDP/TCP, the gateway batches them into the API.
+
+    python hit_gateway.py --udp-port 9999 --tcp-port 9999 --window 2.0
+    python fake_vests.py --port 9999 --hits 5000 --duplicates 0.2
+
+Every hit is one fixed-size little-endian record (see HIT):
+
+    magic b'BH', version, flags, sequence (u32), device timestamp in ms (u64),
+    shooter id, victim id (16 bytes each, UTF-8, NUL padded)
+
+A UDP datagram carries one or more records back to back; a TCP connection
+is a stream of them. Nothing is acknowledged: vests send each hit a few
+times with the same sequence (flagged as retransmits) to get it through
+lossy radio, and several receivers may pick up the same shot. A record is
+dropped when its (shooter, sequence) or its (shooter, victim, timestamp)
+was already seen within --window seconds; the window only needs to cover
+how long a vest keeps repeating a hit. Each hit is forwarded with its
+(shooter, sequence) as hitId, so a copy arriving later is still turned
+away by the server; the window bounds memory, not correctness.
+
+Everything else is queued and sent to /api/events as one hit event (the
+shooter's kill and the victim's death, applied together); whatever arrives
+while a POST is in flight goes into the next one, so a burst costs one
+request per batch, not one per hit. A batch the server could not take is
+kept and retried (its repeats were already suppressed, so it is the only
+copy) until it goes through or the gateway is stopped.
+"""
+import argparse
+import asyncio
+import logging
+import signal
+import socket
+import struct
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from structured_log import setup_logging
+
+log = logging.getLogger('blaze.hit_gateway')
+
+API_URL = 'http://localhost:5000'
+DEFAULT_PORT = 9999
+UDP_RECEIVE_BUFFER = 4 << 20  # absorb bursts while a batch is being posted
+RETRY_DELAY = 0.1  # first wait before re-posting a failed batch, doubled up to RETRY_MAX
+RETRY_MAX = 2.0
+
+MAGIC = b'BH'
+VERSION = 1
+FLAG_RETRANSMIT = 1  # informational: a repeat the vest sends for reliability
+HIT = struct.Struct('<2sBBIQ16s16s')
+
+
+def encode_hit(shooter, victim, timestamp, seq, flags=0):
+    return HIT.pack(MAGIC, VERSION, flags, seq, timestamp, shooter.encode('utf-8'), victim.encode('utf-8'))
+
+
+def decode_hits(payload):
+    """Records in payload as dicts; raises ValueError on anything malformed"""
+    if not payload or len(payload) % HIT.size:
+        raise ValueError(f"Payload of {len(payload)} bytes is not a whole number of hits")
+    hits = []
+    for magic, version, flags, seq, timestamp, shooter, victim in HIT.iter_unpack(payload):
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a hit record')
+        shooter = shooter.rstrip(b'\0').decode('utf-8')
+        victim = victim.rstrip(b'\0').decode('utf-8')
+        if not shooter or not victim:
+            raise ValueError('Missing shooter or victim')
+        hits.append({'shooter': shooter, 'victim': victim, 'timestamp': timestamp, 'seq': seq, 'flags': flags})
+    return hits
+
+
+class DedupeWindow:
+    """Keys seen in the last ``window`` seconds.
+
+    Entries live in arrival order, so expiry only ever pops from the front
+    and the cost per hit stays constant however long the gateway runs.
+    """
+
+    def __init__(self, window=2.0, clock=time.monotonic):
+        self.window = window
+        self.clock = clock
+        self._seen = OrderedDict()
+
+    def __len__(self):
+        return len(self._seen)
+
+    def check(self, *keys):
+        """True (and remembers keys) if none of them was seen within the window"""
+        now = self.clock()
+        while self._seen:
+            key, seen_at = next(iter(self._seen.items()))
+            if now - seen_at < self.window:
+                break
+            del self._seen[key]
+        if any(key in self._seen for key in keys):
+            return False
+        for key in keys:
+            self._seen[key] = now
+        return True
+
+
+class HitGateway:
+    """Receives hit records, drops repeats and forwards the rest in batches"""
+
+    def __init__(self, api_url=API_URL, arena=None, window=2.0, max_batch=512):
+        self.events_url = f"{api_url}/api/arenas/{arena}/events" if arena else f"{api_url}/api/events"
+        self.dedupe = DedupeWindow(window)
+        self.max_batch = max_batch
+        self.session = requests.Session()
+        # Batches carry (source, sequence), so a POST whose response was lost is retried safely
+        retry = Retry(total=5, backoff_factor=0.05, allowed_methods=None, status_forcelist=[502, 503, 504])
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=retry))
+        self.source = f"gateway-{uuid.uuid4().hex[:12]}"
+        self.sequence = count(1)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.queue = asyncio.Queue()
+        self.stopping = False
+        self.stats = {'received': 0, 'duplicates': 0, 'malformed': 0, 'forwarded': 0, 'rejected': 0,
+                      'retried': 0, 'failed': 0}
+
+    def ingest(self, payload):
+        """Decode and queue one datagram (or TCP record); returns hits accepted"""
+        try:
+            hits = decode_hits(payload)
+        except ValueError:
+            self.stats['malformed'] += 1
+            return 0
+        accepted = 0
+        for hit in hits:
+            self.stats['received'] += 1
+            if not self.dedupe.check(
+                ('seq', hit['shooter'], hit['seq']),
+                ('hit', hit['shooter'], hit['victim'], hit['timestamp'])
+            ):
+                self.stats['duplicates'] += 1
+                continue
+            self.queue.put_nowait(hit)
+            accepted += 1
+        return accepted
+
+    def _post(self, events, seq):
+        response = self.session.post(self.events_url, json={'events': events}, timeout=2, headers={
+            'X-Source': self.source, 'X-Sequence': str(seq)
+        })
+        response.raise_for_status()
+        return response.json()
+
+    async def forward(self):
+        """Posts queued hits until a None is queued"""
+        loop = asyncio.get_running_loop()
+        while True:
+            hits = [await self.queue.get()]
+            while len(hits) < self.max_batch and not self.queue.empty():
+                hits.append(self.queue.get_nowait())
+            stop = hits[-1] is None
+            hits = [hit for hit in hits if hit is not None]
+            if hits:
+                await self._forward_batch(loop, hits)
+            if stop:
+                return
+
+    async def _forward_batch(self, loop, hits):
+        events = [
+            {'type': 'hit', 'shooter': hit['shooter'], 'victim': hit['victim'], 'timestamp': hit['timestamp'],
+             'hitId': f"{hit['shooter']}:{hit['seq']}"}
+            for hit in hits
+        ]
+        # Same sequence on every attempt: a batch that landed but lost its response is not applied twice
+        seq = next(self.sequence)
+        delay = RETRY_DELAY
+        while True:
+            try:
+                result = await loop.run_in_executor(self.executor, self._post, events, seq)
+                break
+            except (requests.RequestException, ValueError) as e:
+                status = getattr(getattr(e, 'response', None), 'status_code', None)
+                if self.stopping or (status is not None and status < 500):
+                    # Stopping, or the server refused the batch itself: another try won't help
+                    log.error(f"❌ Forwarding {len(hits)} hits failed: {e}")
+                    self.stats['failed'] += len(hits)
+                    return
+                log.warning(f"⚠️ Forwarding {len(hits)} hits failed: {e}; retrying in {delay:.1f}s")
+                self.stats['retried'] += len(hits)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RETRY_MAX)
+        self.stats['forwarded'] += len(hits)
+        late = sum(1 for r in result.get('results', ()) if r.get('duplicate'))
+        self.stats['duplicates'] += late
+        self.stats['rejected'] += result.get('failed', 0) - late
+
+    async def report(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            log.info(f"📊 {self.stats} (window holds {len(self.dedupe)} keys)")
+
+    async def handle_tcp(self, reader, writer):
+        try:
+            while True:
+                self.ingest(await reader.readexactly(HIT.size))
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            writer.close()
+
+
+class _UdpProtocol(asyncio.DatagramProtocol):
+    def __init__(self, gateway):
+        self.gateway = gateway
+
+    def datagram_received(self, data, addr):
+        self.gateway.ingest(data)
+
+
+async def serve(gateway, host, udp_port, tcp_port, stats_interval):
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+    tasks = [asyncio.create_task(gateway.forward())]
+    if stats_interval:
+        tasks.append(asyncio.create_task(gateway.report(stats_interval)))
+    if udp_port:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RECEIVE_BUFFER)
+        sock.bind((host, udp_port))
+        transport, _ = await loop.create_datagram_endpoint(lambda: _UdpProtocol(gateway), sock=sock)
+        log.info(f"📡 Listening for hits on udp://{host}:{udp_port}")
+    if tcp_port:
+        server = await asyncio.start_server(gateway.handle_tcp, host, tcp_port)
+        log.info(f"📡 Listening for hits on tcp://{host}:{tcp_port}")
+    log.info(f"➡️  Forwarding to {gateway.events_url} (duplicate window {gateway.dedupe.window}s)")
+
+    await stopping.wait()
+    if udp_port:
+        transport.close()
+    if tcp_port:
+        server.close()
+    # Hits already accepted still go out, with one try each
+    gateway.stopping = True
+    gateway.queue.put_nowait(None)
+    await tasks[0]
+    for task in tasks[1:]:
+        task.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--api-url', default=API_URL)
+    parser.add_argument('--arena', help='arena id (default: the default arena)')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--udp-port', type=int, default=DEFAULT_PORT, help='0 to disable')
+    parser.add_argument('--tcp-port', type=int, default=DEFAULT_PORT, help='0 to disable')
+    parser.add_argument('--window', type=float, default=2.0, help='seconds a hit is remembered for duplicate suppression')
+    parser.add_argument('--max-batch', type=int, default=512, help='hits per /api/events request')
+    parser.add_argument('--stats-interval', type=float, default=10.0, help='seconds between stats lines, 0 for none')
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    gateway = HitGateway(args.api_url, args.arena, args.window, args.max_batch)
+    asyncio.run(serve(gateway, args.host, args.udp_port, args.tcp_port, args.stats_interval))
+    log.info(f"⏹️ Gateway stopped: {gateway.stats}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+
+MAX_KEY_LENGTH = 128
+
+
+class RequestInProgress(RuntimeError):
+    """Raised when a request with the same key is still being handled"""
+
+
+def idempotency_key(headers):
+    """The client's key for this request: Idempotency-Key, or X-Source + X-Sequence.
+
+    None when the request carries neither; raises ValueError when malformed.
+    """
+    key = headers.get('Idempotency-Key')
+    if key is None:
+        source, seq = headers.get('X-Source'), headers.get('X-Sequence')
+        if source is None and seq is None:
+            return None
+        if not source or not seq or not seq.isdigit():
+            raise ValueError('X-Source and X-Sequence (a non-negative integer) must be sent together')
+        key = f"{source}#{int(seq)}"
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise ValueError(f"Idempotency key must be 1-{MAX_KEY_LENGTH} characters")
+    return key
+
+
+class ReplayCache:
+    """Responses of already-handled requests, by idempotency key.
+
+    An OrderedDict in least-recently-used order, bounded by ``max_entries``;
+    entries untouched for ``ttl`` seconds are dropped from the front. Lookup,
+    insert and eviction are all O(1).
+
+    ``begin(key)`` either returns the stored response to replay or claims
+    the key (None) so the caller runs the request and then calls
+    ``finish()`` or, if the outcome should not be replayed, ``abandon()``.
+    A retry that arrives while the original is still running waits for it
+    instead of running a second time.
+    """
+
+    def __init__(self, max_entries=10000, ttl=600, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._done = threading.Condition(self._lock)
+        self._entries = OrderedDict()  # key -> [last used, response or None while in flight]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def begin(self, key, timeout=30):
+        deadline = self.clock() + timeout
+        with self._lock:
+            while True:
+                now = self.clock()
+                self._expire(now)
+                entry = self._entries.get(key)
+                if entry is None:
+                    self._entries[key] = [now, None]
+                    self._evict()
+                    return None
+                if entry[1] is not None:
+                    entry[0] = now
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                if now >= deadline:
+                    raise RequestInProgress(key)
+                self._done.wait(deadline - now)
+
+    def finish(self, key, response):
+        with self._lock:
+            self._entries[key] = [self.clock(), response]
+            self._entries.move_to_end(key)
+            self._done.notify_all()
+
+    def abandon(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._done.notify_all()
+
+    def completed(self):
+        """[(key, response)] of every finished request still remembered, oldest first"""
+        with self._lock:
+            return [(key, response) for key, (_, response) in self._entries.items() if response is not None]
+
+    def _expire(self, now):
+        while self._entries:
+            key, (used, response) = next(iter(self._entries.items()))
+            if now - used < self.ttl or response is None:
+                break
+            del self._entries[key]
+
+    def _evict(self):
+        for _ in range(len(self._entries)):
+            if len(self._entries) <= self.max_entries:
+                return
+            key, (_, response) = next(iter(self._entries.items()))
+            if response is None:
+                # Still running; it is the oldest claim, but its owner will finish() it
+                self._entries.move_to_end(key)
+                continue
+            del self._entries[key]
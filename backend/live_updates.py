@@ -0,0 +1,102 @@
+import logging
+import threading
+
+log = logging.getLogger('blaze.live')
+
+
+def player_row(player):
+    """Leaderboard row for one player, tagged with its team"""
+    return {
+        'rfid': player.get('id', ''),
+        'name': player.get('name', 'Unknown'),
+        'team': f"team{player.get('teamId')}",
+        'kills': player.get('kills', 0),
+        'deaths': player.get('deaths', 0)
+    }
+
+
+class LeaderboardBroadcaster:
+    """Pushes leaderboard changes to every connected display over Socket.IO.
+
+    State events only mark players as changed; a background task wakes every
+    ``tick`` seconds and, if anything changed, emits one ``leaderboard_delta``
+    frame with the current rows of the changed players. A burst of hits
+    therefore costs one small frame per tick no matter how many events
+    arrived; each delta also carries the current team totals from
+    ``totals_fn`` so displays never re-sum the roster. Bulk operations
+    (reset, clear team) fall back to a full ``leaderboard_snapshot`` frame,
+    which is also what (re)connecting clients get. With ``room`` set, frames
+    only go to the clients in that Socket.IO room.
+    """
+
+    def __init__(self, socketio, state, snapshot_fn, totals_fn, tick=0.1, room=None):
+        self.socketio = socketio
+        self.room = room
+        self.state = state
+        self.snapshot_fn = snapshot_fn
+        self.totals_fn = totals_fn
+        self.tick = tick
+        self._lock = threading.Lock()
+        self._changed = set()
+        self._removed = set()
+        self._full = False
+        self._match_ended = None
+        self._task = None
+        state.add_listener(self.on_event)
+
+    def on_event(self, event, result):
+        """GameState listener; called with the state lock held"""
+        op = event['op']
+        with self._lock:
+            if op == 'hit':
+                self._changed.update((event['shooter'], event['victim']))
+            elif op in ('register', 'kill', 'death'):
+                self._changed.add(event['id'])
+                self._removed.discard(event['id'])
+            elif op == 'remove':
+                self._removed.add(event['id'])
+                self._changed.discard(event['id'])
+            else:
+                self._full = True
+
+    def match_status_changed(self, ended):
+        with self._lock:
+            self._match_ended = ended
+
+    def start(self):
+        if self._task is None:
+            self._task = self.socketio.start_background_task(self._run)
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.tick)
+            try:
+                self.flush()
+            except Exception as e:
+                log.error(f"❌ Broadcast error: {e}")
+
+    def flush(self):
+        """Emit whatever accumulated since the last tick"""
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            removed, self._removed = self._removed, set()
+            full, self._full = self._full, False
+            match_ended, self._match_ended = self._match_ended, None
+
+        if full:
+            self.socketio.emit('leaderboard_snapshot', self.snapshot_fn(), to=self.room)
+        elif changed or removed:
+            with self.state.lock:
+                rows = []
+                for rfid in changed:
+                    player = self.state.find_player(rfid)
+                    if player is not None:
+                        rows.append(player_row(player))
+            self.socketio.emit('leaderboard_delta', {
+                'players': rows,
+                'removed': sorted(removed),
+                'teams': self.totals_fn()
+            }, to=self.room)
+
+        if match_ended is not None:
+            self.socketio.emit('match_status', {'ended': match_ended}, to=self.room)
@@ -0,0 +1,243 @@
+import json
+import sqlite3
+import threading
+import time
+from array import array
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    arena TEXT NOT NULL,
+    ended_at REAL NOT NULL,
+    winning_team TEXT NOT NULL,
+    team1_score INTEGER NOT NULL,
+    team2_score INTEGER NOT NULL,
+    mvp_id TEXT,
+    victory_data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS matches_by_arena ON matches (arena, id DESC);
+
+CREATE TABLE IF NOT EXISTS match_players (
+    match_id INTEGER NOT NULL REFERENCES matches (id),
+    player_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    team_id INTEGER NOT NULL,
+    kills INTEGER NOT NULL,
+    deaths INTEGER NOT NULL,
+    won INTEGER NOT NULL,
+    kill_timestamps BLOB NOT NULL,
+    death_timestamps BLOB NOT NULL,
+    PRIMARY KEY (match_id, player_id)
+);
+CREATE INDEX IF NOT EXISTS match_players_by_rank ON match_players (match_id, kills DESC, deaths, player_id);
+CREATE INDEX IF NOT EXISTS match_players_by_player ON match_players (player_id, match_id DESC);
+
+CREATE TABLE IF NOT EXISTS careers (
+    player_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    matches INTEGER NOT NULL,
+    kills INTEGER NOT NULL,
+    deaths INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    last_match_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS careers_by_rank ON careers (kills DESC, deaths, player_id);
+
+CREATE TABLE IF NOT EXISTS ratings (
+    player_id TEXT PRIMARY KEY,
+    rating REAL NOT NULL,
+    matches INTEGER NOT NULL,
+    last_match_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ratings_by_rating ON ratings (rating DESC, player_id);
+"""
+
+SQL_VARIABLES = 500  # ids per IN (...) lookup, well under SQLite's limit
+
+
+def _timeline(blob):
+    timeline = array('q')
+    timeline.frombytes(blob)
+    return timeline.tolist()
+
+
+class MatchArchive:
+    """Finished matches and career totals in a local SQLite database.
+
+    ``archive()`` stores a match (victory data, final roster and the
+    compact kill/death timelines as raw int64 blobs) and folds it into
+    each player's career row in the same transaction, so career totals are
+    never recomputed from history. Every query is answered by walking one
+    index in order (match leaderboard by (match, kills), player history by
+    (player, match), all-time top by career kills) and pages with
+    LIMIT/OFFSET; nothing scans the whole history. Skill ratings live in
+    their own table, updated by ``archive(..., rate=...)`` in the same
+    transaction and looked up by primary key.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(SCHEMA)
+
+    def archive(self, arena, players, victory_data, rate=None):
+        """Store one finished match; players are GameState player dicts. Returns the match id.
+
+        rate: optional fn({player_id: (rating, matches)}) -> updated ratings,
+        called with the current ratings of these players inside the transaction.
+        """
+        winning_team = victory_data['winningTeam']
+        mvp = victory_data.get('mvp') or {}
+        with self._lock, self._db:
+            match_id = self._db.execute(
+                'INSERT INTO matches (arena, ended_at, winning_team, team1_score, team2_score, mvp_id, victory_data) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (arena, time.time(), winning_team, victory_data['team1Score'], victory_data['team2Score'],
+                 mvp.get('rfid'), json.dumps(victory_data))
+            ).lastrowid
+            rows = [
+                (match_id, p['id'], p.get('name', ''), p.get('teamId', 1), p.get('kills', 0), p.get('deaths', 0),
+                 int(f"team{p.get('teamId')}" == winning_team),
+                 array('q', p.get('killTimestamps', ())).tobytes(), array('q', p.get('deathTimestamps', ())).tobytes())
+                for p in players
+            ]
+            self._db.executemany('INSERT INTO match_players VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self._db.executemany(
+                'INSERT INTO careers (player_id, name, matches, kills, deaths, wins, last_match_id) '
+                'VALUES (?, ?, 1, ?, ?, ?, ?) '
+                'ON CONFLICT (player_id) DO UPDATE SET name = excluded.name, matches = matches + 1, '
+                'kills = kills + excluded.kills, deaths = deaths + excluded.deaths, '
+                'wins = wins + excluded.wins, last_match_id = excluded.last_match_id',
+                [(r[1], r[2], r[4], r[5], r[6], match_id) for r in rows]
+            )
+            if rate is not None:
+                updated = rate(self._ratings([p['id'] for p in players]))
+                self._db.executemany(
+                    'INSERT INTO ratings (player_id, rating, matches, last_match_id) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (player_id) DO UPDATE SET rating = excluded.rating, '
+                    'matches = excluded.matches, last_match_id = excluded.last_match_id',
+                    [(pid, rating, matches, match_id) for pid, (rating, matches) in updated.items()]
+                )
+        return match_id
+
+    def _ratings(self, player_ids):
+        found = {}
+        ids = list(player_ids)
+        for i in range(0, len(ids), SQL_VARIABLES):
+            chunk = ids[i:i + SQL_VARIABLES]
+            rows = self._db.execute(
+                f"SELECT player_id, rating, matches FROM ratings WHERE player_id IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            found.update((row['player_id'], (row['rating'], row['matches'])) for row in rows)
+        return found
+
+    def ratings(self, player_ids):
+        """{player_id: (rating, matches)} for the ids that have a rating"""
+        with self._lock:
+            return self._ratings(player_ids)
+
+    def top_ratings(self, limit, offset=0):
+        """Highest rated players first"""
+        rows = self._query(
+            'SELECT r.*, c.name FROM ratings r LEFT JOIN careers c ON c.player_id = r.player_id '
+            'ORDER BY r.rating DESC, r.player_id LIMIT ? OFFSET ?', (limit, offset)
+        )
+        return [
+            {'rfid': row['player_id'], 'name': row['name'], 'rating': row['rating'],
+             'matches': row['matches'], 'lastMatchId': row['last_match_id']}
+            for row in rows
+        ]
+
+    def _query(self, sql, params):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def matches(self, arena, limit, offset=0):
+        """Newest first"""
+        rows = self._query(
+            'SELECT id, arena, ended_at, winning_team, team1_score, team2_score, mvp_id FROM matches '
+            'WHERE arena = ? ORDER BY id DESC LIMIT ? OFFSET ?', (arena, limit, offset)
+        )
+        return [self._match_summary(row) for row in rows]
+
+    def match(self, match_id, limit, offset=0, timelines=False):
+        """(match summary with victory data, its leaderboard page), or None"""
+        rows = self._query('SELECT * FROM matches WHERE id = ?', (match_id,))
+        if not rows:
+            return None
+        summary = self._match_summary(rows[0])
+        summary['victoryData'] = json.loads(rows[0]['victory_data'])
+        players = self._query(
+            'SELECT * FROM match_players WHERE match_id = ? '
+            'ORDER BY kills DESC, deaths, player_id LIMIT ? OFFSET ?', (match_id, limit, offset)
+        )
+        return summary, [self._match_player(row, timelines) for row in players]
+
+    def player_history(self, player_id, limit, offset=0):
+        """A player's matches, newest first"""
+        rows = self._query(
+            'SELECT mp.*, m.arena, m.ended_at FROM match_players mp JOIN matches m ON m.id = mp.match_id '
+            'WHERE mp.player_id = ? ORDER BY mp.match_id DESC LIMIT ? OFFSET ?', (player_id, limit, offset)
+        )
+        return [
+            dict(self._match_player(row), matchId=row['match_id'], arena=row['arena'], endedAt=row['ended_at'])
+            for row in rows
+        ]
+
+    def career(self, player_id):
+        rows = self._query('SELECT * FROM careers WHERE player_id = ?', (player_id,))
+        return self._career(rows[0]) if rows else None
+
+    def top_careers(self, limit, offset=0):
+        """All-time ranking by kills, then fewest deaths"""
+        rows = self._query(
+            'SELECT * FROM careers ORDER BY kills DESC, deaths, player_id LIMIT ? OFFSET ?', (limit, offset)
+        )
+        return [self._career(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _match_summary(row):
+        return {
+            'id': row['id'],
+            'arena': row['arena'],
+            'endedAt': row['ended_at'],
+            'winningTeam': row['winning_team'],
+            'team1Score': row['team1_score'],
+            'team2Score': row['team2_score'],
+            'mvp': row['mvp_id']
+        }
+
+    @staticmethod
+    def _match_player(row, timelines=False):
+        result = {
+            'rfid': row['player_id'],
+            'name': row['name'],
+            'team': f"team{row['team_id']}",
+            'kills': row['kills'],
+            'deaths': row['deaths'],
+            'won': bool(row['won'])
+        }
+        if timelines:
+            result['killTimestamps'] = _timeline(row['kill_timestamps'])
+            result['deathTimestamps'] = _timeline(row['death_timestamps'])
+        return result
+
+    @staticmethod
+    def _career(row):
+        return {
+            'rfid': row['player_id'],
+            'name': row['name'],
+            'matches': row['matches'],
+            'kills': row['kills'],
+            'deaths': row['deaths'],
+            'wins': row['wins'],
+            'lastMatchId': row['last_match_id']
+        }
@@ -0,0 +1,167 @@
+import logging
+import queue
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import merge
+
+from analytics import MINUTE_MS
+from ranking import kd_ratio
+from ratings import rate_match
+from response_cache import cached_body
+
+log = logging.getLogger('blaze.report')
+
+CLUTCH_MS = MINUTE_MS  # kills in the final minute of the match
+
+
+def longest_streak(kills, deaths):
+    """Most kills between two deaths, from sorted kill/death timelines.
+
+    One bisect per death instead of a walk over every event; as in
+    MatchAnalytics, a death sorts before a kill with the same timestamp.
+    """
+    bounds = [0] + [bisect_left(kills, ts) for ts in deaths] + [len(kills)]
+    return max(b - a for a, b in zip(bounds, bounds[1:]))
+
+
+def kill_curve(kills, minutes):
+    """(kills per minute, running total at the end of each minute) from a sorted timeline"""
+    cumulative = [bisect_right(kills, (m + 1) * MINUTE_MS - 1) for m in range(minutes)]
+    return [b - a for a, b in zip([0] + cumulative, cumulative)], cumulative
+
+
+# (name, summary field shown as the value, ranking key, who qualifies); ties go to the higher fragger
+AWARDS = (
+    ('bestKD', 'kd', lambda p: (p['kd'], p['kills']), lambda p: p['kills'] > 0),
+    ('longestStreak', 'longestStreak', lambda p: p['longestStreak'], lambda p: p['longestStreak'] > 0),
+    ('mostDeaths', 'deaths', lambda p: p['deaths'], lambda p: p['deaths'] > 0),
+    ('clutch', 'clutchKills', lambda p: p['clutchKills'], lambda p: p['clutchKills'] > 0),
+    ('firstBlood', 'firstKill', lambda p: -p['firstKill'], lambda p: p['firstKill'] is not None),
+)
+
+
+def build_report(roster, victory):
+    """Full post-match report from a copy of the final roster.
+
+    roster: GameState player dicts (timelines as sorted arrays); victory:
+    the end_match summary (winner, scores, MVP, match id), which is
+    included as-is.
+    """
+    names = {p['id']: p.get('name', p['id']) for p in roster}
+    match_end = max((t[-1] for p in roster for t in (p['killTimestamps'], p['deathTimestamps']) if t), default=None)
+    clutch_from = match_end - CLUTCH_MS if match_end is not None else None
+
+    killed_by = {}
+    for p in roster:
+        for victim_id, n in p.get('victims', {}).items():
+            killed_by.setdefault(victim_id, {})[p['id']] = n
+
+    def rival(counts):
+        if not counts:
+            return None
+        other_id, n = max(counts.items(), key=lambda item: item[1])
+        return {'rfid': other_id, 'name': names.get(other_id, other_id), 'kills': n}
+
+    players = []
+    for p in roster:
+        kills, deaths = p['killTimestamps'], p['deathTimestamps']
+        players.append({
+            'rfid': p['id'],
+            'name': p.get('name', 'Unknown'),
+            'team': f"team{p.get('teamId')}",
+            'kills': p.get('kills', 0),
+            'deaths': p.get('deaths', 0),
+            'kd': kd_ratio(p.get('kills', 0), p.get('deaths', 0)),
+            'longestStreak': longest_streak(kills, deaths),
+            'clutchKills': len(kills) - bisect_left(kills, clutch_from) if clutch_from is not None else 0,
+            'firstKill': kills[0] if kills else None,
+            'mostKilled': rival(p.get('victims')),
+            'nemesis': rival(killed_by.get(p['id']))
+        })
+    players.sort(key=lambda p: (-p['kills'], p['deaths']))
+
+    minutes = match_end // MINUTE_MS + 1 if match_end is not None else 0
+    teams = {}
+    for team_id in (1, 2):
+        team_kills = array('q', merge(*(p['killTimestamps'] for p in roster if p.get('teamId') == team_id)))
+        per_minute, cumulative = kill_curve(team_kills, minutes)
+        teams[f"team{team_id}"] = {'perMinute': per_minute, 'cumulative': cumulative}
+
+    awards = []
+    for name, field, key, qualifies in AWARDS:
+        candidates = [p for p in players if qualifies(p)]
+        if candidates:
+            winner = max(candidates, key=key)
+            awards.append({'award': name, 'rfid': winner['rfid'], 'name': winner['name'],
+                           'team': winner['team'], 'value': winner[field]})
+
+    return dict(
+        victory,
+        durationMs=match_end,
+        awards=awards,
+        curves=dict(teams, minutes=list(range(minutes))),
+        players=players
+    )
+
+
+class ReportWorker:
+    """Archives finished matches and builds their reports off the request path.
+
+    ``end_match`` hands over a copy of the final roster and returns at once.
+    The single worker thread archives the match (updating the players'
+    skill ratings in the same transaction), builds the report, and
+    serializes and gzips it once. It then publishes the result on the
+    arena's ``match_state`` ('report', plus the match id on
+    'victory_data'), unless the arena was reset or ended again in the
+    meantime; a job that fails publishes 'report_error' instead, so
+    clients stop waiting. Jobs run in submission order, so an end that only refreshes
+    the report reuses the match id archived by the job before it.
+    """
+
+    def __init__(self, archive):
+        self.archive = archive
+        self._queue = queue.Queue()
+        self._match_ids = {}
+        self._built = 0
+        self._worker = threading.Thread(target=self._run, name='report-worker', daemon=True)
+        self._worker.start()
+
+    def submit(self, arena, roster, victory, archive_match=True):
+        self._queue.put((arena, roster, victory, archive_match))
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._process(*job)
+            except Exception as e:
+                log.error(f"❌ Post-match report failed for arena {job[0].id}: {e}")
+                self._fail(job[0], job[2], e)
+            finally:
+                self._queue.task_done()
+
+    def _process(self, arena, roster, victory, archive_match):
+        if archive_match:
+            self._match_ids[arena.id] = self.archive.archive(
+                arena.id, roster, victory, rate=lambda current: rate_match(roster, victory['winningTeam'], current)
+            )
+        final = dict(victory, matchId=victory.get('matchId', self._match_ids.get(arena.id)))
+        report = build_report(roster, final)
+        self._built += 1
+        entry = cached_body(report, f"report-{final['matchId']}-{self._built}")
+        with arena.state.lock:
+            if arena.match_state['victory_data'] is not victory:
+                return  # reset or ended again; a newer job owns the screen
+            arena.update_match(victory_data=final, report=entry)
+        log.info(f"📜 Match report ready: arena {arena.id}, match #{final['matchId']}, {len(roster)} players")
+
+    @staticmethod
+    def _fail(arena, victory, error):
+        with arena.state.lock:
+            if arena.match_state['victory_data'] is victory:
+                arena.update_match(report_error=str(error) or type(error).__name__)
+
+    def join(self):
+        """Block until every submitted job is done"""
+        self._queue.join()
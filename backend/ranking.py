@@ -0,0 +1,81 @@
+from bisect import bisect_left, insort
+
+
+def kd_ratio(kills, deaths):
+    """K/D the way the leaderboard shows it (kills when deaths is 0)"""
+    return round(kills / deaths, 2) if deaths else float(kills)
+
+
+class RankingIndex:
+    """Ranking and team totals kept up to date one player change at a time.
+
+    Players are ordered by kills (desc), then deaths (asc), then id, in a
+    sorted key list for the whole roster and one per team. ``update()``
+    moves a single key with bisect, so ``mvp()`` is O(1), ``rank()`` is
+    O(log n) and ``top(n)`` is O(n) in the size of the answer. Team kill and
+    death totals are adjusted by the difference on each update instead of
+    being re-summed.
+    """
+
+    def __init__(self, players=()):
+        self.rebuild(players)
+
+    def rebuild(self, players):
+        self._all = []  # the whole roster; kept apart so no teamId can collide with it
+        self._teams = {}
+        self._entries = {}
+        self._totals = {}
+        for player in players:
+            self.update(player)
+
+    @staticmethod
+    def _key(player):
+        return (-player.get('kills', 0), player.get('deaths', 0), player['id'])
+
+    def update(self, player):
+        """Re-rank one player after its kills, deaths or team changed"""
+        self.remove(player['id'])
+        key = self._key(player)
+        team = player.get('teamId')
+        self._entries[player['id']] = (key, team)
+        insort(self._all, key)
+        insort(self._teams.setdefault(team, []), key)
+        totals = self._totals.setdefault(team, {'kills': 0, 'deaths': 0})
+        totals['kills'] -= key[0]
+        totals['deaths'] += key[1]
+
+    def remove(self, player_id):
+        entry = self._entries.pop(player_id, None)
+        if entry is None:
+            return
+        key, team = entry
+        for keys in (self._all, self._teams[team]):
+            del keys[bisect_left(keys, key)]
+        totals = self._totals[team]
+        totals['kills'] += key[0]
+        totals['deaths'] -= key[1]
+
+    def _keys(self, team):
+        """Sorted keys of one team, or of everyone for None"""
+        return self._all if team is None else self._teams.get(team, [])
+
+    def team_totals(self, team):
+        return dict(self._totals.get(team, {'kills': 0, 'deaths': 0}))
+
+    def top(self, n, team=None):
+        """Ids of the n best players (optionally within one team)"""
+        return [key[2] for key in self._keys(team)[:n]]
+
+    def rank(self, player_id, team=None):
+        """1-based rank of a player, or None if not ranked"""
+        entry = self._entries.get(player_id)
+        if entry is None or (team is not None and entry[1] != team):
+            return None
+        return bisect_left(self._keys(team), entry[0]) + 1
+
+    def size(self, team=None):
+        return len(self._keys(team))
+
+    def mvp(self):
+        """Id of the current top fragger, or None for an empty roster"""
+        return self._all[0][2] if self._all else None
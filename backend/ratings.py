@@ -0,0 +1,92 @@
+from bisect import bisect_left
+
+DEFAULT_RATING = 1500.0
+K_PROVISIONAL = 40  # first matches move a rating quickly...
+K_ESTABLISHED = 20  # ...then it settles
+PROVISIONAL_MATCHES = 10
+RESULT_WEIGHT = 0.7  # the rest of a player's score is their share of kills vs deaths
+
+
+def rate_match(players, winning_team, current):
+    """New ratings after one match: {player_id: (rating, matches)}.
+
+    Elo against the opposing team's average rating. A player's score mixes
+    the team result (1 win, 0.5 tie, 0 loss) with their own
+    kills / (kills + deaths), so a strong game on a losing team still
+    counts. current: {player_id: (rating, matches)} for the players already
+    rated; everyone else starts at DEFAULT_RATING.
+    """
+    def rating(pid):
+        return current.get(pid, (DEFAULT_RATING, 0))[0]
+
+    teams = {}
+    for p in players:
+        teams.setdefault(p.get('teamId'), []).append(rating(p['id']))
+    if len(teams) < 2:
+        return {}
+    averages = {team: sum(values) / len(values) for team, values in teams.items()}
+
+    updated = {}
+    for p in players:
+        team = p.get('teamId')
+        r, matches = current.get(p['id'], (DEFAULT_RATING, 0))
+        opponents = [avg for other, avg in averages.items() if other != team]
+        expected = 1 / (1 + 10 ** ((sum(opponents) / len(opponents) - r) / 400))
+        result = 0.5 if winning_team == 'tie' else float(f"team{team}" == winning_team)
+        kills, deaths = p.get('kills', 0), p.get('deaths', 0)
+        share = kills / (kills + deaths) if kills + deaths else 0.5
+        score = RESULT_WEIGHT * result + (1 - RESULT_WEIGHT) * share
+        k = K_PROVISIONAL if matches < PROVISIONAL_MATCHES else K_ESTABLISHED
+        updated[p['id']] = (round(r + k * (score - expected), 2), matches + 1)
+    return updated
+
+
+def balance(ratings):
+    """Split {player_id: rating} into two teams of (near) equal size and average rating.
+
+    Greedy first (strongest remaining player to the weaker team that still
+    has room), then repeated best single swaps: for each player on one side
+    the ideal partner is found by bisect in the other side's sorted
+    ratings, so a pass is O(n log n) and a few passes suffice even for
+    hundreds of players. Averages rather than totals are compared so an
+    odd pool is not skewed by the extra player. Returns (team1 ids, team2 ids).
+    """
+    order = sorted(ratings, key=lambda pid: (-ratings[pid], pid))
+    capacity = (len(order) + 1) // 2
+    sides = ([], [])
+    sums = [0.0, 0.0]
+    for pid in order:
+        weaker = 0 if sums[0] <= sums[1] else 1
+        if len(sides[weaker]) >= capacity:
+            weaker = 1 - weaker
+        sides[weaker].append(pid)
+        sums[weaker] += ratings[pid]
+    if not sides[1]:
+        return sides
+
+    # Swapping a (side 0) with b (side 1) changes the average gap by (b - a) * scale
+    scale = 1 / len(sides[0]) + 1 / len(sides[1])
+    for _ in range(len(order)):
+        diff = sums[0] / len(sides[0]) - sums[1] / len(sides[1])
+        if not diff:
+            break
+        other = sorted((ratings[pid], pid) for pid in sides[1])
+        values = [value for value, _ in other]
+        best = (abs(diff) - 1e-9, None, None)
+        for i, pid in enumerate(sides[0]):
+            j = bisect_left(values, ratings[pid] - diff / scale)
+            for k in (j - 1, j):
+                if 0 <= k < len(values):
+                    gap = abs(diff + (values[k] - ratings[pid]) * scale)
+                    if gap < best[0]:
+                        best = (gap, i, other[k][1])
+        if best[1] is None:
+            break
+        _, i, partner = best
+        moved = sides[0][i]
+        sides[0][i] = partner
+        sides[1][sides[1].index(partner)] = moved
+        delta = ratings[partner] - ratings[moved]
+        sums[0] += delta
+        sums[1] -= delta
+    return sides
@@ -0,0 +1,134 @@
+"""Read-only workers serving leaderboard reads from the shared-memory snapshot.
+
+    BLAZE_SNAPSHOT_DIR=/dev/shm/blaze python serve.py --port 5000
+    python read_replica.py --snapshot-dir /dev/shm/blaze --port 5001 --workers 4
+
+The writer process (serve.py / server.py with BLAZE_SNAPSHOT_DIR set) owns
+every mutation and publishes each arena's /api/players, /api/registry and
+/api/match_status bodies into <dir>/blaze-<arena>.snapshot. This process
+pre-forks --workers children sharing one listening socket; each maps the
+snapshot files and answers those GETs (default arena and
+/api/arenas/<id>/...) straight from the mapped bytes: no lock, no disk I/O,
+no JSON work. Route writes and everything else to the writer.
+"""
+import argparse
+import os
+import signal
+import sys
+from collections import OrderedDict
+
+from flask import Flask, Response, jsonify, request
+
+from shared_snapshot import SnapshotReader, TornRead, snapshot_path
+
+DEFAULT_ARENA = 'default'
+MAX_READERS = 64  # mapped snapshot files kept open per worker
+
+app = Flask(__name__)
+readers = OrderedDict()  # arena id -> SnapshotReader, least recently used first
+
+
+def reader_for(arena_id):
+    """Cached reader of an arena's snapshot; None if the writer never published one"""
+    reader = readers.get(arena_id)
+    if reader is not None:
+        readers.move_to_end(arena_id)
+        return reader
+    path = snapshot_path(app.config['SNAPSHOT_DIR'], arena_id)
+    if not os.path.exists(path):
+        return None
+    reader = readers[arena_id] = SnapshotReader(path)
+    if len(readers) > MAX_READERS:
+        readers.popitem(last=False)[1].close()
+    return reader
+
+
+def snapshot_response(arena_id, section, etag_name=None):
+    reader = reader_for(arena_id)
+    if reader is None:
+        return jsonify({'error': 'Arena not found'}), 404
+    try:
+        found = reader.read(section)
+    except TornRead as e:
+        return jsonify({'error': str(e)}), 503
+    if found is None:
+        return jsonify({'error': 'No snapshot published for this arena'}), 503
+    version, body = found
+    etag = f"{etag_name}-{version}" if etag_name else None
+    if etag and etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    if etag:
+        # Same ETag the writer's /api/players uses, so clients can move between them
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-State-Version'] = str(version)
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Access-Control-Expose-Headers'] = 'ETag, X-State-Version'
+    return response
+
+
+@app.route('/api/players', defaults={'arena_id': DEFAULT_ARENA})
+@app.route('/api/arenas/<arena_id>/players')
+def get_players(arena_id):
+    return snapshot_response(arena_id, 'players', 'players')
+
+
+@app.route('/api/registry', defaults={'arena_id': DEFAULT_ARENA})
+@app.route('/api/arenas/<arena_id>/registry')
+def get_registry(arena_id):
+    return snapshot_response(arena_id, 'registry')
+
+
+@app.route('/api/match_status', defaults={'arena_id': DEFAULT_ARENA})
+@app.route('/api/arenas/<arena_id>/match_status')
+def match_status(arena_id):
+    return snapshot_response(arena_id, 'match_status')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--snapshot-dir', default=os.environ.get('BLAZE_SNAPSHOT_DIR'),
+                        help='directory the writer publishes to (BLAZE_SNAPSHOT_DIR)')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--max-connections', type=int, default=1024, help='per worker')
+    args = parser.parse_args(argv)
+    if not args.snapshot_dir:
+        parser.error('--snapshot-dir (or BLAZE_SNAPSHOT_DIR) is required')
+    app.config['SNAPSHOT_DIR'] = args.snapshot_dir
+
+    import eventlet
+    from eventlet import wsgi
+
+    sock = eventlet.listen((args.host, args.port), backlog=2048)
+    children = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+            wsgi.server(sock, app, max_size=args.max_connections, log_output=False, debug=False)
+            os._exit(0)
+        children.append(pid)
+    print(f"📖 Read replica on http://{args.host}:{args.port} ({args.workers} workers, snapshots in {args.snapshot_dir})")
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for pid in children:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+
+
+if __name__ == '__main__':
+    main()
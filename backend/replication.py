@@ -0,0 +1,573 @@
+import base64
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+from game_state import write_stats_file
+from snapshot_format import encode_snapshot
+
+log = logging.getLogger('blaze.replication')
+
+HEARTBEAT_INTERVAL = 0.1  # the primary pings an idle standby this often
+ACK_TIMEOUT = 1.0  # seconds an acknowledgement waits for the standby before it is dropped
+PROMOTE_AFTER = 0.5  # seconds of silence after which a standby considers the primary gone
+RECV_SIZE = 1 << 16
+
+
+def parse_address(value):
+    """'host:port' (or just 'port') to a (host, port) tuple, localhost by default"""
+    host, _, port = str(value).rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def encode_records(records):
+    return b''.join(json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n' for record in records)
+
+
+def read_records(sock, buffer):
+    """(records, rest of buffer) from one recv; raises EOFError when the peer closed"""
+    data = sock.recv(RECV_SIZE)
+    if not data:
+        raise EOFError('connection closed')
+    lines = (buffer + data).split(b'\n')
+    return [json.loads(line) for line in lines[:-1]], lines[-1]
+
+
+class _Session:
+    """One connected standby: its send queue and what it has acknowledged"""
+
+    def __init__(self, sock, peer):
+        self.sock = sock
+        self.peer = peer
+        self.queue = []
+        self.acked = {}  # arena id -> highest event seq the standby applied
+        self.synced = {}  # arena id -> event seq its sync snapshot covers
+        self.replays_sent = 0
+        self.replays_acked = 0
+        self.ready = False
+        self.closed = False
+        self.sender = None
+
+    def sendable(self):
+        """How many queued records can go out: everything before the first held one"""
+        for i, record in enumerate(self.queue):
+            if record.get('held'):
+                return i
+        return len(self.queue)
+
+
+class _Held:
+    """Event records of one idempotent request, kept back until its response is known"""
+
+    def __init__(self):
+        self.session = None
+        self.records = []
+
+
+class ReplicationPrimary:
+    """Streams every arena's state mutations to one warm standby.
+
+    A standby connects to ``address`` and first gets a full sync: each
+    arena's snapshot (tagged with its event seq) and match_state. After that
+    every applied event, match_state change and idempotent response goes
+    down the same connection in order. Records are queued by GameState and
+    arena listeners under the state lock and written by a sender thread, so
+    no request ever writes to the socket itself.
+
+    Once the standby reports ready, acknowledgements are synchronous:
+    ``wait_acked()`` (a GameState commit waiter) holds each request until
+    the standby has applied its event, so every event a client saw
+    acknowledged is on the standby too. A standby that does not ack within
+    ``ack_timeout`` is dropped (told to re-sync). It may be promoting itself
+    meanwhile (the primary may just have stalled), so from then on nothing
+    is acknowledged until a standby is ready again, whose sync has every
+    event, or an operator calls ``allow_solo()``.
+
+    The events of an idempotent request are held back in the queue from
+    ``hold()`` until ``release()`` has its response, which then rides on the
+    request's last event record: the standby applies the events and learns
+    the response for replay in one step, so a retry after a failover can
+    never find the events applied but the response missing.
+    """
+
+    def __init__(self, address, replay_cache=None, ack_timeout=ACK_TIMEOUT):
+        self.address = address
+        self.replay_cache = replay_cache
+        self.ack_timeout = ack_timeout
+        self._local = threading.local()
+        self._cond = threading.Condition()
+        self._arenas = []
+        self._session = None
+        self._fenced = False  # a ready standby was dropped: acknowledge nothing until one is ready again
+        self._server = None
+
+    def start(self):
+        self._server = socket.create_server(self.address)
+        threading.Thread(target=self._accept_loop, name='replication-accept', daemon=True).start()
+        log.info(f"🔁 Replication: waiting for a standby on {self.address[0]}:{self.address[1]}")
+
+    def attach(self, arena):
+        """Replicate this arena (now and to every future standby)"""
+        state = arena.state
+        with state.lock:
+            state.add_listener(lambda event, result: self._queue(
+                {'t': 'event', 'arena': arena.id, 'seq': state.version, 'event': event}
+            ))
+            arena.match_listeners.append(lambda arena: self._queue(self._match_record(arena)))
+            state.add_commit_waiter(lambda seq: self.wait_acked(arena.id, seq))
+            with self._cond:
+                self._arenas.append(arena)
+                if self._session is not None:
+                    self._sync(self._session, arena)
+
+    # --- request path ------------------------------------------------------
+
+    def _queue(self, record):
+        """Listener side; called with the arena's state lock held"""
+        held = getattr(self._local, 'held', None)
+        with self._cond:
+            session = self._session
+            if session is None:
+                return
+            synced = session.synced.get(record['arena'])
+            if synced is None or record.get('seq', synced + 1) <= synced:
+                return  # the arena's sync (queued later, or already) covers it
+            if held is not None and record['t'] == 'event':
+                if held.session is not session:
+                    held.session, held.records = session, []
+                record['held'] = True
+                held.records.append(record)
+            session.queue.append(record)
+            self._cond.notify_all()
+
+    @staticmethod
+    def _match_record(arena):
+        return {
+            't': 'match', 'arena': arena.id,
+            'ended': arena.match_state['ended'], 'victory_data': arena.match_state['victory_data']
+        }
+
+    @staticmethod
+    def _replay_record(key, response):
+        status, mimetype, body = response
+        return {'key': list(key), 'response': [status, mimetype, base64.b64encode(body).decode('ascii')]}
+
+    def hold(self):
+        """Start holding back this thread's events; the request must then call release()"""
+        self._local.held = _Held()
+
+    def release(self, key=None, response=None):
+        """Send the held events, with the response to replay for key (None: nothing to remember).
+
+        Waits for the standby like an event does, before the response goes out.
+        """
+        held, self._local.held = self._local.held, None
+        with self._cond:
+            session = self._session
+            if session is not None and held.session is session and held.records:
+                last = held.records[-1]
+                if key is not None:
+                    last['replay'] = self._replay_record(key, response)
+                for record in held.records:
+                    del record['held']
+                self._cond.notify_all()
+                what = f"response {key[-1]}" if key is not None else f"{last['arena']}#{last['seq']}"
+                if self._wait(session, lambda: session.acked.get(last['arena'], 0) >= last['seq'], what):
+                    return
+            # No events, only ones already in this standby's snapshot, or the standby that had them
+            # was dropped (a new one gets them in its sync): the response alone
+            while key is not None:
+                self._cond.wait_for(lambda: not self._fenced)
+                session = self._session
+                if session is None:
+                    return
+                session.queue.append(dict(self._replay_record(key, response), t='replay'))
+                session.replays_sent += 1
+                sent = session.replays_sent
+                self._cond.notify_all()
+                if self._wait(session, lambda: session.replays_acked >= sent, f"response {key[-1]}"):
+                    return
+
+    def wait_acked(self, arena_id, seq):
+        """Block until a ready standby has applied this event (no-op without one)"""
+        held = getattr(self._local, 'held', None)
+        with self._cond:
+            while True:
+                self._cond.wait_for(lambda: not self._fenced)
+                session = self._session
+                if held is not None and held.session is session and held.records:
+                    return  # held back until release(), which does the waiting
+                if self._wait(session, lambda: session.acked.get(arena_id, 0) >= seq, f"{arena_id}#{seq}"):
+                    return
+
+    def _wait(self, session, done, what):
+        """Wait for done(), dropping the standby after ack_timeout; caller holds ``_cond``.
+
+        False if the standby was dropped first: it may take over without
+        this, so the caller waits for the fence to lift and tries again.
+        """
+        if session is None or not session.ready:
+            return True
+        deadline = time.monotonic() + self.ack_timeout
+        while not done():
+            if self._session is not session:
+                return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._drop(session, f"no ack for {what} within {self.ack_timeout}s")
+                return False
+            self._cond.wait(remaining)
+        return True
+
+    def allow_solo(self):
+        """Operator override: acknowledge without a standby again (the lost one must not take over)"""
+        with self._cond:
+            if self._fenced:
+                self._fenced = False
+                self._cond.notify_all()
+                log.warning("⚠️ Acknowledging without a standby by operator request")
+
+    def status(self):
+        with self._cond:
+            session = self._session
+            if session is None:
+                return {'connected': False, 'holding': self._fenced}
+            return {
+                'connected': True,
+                'holding': self._fenced,
+                'peer': f"{session.peer[0]}:{session.peer[1]}",
+                'ready': session.ready,
+                'lag': {arena.id: arena.state.version - session.acked.get(arena.id, 0) for arena in self._arenas}
+            }
+
+    def close(self):
+        """Shutting down: send what is queued, then hang up so the standby takes over now"""
+        with self._cond:
+            session, self._session = self._session, None
+            if session is not None:
+                session.closed = True
+                self._cond.notify_all()
+        if self._server is not None:
+            self._server.close()
+        if session is not None and session.sender is not None:
+            session.sender.join(timeout=self.ack_timeout)
+
+    # --- connection handling -----------------------------------------------
+
+    def _sync(self, session, arena):
+        """Queue a full copy of one arena; caller holds its state lock and ``_cond``"""
+        state = arena.state
+        # The snapshot has every applied event, also those not yet published
+        seq = state.log.last_seq
+        session.acked[arena.id] = session.synced[arena.id] = seq
+        session.queue.append(dict(
+            self._match_record(arena),
+            t='sync',
+            seq=seq,
+            stats_file=state.stats_file,
+            log_file=state.log.path,
+            snapshot=base64.b64encode(encode_snapshot(state._snapshot())).decode('ascii')
+        ))
+        self._cond.notify_all()
+
+    def _accept_loop(self):
+        while True:
+            sock, peer = self._server.accept()
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.settimeout(self.ack_timeout)
+            session = _Session(sock, peer)
+            with self._cond:
+                if self._session is not None:
+                    self._drop(self._session, 'another standby connected')
+                self._session = session
+                arenas = list(self._arenas)
+            for arena in arenas:
+                with arena.state.lock, self._cond:
+                    self._sync(session, arena)
+            with self._cond:
+                # Responses remembered so far; later ones follow in the stream
+                for key, response in (self.replay_cache.completed() if self.replay_cache is not None else ()):
+                    session.queue.append(dict(self._replay_record(key, response), t='replay'))
+                    session.replays_sent += 1
+                session.queue.append({'t': 'synced'})
+            log.info(f"🔁 Standby connected from {peer[0]}:{peer[1]}; sent {len(arenas)} arena snapshots")
+            session.sender = threading.Thread(target=self._send_loop, args=(session,), name='replication-send', daemon=True)
+            session.sender.start()
+            threading.Thread(target=self._receive_loop, args=(session,), name='replication-receive', daemon=True).start()
+
+    def _drop(self, session, reason):
+        """Forget a standby; caller holds ``_cond``. The sender tells it to re-sync"""
+        if session.closed:
+            return
+        session.closed = True
+        session.queue.append({'t': 'detach', 'reason': reason})
+        if self._session is session:
+            self._session = None
+        self._cond.notify_all()
+        log.warning(f"⚠️ Standby {session.peer[0]}:{session.peer[1]} dropped: {reason}")
+        if session.ready and not self._fenced:
+            # It may already be taking over; anything acknowledged now could be lost with us
+            self._fenced = True
+            log.warning("⛔ Holding acknowledgements until a standby is ready again "
+                        "(or POST /api/replication/solo)")
+
+    def _send_loop(self, session):
+        try:
+            while True:
+                with self._cond:
+                    deadline = time.monotonic() + HEARTBEAT_INTERVAL
+                    while not session.sendable() and not session.closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    n = len(session.queue) if session.closed else session.sendable()
+                    batch, session.queue = session.queue[:n], session.queue[n:]
+                    closed = session.closed
+                session.sock.sendall(encode_records(batch or [{'t': 'ping'}]))
+                if closed:
+                    break
+        except OSError as e:
+            with self._cond:
+                self._drop(session, f"send failed: {e}")
+        finally:
+            try:
+                session.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            session.sock.close()
+
+    def _receive_loop(self, session):
+        buffer = b''
+        try:
+            while not session.closed:
+                try:
+                    records, buffer = read_records(session.sock, buffer)
+                except socket.timeout:
+                    continue
+                with self._cond:
+                    for record in records:
+                        if record['t'] == 'ack':
+                            session.acked.update(record['seqs'])
+                            session.replays_acked = record['replays']
+                        elif record['t'] == 'ready':
+                            session.ready = True
+                            if self._session is session:
+                                self._fenced = False
+                            log.info(f"🔁 Standby {session.peer[0]}:{session.peer[1]} is ready; acknowledgements now wait for it")
+                    self._cond.notify_all()
+        except (OSError, EOFError, ValueError) as e:
+            with self._cond:
+                self._drop(session, f"connection lost: {e}")
+
+
+class Standby:
+    """Follows a ReplicationPrimary and keeps a hot copy of its state.
+
+    ``sync()`` runs before server.py is imported: it writes each arena's
+    snapshot where the primary keeps it (the same paths, relative to this
+    process's working directory) and clears the local event logs, so the
+    arenas load exactly the primary's state. ``follow(arenas, replay_cache)``
+    then applies the stream through the normal GameState path (own event
+    log, indexes, caches) and acks each batch once it is durable here.
+
+    ``follow()`` returns 'lost' when the primary went away (connection
+    closed, or silent for ``promote_after`` seconds) - everything it sent
+    has been applied, so the caller can promote - or 'resync' when the
+    primary dropped us or the copies diverged. A primary that only stalled
+    and speaks again (``primary_alive()``) acknowledges nothing once it has
+    dropped us until we are back, so the caller re-syncs rather than wait
+    for the port.
+    """
+
+    def __init__(self, address, promote_after=PROMOTE_AFTER):
+        self.address = address
+        self.promote_after = promote_after
+        self._sock = None
+        self._buffer = b''
+        self._synced = {}  # arena id -> (seq, sync record) from the full sync
+        self._pending = []
+        self._replays = 0  # replay records applied, acked back so the primary can release responses
+
+    def sync(self, retry_interval=1.0, own_copy=False):
+        """Take a full sync from the primary; True once it is complete.
+
+        With ``own_copy`` (a standby re-syncing after it stopped following,
+        whose arenas on disk hold everything it ever acknowledged) a primary
+        that is gone, or goes silent, mid-sync makes it return False instead:
+        the caller can take over with that copy.
+        """
+        while self._sock is None:
+            try:
+                self._sock = socket.create_connection(self.address)
+            except OSError as e:
+                if own_copy:
+                    log.warning(f"⚠️ Primary {self.address[0]}:{self.address[1]} not reachable ({e})")
+                    return False
+                log.warning(f"⚠️ Primary {self.address[0]}:{self.address[1]} not reachable ({e}); retrying")
+                time.sleep(retry_interval)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if own_copy:
+            self._sock.settimeout(self.promote_after)
+        try:
+            self._receive_sync()
+        except (OSError, EOFError) as e:
+            if not own_copy:
+                raise
+            log.warning(f"⚠️ Lost the primary while re-syncing: {e}")
+            self._sock.close()
+            self._sock = None
+            return False
+        self._sock.settimeout(None)
+        log.info(f"🔁 Synced {len(self._synced)} arenas from the primary")
+        return True
+
+    def _receive_sync(self):
+        synced = False
+        while not synced:
+            records, self._buffer = read_records(self._sock, self._buffer)
+            for record in records:
+                kind = record['t']
+                if kind == 'sync':
+                    self._write_arena(record)
+                elif kind == 'synced':
+                    synced = True
+                elif kind == 'detach':
+                    raise ConnectionError(f"primary refused the sync: {record['reason']}")
+                elif synced or kind == 'replay' or record.get('arena') in self._synced:
+                    # Stream for follow(); records queued before their arena's snapshot are in it already
+                    self._pending.append(record)
+
+    def _write_arena(self, record):
+        for path in (record['stats_file'], record['log_file']):
+            if os.path.isabs(path) or '..' in path.split(os.sep):
+                raise ValueError(f"refusing to write outside the working directory: {path}")
+        directory = os.path.dirname(record['stats_file'])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        write_stats_file(record['stats_file'], base64.b64decode(record['snapshot']))
+        # Local log segments belong to an older history; the snapshot replaces them
+        for path in (record['log_file'], f"{record['log_file']}.1"):
+            if os.path.exists(path):
+                os.remove(path)
+        self._synced[record['arena']] = (record['seq'], record)
+
+    def follow(self, arenas, replay_cache):
+        self._arenas = arenas
+        self._replay_cache = replay_cache
+        for arena_id, (seq, record) in self._synced.items():
+            if not self._check_synced(arena_id, seq, record):
+                return 'resync'
+        self._sock.sendall(encode_records([{'t': 'ready'}]))
+        self._sock.settimeout(self.promote_after)
+        records = self._pending
+        while True:
+            try:
+                outcome = self._apply(records)
+                if outcome:
+                    return outcome
+                records, self._buffer = read_records(self._sock, self._buffer)
+            except socket.timeout:
+                log.warning(f"⚠️ No word from the primary for {self.promote_after}s")
+                return self._drain() or 'lost'
+            except (OSError, EOFError) as e:
+                log.warning(f"⚠️ Lost the primary: {e}")
+                return 'lost'
+
+    def primary_alive(self):
+        """After follow() returned 'lost': True if the primary has spoken since (it had only stalled)"""
+        if self._sock is None:
+            return False
+        self._sock.setblocking(False)
+        try:
+            return bool(self._sock.recv(RECV_SIZE))
+        except OSError:
+            return False
+
+    def _drain(self):
+        """Apply whatever already arrived (e.g. after this process was paused); 'resync' if asked to"""
+        self._sock.setblocking(False)
+        while True:
+            try:
+                records, self._buffer = read_records(self._sock, self._buffer)
+                outcome = self._apply(records)
+            except (OSError, EOFError):
+                return None
+            if outcome:
+                return outcome
+
+    def _check_synced(self, arena_id, seq, record):
+        """Apply a synced arena's match_state once its state is loaded; False on a mismatch"""
+        arena = self._arenas.get(arena_id)
+        if arena is None:
+            arena, _ = self._arenas.create(arena_id)
+        with arena.state.lock:
+            if arena.state.version != seq:
+                log.error(f"❌ Arena {arena_id} loaded at seq {arena.state.version}, primary is at {seq}")
+                return False
+            arena.update_match(ended=record['ended'], victory_data=record['victory_data'], report=None)
+        return True
+
+    def _remember(self, record):
+        status, mimetype, body = record['response']
+        key = tuple(record['key'])
+        if self._replay_cache.begin(key, timeout=0) is None:
+            self._replay_cache.finish(key, (status, mimetype, base64.b64decode(body)))
+
+    def _apply(self, records):
+        """Apply one received batch and ack it; returns 'resync' if that is needed"""
+        pending = {}  # arena id -> [events] not yet applied, flushed in order
+        responses = []  # replays that came with those events, remembered once they are applied
+
+        def flush():
+            for arena_id, events in pending.items():
+                state = self._arenas.get(arena_id).state
+                if state.version + 1 != events[0][0]:
+                    raise ValueError(f"arena {arena_id} is at seq {state.version}, stream sent #{events[0][0]}")
+                results = state.submit_batch([event for _, event in events])
+                failed = [r for r in results if isinstance(r, Exception)]
+                if failed:
+                    raise ValueError(f"arena {arena_id} rejected a replicated event: {failed[0]!r}")
+            pending.clear()
+            for record in responses:
+                self._remember(record)
+            responses.clear()
+
+        acked = {}
+        replays = self._replays
+        try:
+            for record in records:
+                kind = record['t']
+                if kind == 'event':
+                    if self._arenas.get(record['arena']) is None:
+                        raise ValueError(f"event for unknown arena {record['arena']}")
+                    pending.setdefault(record['arena'], []).append((record['seq'], record['event']))
+                    acked[record['arena']] = record['seq']
+                    if 'replay' in record:
+                        responses.append(record['replay'])
+                    continue
+                flush()
+                if kind == 'match':
+                    arena = self._arenas.get(record['arena'])
+                    with arena.state.lock:
+                        arena.update_match(ended=record['ended'], victory_data=record['victory_data'], report=None)
+                elif kind == 'replay':
+                    self._remember(record)
+                    self._replays += 1
+                elif kind == 'sync':
+                    self._write_arena(record)
+                    if not self._check_synced(record['arena'], record['seq'], record):
+                        return 'resync'
+                elif kind == 'detach':
+                    log.warning(f"⚠️ Primary dropped this standby: {record['reason']}")
+                    return 'resync'
+            flush()
+        except (ValueError, AttributeError) as e:
+            log.error(f"❌ Replication stream diverged: {e}")
+            return 'resync'
+        if acked or self._replays != replays:
+            self._sock.sendall(encode_records([{'t': 'ack', 'seqs': acked, 'replays': self._replays}]))
+        return None
@@ -0,0 +1,65 @@
+import gzip
+import json
+import threading
+from collections import namedtuple
+
+from flask import Response
+
+CachedBody = namedtuple('CachedBody', ['version', 'etag', 'body', 'gzip_body'])
+
+
+def cached_body(payload, etag, version=None):
+    """Serialize and gzip a payload once, for any number of responses"""
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return CachedBody(version, etag, body, gzip.compress(body, compresslevel=5))
+
+
+def cached_response(entry, request):
+    """Response for a CachedBody honouring If-None-Match and Accept-Encoding"""
+    if entry.etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        use_gzip = 'gzip' in request.accept_encodings
+        response = Response(entry.gzip_body if use_gzip else entry.body, mimetype='application/json')
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(entry.etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    if entry.version is not None:
+        response.headers['X-State-Version'] = str(entry.version)
+    return response
+
+
+class VersionedResponseCache:
+    """Serialized JSON response cached per state version.
+
+    ``build_fn`` returns ``(version, payload)`` read consistently under the
+    state lock; the payload is serialized and gzipped once per version and
+    every later request for the same version reuses the bytes. ``respond()``
+    turns the cached entry into a response honouring If-None-Match and
+    Accept-Encoding.
+    """
+
+    def __init__(self, version_fn, build_fn, name):
+        self.version_fn = version_fn
+        self.build_fn = build_fn
+        self.name = name
+        self._lock = threading.Lock()
+        self._entry = None
+
+    def get(self):
+        entry = self._entry
+        if entry is not None and entry.version == self.version_fn():
+            return entry
+        with self._lock:
+            entry = self._entry
+            if entry is not None and entry.version == self.version_fn():
+                return entry
+            version, payload = self.build_fn()
+            entry = cached_body(payload, f"{self.name}-{version}", version)
+            self._entry = entry
+            return entry
+
+    def respond(self, request):
+        return cached_response(self.get(), request)
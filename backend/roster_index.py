@@ -0,0 +1,108 @@
+from bisect import bisect_left, bisect_right, insort
+
+EVERYONE = ('all', None)
+
+
+def filter_keys(team=None, college=None, external=None):
+    """Index keys for the given filters (None means "any"); no filters selects everyone"""
+    keys = []
+    if team is not None:
+        keys.append(('team', team))
+    if college:
+        keys.append(('college', str(college).strip().lower()))
+    if external is not None:
+        keys.append(('external', bool(external)))
+    return keys or [EVERYONE]
+
+
+class RosterIndex:
+    """Players of one arena in RFID order, bucketed by team, college and external flag.
+
+    Every bucket is a sorted list of player ids, kept up to date by a
+    GameState listener, so a page is one bisect to the cursor plus a walk
+    over the smallest bucket the filters select; nothing scans the whole
+    roster. Only mutated under the state lock; callers of ``page()`` hold
+    it too. Cursors are the last RFID of the previous page, which stays
+    valid while players are added or removed.
+    """
+
+    def __init__(self, state):
+        self.state = state
+        self._buckets = {}
+        self._keys = {}
+        with state.lock:
+            self._rebuild()
+            state.add_listener(self.on_event)
+
+    @staticmethod
+    def bucket_keys(player):
+        return (EVERYONE,) + tuple(filter_keys(player.get('teamId'), player.get('college'), bool(player.get('external'))))
+
+    def _rebuild(self):
+        self._buckets = {}
+        self._keys = {}
+        for player in self.state.players():
+            self._add(player)
+
+    def _add(self, player):
+        keys = self.bucket_keys(player)
+        for key in keys:
+            insort(self._buckets.setdefault(key, []), player['id'])
+        self._keys[player['id']] = keys
+
+    def _discard(self, player_id):
+        for key in self._keys.pop(player_id, ()):
+            ids = self._buckets[key]
+            del ids[bisect_left(ids, player_id)]
+            if not ids:
+                del self._buckets[key]
+
+    def on_event(self, event, result):
+        """GameState listener; called with the state lock held"""
+        op = event['op']
+        if op == 'register':
+            player = result[0]
+            if self._keys.get(player['id']) != self.bucket_keys(player):
+                self._discard(player['id'])
+                self._add(player)
+        elif op == 'remove':
+            self._discard(event['id'])
+        elif op == 'clear_team':
+            self._rebuild()
+
+    def page(self, keys, cursor=None, limit=100):
+        """(players, next cursor) for up to ``limit`` matches after ``cursor``.
+
+        The next cursor is None once the last match has been returned.
+        """
+        buckets = [self._buckets.get(key, []) for key in keys]
+        ids = min(buckets, key=len)
+        rest = [key for key, bucket in zip(keys, buckets) if bucket is not ids]
+        start = bisect_right(ids, cursor) if cursor is not None else 0
+        players = []
+        for i in range(start, len(ids)):
+            player_id = ids[i]
+            player = self.state.find_player(player_id)
+            # None: removed, but the removal is not durable (published) yet
+            if player is not None and all(key in self._keys[player_id] for key in rest):
+                players.append(player)
+                if len(players) == limit:
+                    return players, (player_id if i + 1 < len(ids) else None)
+        return players, None
+
+    def chunks(self, keys, row_fn, chunk_size=500):
+        """Yield lists of row_fn(player) for every match, one chunk per lock hold.
+
+        Memory stays at one chunk however large the roster; players added or
+        removed while a long export runs are picked up or skipped by RFID
+        order, like with cursor pages.
+        """
+        cursor = None
+        while True:
+            with self.state.lock:
+                players, cursor = self.page(keys, cursor, chunk_size)
+                rows = [row_fn(player) for player in players]
+            if rows:
+                yield rows
+            if cursor is None:
+                return
@@ -0,0 +1,180 @@
+"""Production entry point: the app on eventlet's WSGI server.
+
+    python serve.py --port 5000 --max-connections 2000
+
+`python server.py` still starts the Werkzeug dev server for development
+(without the reloader, whose parent process would open the same event
+log). This runs a single process of green threads: every
+request, the Socket.IO broadcaster and the event log committer are
+greenlets. State mutations are serialized by each arena's (green) lock, and
+fsyncs run on eventlet's native thread pool, so a slow disk never stalls
+the hub. On SIGINT/SIGTERM it stops accepting connections, gives in-flight
+requests --drain-timeout seconds and writes a final snapshot of every
+arena before exiting.
+
+Warm standby (see replication.py), e.g. two processes on one machine, each
+in its own working directory:
+
+    python serve.py --port 5000 --replication-listen 127.0.0.1:5100
+    python serve.py --port 5000 --standby-of 127.0.0.1:5100
+
+The standby copies the primary's state, applies its stream and keeps every
+arena hot in memory; while it is attached the primary acknowledges an
+event only once the standby has it. When the primary goes away (connection
+closed, or silent for --promote-after seconds) the standby binds --port as
+soon as it is free and serves from there. A primary that speaks again, or
+still holds the port after --takeover-timeout, is alive after all, so the
+standby re-syncs instead. Once the primary has dropped a ready standby it
+acknowledges nothing until a standby is ready again (or POST
+/api/replication/solo), so whichever of the two ends up serving has every
+acknowledged event. Point both at one match archive with BLAZE_ARCHIVE_FILE.
+"""
+import os
+
+os.environ['BLAZE_ASYNC_MODE'] = 'eventlet'
+
+import eventlet
+
+eventlet.monkey_patch()
+
+import argparse
+import logging
+import signal
+import sys
+import time
+
+from eventlet import tpool, wsgi
+from eventlet.event import Event
+
+import event_log
+from replication import PROMOTE_AFTER, Standby, parse_address
+from structured_log import setup_logging
+
+# A blocking fsync would freeze every green thread; run it on a real thread
+event_log.set_fsync(lambda fd: tpool.execute(os.fsync, fd))
+
+log = logging.getLogger('blaze.serve')
+
+RESYNC_ENV = 'BLAZE_STANDBY_RESYNC'  # set across restart_standby()'s exec
+
+
+def take_over(args, standby):
+    """Bind --port once the old primary has let go of it; None if it never does or is back"""
+    deadline = time.monotonic() + args.takeover_timeout
+    while True:
+        if standby.primary_alive():
+            log.warning("⚠️ The primary was only stalled; re-syncing instead of taking over")
+            return None
+        try:
+            # No SO_REUSEPORT: the bind must fail while the old primary still listens
+            return eventlet.listen((args.host, args.port), backlog=args.backlog, reuse_port=False)
+        except OSError as e:
+            if time.monotonic() >= deadline:
+                log.error(f"❌ Port {args.port} still taken ({e}); the primary is alive")
+                return None
+            time.sleep(0.05)
+
+
+def restart_standby(server):
+    """Start over with a fresh full sync"""
+    server.arenas.stop()
+    log.info("🔁 Re-syncing from the primary")
+    # The arenas on disk now hold everything this standby acknowledged; if the primary
+    # is gone by the time we reconnect, the restarted process takes over with them
+    os.environ[RESYNC_ENV] = '1'
+    os.execv(sys.executable, [sys.executable] + sys.argv)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--max-connections', type=int, default=1024,
+                        help='concurrent connections (green threads), including Socket.IO clients')
+    parser.add_argument('--backlog', type=int, default=2048, help='listen backlog')
+    parser.add_argument('--drain-timeout', type=float, default=10.0,
+                        help='seconds in-flight requests get to finish on shutdown')
+    parser.add_argument('--access-log', action='store_true', help='log every request')
+    parser.add_argument('--replication-listen', metavar='HOST:PORT',
+                        help='accept a warm standby on this address')
+    parser.add_argument('--standby-of', metavar='HOST:PORT',
+                        help='run as warm standby of the primary replicating on this address')
+    parser.add_argument('--promote-after', type=float, default=PROMOTE_AFTER,
+                        help='standby: seconds without word from the primary before taking over')
+    parser.add_argument('--takeover-timeout', type=float, default=30.0,
+                        help='standby: seconds to wait for the primary to free --port')
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    standby = None
+    if args.standby_of:
+        standby = Standby(parse_address(args.standby_of), promote_after=args.promote_after)
+        # Before server.py loads the arenas, so they load the primary's snapshots
+        following = standby.sync(own_copy=os.environ.pop(RESYNC_ENV, None) is not None)
+
+    import server
+
+    if standby is not None:
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        if following:
+            log.info(f"🛡️ Standby of {args.standby_of}: following, will take over port {args.port}")
+            try:
+                outcome = standby.follow(server.arenas, server.replays)
+            except (SystemExit, KeyboardInterrupt):
+                server.arenas.stop()
+                log.info("💾 Standby stopped; bye")
+                return
+            if outcome == 'resync':
+                restart_standby(server)
+        else:
+            log.warning(f"⚠️ Primary gone while re-syncing; taking over port {args.port} with this copy")
+        started = time.perf_counter()
+        sock = take_over(args, standby)
+        if sock is None:
+            restart_standby(server)
+        server.promote()
+        log.info(f"👑 Took over port {args.port} in {(time.perf_counter() - started) * 1000:.0f}ms")
+    else:
+        sock = eventlet.listen((args.host, args.port), backlog=args.backlog)
+
+    if args.replication_listen:
+        server.start_replication(parse_address(args.replication_listen))
+
+    stopping = Event()
+
+    def request_stop(signum, frame):
+        if not stopping.ready():
+            stopping.send(signal.Signals(signum).name)
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    serving = eventlet.spawn(
+        wsgi.server, sock, server.app,
+        max_size=args.max_connections,
+        log=logging.getLogger('blaze.access'),
+        log_output=args.access_log,
+        debug=False
+    )
+    log.info(f"🔥 Blaze serving on http://{args.host}:{args.port} (eventlet, {args.max_connections} connections)")
+
+    reason = stopping.wait()
+    log.info(f"⏹️ {reason}: no longer accepting connections, draining")
+    # wsgi.server treats SystemExit as a stop: it closes idle connections and waits for the rest
+    serving.kill(SystemExit)
+    try:
+        with eventlet.Timeout(args.drain_timeout):
+            serving.wait()
+    except eventlet.Timeout:
+        log.warning(f"⚠️ Requests still running after {args.drain_timeout}s (long-polls, sockets); closing anyway")
+
+    server.arenas.stop()
+    server.reports.join()
+    server.archive.close()
+    if server.replication is not None:
+        server.replication.close()
+    log.info("💾 Final snapshot written; bye")
+
+
+if __name__ == '__main__':
+    main()
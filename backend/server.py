@@ -1,373 +1,1059 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, g, request, jsonify, send_file
 from flask_cors import CORS
+from flask_socketio import SocketIO, emit, join_room
+import csv
+import functools
+import io
 import json
-from datetime import datetime
+import logging
 import os
+import time
+from arenas import ArenaRegistry
+from external_registry import BlockIdAllocator, DuplicateContact, ExternalRegistry
+from game_state import DuplicateHit, PlayerNotFound
+from idempotency import ReplayCache, RequestInProgress, idempotency_key
+from live_updates import LeaderboardBroadcaster
+from match_archive import MatchArchive
+from match_report import ReportWorker
+from metrics import REGISTRY
+from roster_index import RosterIndex, filter_keys
+from response_cache import VersionedResponseCache, cached_response
+from ranking import kd_ratio
+from ratings import DEFAULT_RATING, balance
+from replication import ReplicationPrimary
+from shared_snapshot import SnapshotPublisher, SnapshotWriter, snapshot_path
+from structured_log import setup_logging
+
+setup_logging()
+log = logging.getLogger('blaze.server')
 
 app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": "*"}})
+CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=['ETag', 'X-State-Version'])
+socketio = SocketIO(app, cors_allowed_origins='*', async_mode=os.environ.get('BLAZE_ASYNC_MODE', 'threading'))
 
-STATS_FILE = 'game_stats.json'
+STATS_FILE = 'game_stats.snap'  # compact snapshot, see snapshot_format.py
+LEGACY_STATS_FILE = 'game_stats.json'  # imported once when there is no snapshot yet
+EVENT_LOG_FILE = 'game_events.log'
+ARENAS_DIR = 'arenas'  # <arena_id>/game_stats.snap + game_events.log per extra arena
+DEFAULT_ARENA = 'default'  # what the unscoped /api/... routes operate on
+# Finished matches and career totals (SQLite); point a primary and its standby at the same file
+ARCHIVE_FILE = os.environ.get('BLAZE_ARCHIVE_FILE', 'match_history.db')
+BROADCAST_INTERVAL = 0.1  # max one leaderboard frame per 100ms
+LONG_POLL_TIMEOUT = 25  # seconds a ?since= request may block
 CONTACTS_FILE = 'contacts_rolls.json'
 EXTERNAL_COUNTER_FILE = 'external_counter.json'
+EXTERNAL_ID_BLOCK = 100  # external ids leased (and persisted) per counter file write
+# When set, each arena's read endpoints are published to <dir>/blaze-<arena>.snapshot for read_replica.py
+SNAPSHOT_DIR = os.environ.get('BLAZE_SNAPSHOT_DIR')
+SNAPSHOT_INTERVAL = 0.05
+REPLAY_CACHE_SIZE = 50000  # idempotency keys remembered (responses are small JSON)
+REPLAY_TTL = 600  # seconds an unused key is remembered
+EXPORT_CHUNK = 500  # players serialized per state lock hold while streaming an export
 
-if not os.path.exists(STATS_FILE):
-    with open(STATS_FILE, 'w') as f:
-        json.dump({'players': [], 'gameIsActive': False, 'team1Score': 0, 'team2Score': 0}, f)
+def leaderboard_row(player):
+    """Player entry in React leaderboard format"""
+    return {
+        'rfid': player.get('id', ''),
+        'name': player.get('name', 'Unknown'),
+        'kills': player.get('kills', 0),
+        'deaths': player.get('deaths', 0)
+    }
 
-if not os.path.exists(EXTERNAL_COUNTER_FILE):
-    with open(EXTERNAL_COUNTER_FILE, 'w') as f:
-        json.dump({'counter': 0}, f)
+def parse_timestamp(value):
+    """Optional game timestamp in ms; None if not supplied"""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ValueError('Invalid timestamp')
+    return int(value)
 
-match_state = {
-    'ended': False,
-    'victory_data': None
-}
+def hit_event(raw):
+    """Validate a hit body ({shooter, victim, timestamp?, hitId?}) into a state event"""
+    if not raw.get('shooter') or not raw.get('victim'):
+        raise ValueError('Missing shooter or victim')
+    event = {'op': 'hit', 'shooter': str(raw['shooter']), 'victim': str(raw['victim'])}
+    if event['shooter'] == event['victim']:
+        raise ValueError('Shooter and victim must be different players')
+    ts = parse_timestamp(raw.get('timestamp'))
+    if ts is not None:
+        event['ts'] = ts
+    if raw.get('hitId') is not None:
+        event['hitId'] = str(raw['hitId'])
+    return event
 
-def load_game_stats():
-    """Load stats from game_stats.json (supports both old and new format)"""
-    try:
-        with open(STATS_FILE, 'r') as f:
-            data = json.load(f)
-            
-            # Check if it's the new format with 'players' array
-            if 'players' in data and isinstance(data['players'], list):
-                print(f"📖 Loaded game stats (NEW FORMAT): {len(data['players'])} players")
-                return data
-            else:
-                # Old format - convert to new format internally
-                print(f"📖 Loaded game stats (OLD FORMAT): {len(data)} players")
-                players = []
-                for rfid, stats in data.items():
-                    if isinstance(stats, dict):  # Skip non-player keys
-                        players.append({
-                            'id': rfid,
-                            'teamId': stats.get('team', 1),
-                            'name': stats.get('name', rfid),
-                            'kills': stats.get('kills', 0),
-                            'deaths': stats.get('deaths', 0),
-                            'killTimestamps': [],
-                            'deathTimestamps': []
-                        })
-                return {
-                    'players': players,
-                    'gameIsActive': False,
-                    'team1Score': 0,
-                    'team2Score': 0
-                }
-    except Exception as e:
-        print(f"❌ Error loading stats: {e}")
-        return {'players': [], 'gameIsActive': False, 'team1Score': 0, 'team2Score': 0}
-
-def save_game_stats(data):
-    """Save stats to game_stats.json"""
-    try:
-        with open(STATS_FILE, 'w') as f:
-            json.dump(data, f, indent=4, default=str)
-        player_count = len(data.get('players', [])) if 'players' in data else len(data)
-        print(f"💾 Saved game stats: {player_count} players")
-    except Exception as e:
-        print(f"❌ Error saving stats: {e}")
-
-def get_next_external_id():
-    """Get next ID for external players"""
+def parse_event(raw):
+    """Turn an /api/events item into a state event"""
+    if not isinstance(raw, dict):
+        raise ValueError('Event must be an object')
+    if raw.get('type') == 'hit':
+        return hit_event(raw)
+    if raw.get('type') not in ('kill', 'death'):
+        raise ValueError(f"Unknown event type: {raw.get('type')}")
+    if not raw.get('rfid'):
+        raise ValueError('Missing rfid')
+    event = {'op': raw['type'], 'id': str(raw['rfid'])}
+    ts = parse_timestamp(raw.get('timestamp'))
+    if ts is not None:
+        event['ts'] = ts
+    return event
+
+def versioned_leaderboard(state):
+    """(version, leaderboard) read consistently under the state lock"""
+    with state.lock:
+        return state.version, {
+            'team1': [leaderboard_row(p) for p in state.team(1)],
+            'team2': [leaderboard_row(p) for p in state.team(2)]
+        }
+
+def registration_event(data):
+    """Build a register event from {rfid, name, team}"""
+    if not isinstance(data, dict) or not all([data.get('rfid'), data.get('name'), data.get('team')]):
+        raise ValueError('Missing data')
+    team_num = 1 if data['team'] == 'team1' else 2
+    return {'op': 'register', 'id': str(data['rfid']), 'name': data['name'], 'teamId': team_num}
+
+def report_roster(state):
+    """Copy of what the report worker reads (it runs after the lock is released); caller holds the lock"""
+    return [
+        dict(p, killTimestamps=p['killTimestamps'][:], deathTimestamps=p['deathTimestamps'][:],
+             victims=dict(p['victims']))
+        for p in state.players()
+    ]
+
+def leaderboard_snapshot(state):
+    return versioned_leaderboard(state)[1]
+
+def team_scores(state):
+    """Kill/death totals per team, maintained incrementally by the ranking index"""
+    with state.lock:
+        totals = {'team1': state.ranking.team_totals(1), 'team2': state.ranking.team_totals(2)}
+    for team in totals.values():
+        team['kd'] = kd_ratio(team['kills'], team['deaths'])
+    return totals
+
+def live_snapshot(state):
+    """Full leaderboard frame for Socket.IO clients"""
+    return dict(leaderboard_snapshot(state), teams=team_scores(state))
+
+def parse_team(value):
+    """'team1'/'team2' query value to a team id (None when not given)"""
+    if value is None:
+        return None
+    if value not in ('team1', 'team2'):
+        raise ValueError(f"Unknown team: {value}")
+    return 1 if value == 'team1' else 2
+
+def registry_payload(state):
+    """{rfid: {name, team}} for every player; caller holds the state lock"""
+    return {
+        player.get('id'): {'name': player.get('name', ''), 'team': player.get('teamId', 1)}
+        for player in state.players()
+    }
+
+def candidate_row(player):
+    return {
+        'rfid': player.get('id'),
+        'name': player.get('name', ''),
+        'email': player.get('email', ''),
+        'mobile': player.get('mobile', ''),
+        'college': player.get('college', 'External'),
+        'team': 'Team Hearts' if player.get('teamId') == 1 else 'Team Spades'
+    }
+
+EXPORT_FIELDS = ('rfid', 'name', 'team', 'external', 'email', 'mobile', 'college', 'kills', 'deaths', 'kd')
+
+def export_row(player):
+    """Registration details plus match stats of one player, in EXPORT_FIELDS order"""
+    return (
+        player.get('id'), player.get('name', ''), f"team{player.get('teamId')}", bool(player.get('external')),
+        player.get('email', ''), player.get('mobile', ''), player.get('college', ''),
+        player.get('kills', 0), player.get('deaths', 0), kd_ratio(player.get('kills', 0), player.get('deaths', 0))
+    )
+
+def ranked_row(player, rank):
+    return dict(
+        leaderboard_row(player),
+        team=f"team{player.get('teamId')}",
+        kd=kd_ratio(player.get('kills', 0), player.get('deaths', 0)),
+        rank=rank
+    )
+
+def page_args(default_limit=20, max_limit=100):
+    """(limit, offset) from ?limit=&offset="""
+    limit = max(1, min(request.args.get('limit', default_limit, type=int), max_limit))
+    offset = max(0, request.args.get('offset', 0, type=int))
+    return limit, offset
+
+def paging_requested():
+    return 'cursor' in request.args or 'limit' in request.args
+
+def cursor_args(default_limit=100, max_limit=1000):
+    """(limit, cursor) from ?limit=&cursor= (cursor: the nextCursor of the previous page)"""
+    limit = max(1, min(request.args.get('limit', default_limit, type=int), max_limit))
+    return limit, request.args.get('cursor') or None
+
+def roster_filter_keys():
+    """Roster index keys from ?team=team1|team2&college=&external=1|0"""
+    external = request.args.get('external')
+    if external not in (None, '1', '0', 'true', 'false'):
+        raise ValueError(f"Unknown external filter: {external}")
+    return filter_keys(
+        team=parse_team(request.args.get('team')),
+        college=request.args.get('college'),
+        external=None if external is None else external in ('1', 'true')
+    )
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'blaze_http_request_duration_seconds', 'HTTP request latency by endpoint', ['endpoint', 'method']
+)
+REQUESTS = REGISTRY.counter('blaze_http_requests_total', 'HTTP requests by endpoint and status', ['endpoint', 'status'])
+EVENTS_APPLIED = REGISTRY.counter('blaze_events_applied_total', 'State events applied (ingest rate)', ['arena', 'op'])
+REPLAYS = REGISTRY.counter('blaze_idempotent_replays_total', 'Retried requests answered from the replay cache', ['endpoint'])
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    """Per-endpoint latency histogram; the endpoint is the view name, not the raw path"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.endpoint or 'unmatched'
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, method=request.method)
+        REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    return response
+
+# External player ids are unique across all arenas
+external_ids = BlockIdAllocator(EXTERNAL_COUNTER_FILE, block_size=EXTERNAL_ID_BLOCK)
+
+def setup_arena(arena):
+    """Attach the per-arena response cache, broadcaster, signup and roster indexes"""
+    state = arena.state
+    state.add_listener(lambda event, result: EVENTS_APPLIED.inc(arena=arena.id, op=event['op']))
+    arena.externals = ExternalRegistry(state, external_ids)
+    # RFID-ordered team/college/external buckets behind cursor pages and exports
+    arena.roster = RosterIndex(state)
+    # Serialized (and gzipped) /api/players body, rebuilt only when the state version moves
+    arena.leaderboard_cache = VersionedResponseCache(
+        lambda: state.version, lambda: versioned_leaderboard(state), 'players'
+    )
+    # Pushes coalesced leaderboard deltas to the displays watching this arena
+    arena.broadcaster = LeaderboardBroadcaster(
+        socketio, state, lambda: live_snapshot(state), lambda: team_scores(state),
+        tick=BROADCAST_INTERVAL, room=arena.room
+    )
+    arena.broadcaster.start()
+    if replication is not None:
+        replication.attach(arena)
+    if SNAPSHOT_DIR:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        # Read endpoints for other processes, published from the same cached bytes
+        arena.snapshot = SnapshotPublisher(
+            socketio, SnapshotWriter(snapshot_path(SNAPSHOT_DIR, arena.id)),
+            lambda: (state.version, arena.match_state['ended']),
+            lambda: shared_sections(arena),
+            interval=SNAPSHOT_INTERVAL
+        )
+        arena.snapshot.start()
+
+def shared_sections(arena):
+    """(version, {section: JSON bytes}) for the shared-memory snapshot"""
+    entry = arena.leaderboard_cache.get()
+    with arena.state.lock:
+        registry = registry_payload(arena.state)
+    return entry.version, {
+        'players': entry.body,
+        'registry': json.dumps(registry, separators=(',', ':')).encode('utf-8'),
+        'match_status': json.dumps({'ended': arena.match_state['ended']}).encode('utf-8')
+    }
+
+# Streams every arena to a warm standby once start_replication() ran (serve.py --replication-listen)
+replication = None
+
+# One GameState (files, event log, lock) per arena; every mutation goes through its event log
+arenas = ArenaRegistry(ARENAS_DIR, DEFAULT_ARENA, STATS_FILE, EVENT_LOG_FILE, LEGACY_STATS_FILE, on_create=setup_arena)
+
+# Every finished match, whichever arena it was played in
+archive = MatchArchive(ARCHIVE_FILE)
+# Archives ended matches and builds their post-match reports in the background
+reports = ReportWorker(archive)
+
+def start_replication(address):
+    """Become a replication primary: accept a warm standby on address (see replication.py)"""
+    global replication
+    replication = ReplicationPrimary(address, replays)
+    for arena in arenas.all():
+        replication.attach(arena)
+    replication.start()
+
+def promote():
+    """Take over after following a primary as its standby.
+
+    Rebuilds the report of any match that ended on the primary (archiving
+    it if the primary had not yet) and moves external ids past every one
+    the primary handed out.
+    """
+    highest = 0
+    for arena in arenas.all():
+        with arena.state.lock:
+            for player in arena.state.players():
+                suffix = str(player['id'])[len(external_ids.prefix):]
+                if player.get('external') and suffix.isdigit():
+                    highest = max(highest, int(suffix))
+            victory = arena.match_state['victory_data']
+            roster = report_roster(arena.state) if arena.match_state['ended'] and victory else None
+        if roster is not None:
+            reports.submit(arena, roster, victory, archive_match='matchId' not in victory)
+    external_ids.advance_past(highest)
+    log.info(f"👑 Promoted to primary: {len(arenas.all())} arenas")
+
+def arena_gauge(read):
+    """Scrape-time gauge fn: {(arena_id,): read(state)} over all arenas"""
+    def collect():
+        values = {}
+        for arena in arenas.all():
+            with arena.state.lock:
+                values[(arena.id,)] = read(arena.state)
+        return values
+    return collect
+
+REGISTRY.gauge('blaze_players', 'Registered players', ['arena'], arena_gauge(lambda state: len(state.players())))
+REGISTRY.gauge('blaze_state_version', 'Events applied since the log began', ['arena'], arena_gauge(lambda state: state.version))
+
+# Responses of mutating requests that carried an idempotency key, for replay on retry
+replays = ReplayCache(REPLAY_CACHE_SIZE, REPLAY_TTL)
+
+def idempotent(view):
+    """Make a mutating view safe to retry.
+
+    Requests with an Idempotency-Key header (or X-Source + X-Sequence) run
+    once; a retry with the same key gets the original response back, with
+    Idempotent-Replayed: true. Server errors are not remembered, so those
+    can be retried for real. Requests without a key behave as before.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            key = idempotency_key(request.headers)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if key is None:
+            return view(*args, **kwargs)
+        
+        scoped = (request.endpoint, kwargs.get('arena_id', DEFAULT_ARENA), key)
+        try:
+            replay = replays.begin(scoped)
+        except RequestInProgress:
+            return jsonify({'error': 'A request with this idempotency key is still in progress'}), 409
+        if replay is not None:
+            status, mimetype, body = replay
+            REPLAYS.inc(endpoint=request.endpoint)
+            response = Response(body, status=status, mimetype=mimetype)
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        
+        # A standby gets this request's events together with its response (see replication.py)
+        primary = replication
+        if primary is not None:
+            primary.hold()
+        try:
+            response = app.make_response(view(*args, **kwargs))
+        except BaseException:
+            replays.abandon(scoped)
+            if primary is not None:
+                primary.release()
+            raise
+        if response.status_code >= 500:
+            replays.abandon(scoped)
+            if primary is not None:
+                primary.release()
+        else:
+            stored = (response.status_code, response.mimetype, response.get_data())
+            replays.finish(scoped, stored)
+            if primary is not None:
+                primary.release(scoped, stored)
+        return response
+    return wrapper
+
+def arena_route(rule, **options):
+    """Register a view at /api<rule> (default arena) and /api/arenas/<arena_id><rule>.
+
+    The view gets the Arena as its first argument. Mutating (POST) routes
+    are made idempotent, see idempotent().
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(arena_id=DEFAULT_ARENA, **kwargs):
+            arena = arenas.get(arena_id)
+            if arena is None:
+                return jsonify({'error': 'Arena not found'}), 404
+            return view(arena, **kwargs)
+        if 'POST' in options.get('methods', ()):
+            wrapper = idempotent(wrapper)
+        app.add_url_rule(f"/api{rule}", view_func=wrapper, **options)
+        app.add_url_rule(f"/api/arenas/<arena_id>{rule}", view_func=wrapper, **options)
+        return wrapper
+    return decorator
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of request, storage and ingest metrics"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/replication', methods=['GET'])
+def replication_status():
+    """Whether a standby is attached, and how many events it is behind per arena"""
+    if replication is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(replication.status(), enabled=True))
+
+@app.route('/api/replication/solo', methods=['POST'])
+def replication_solo():
+    """Acknowledge writes again after losing the standby; only once it surely won't take over"""
+    if replication is None:
+        return jsonify({'error': 'Replication is not enabled'}), 400
+    replication.allow_solo()
+    return jsonify(dict(replication.status(), enabled=True))
+
+@app.route('/api/arenas', methods=['GET'])
+def list_arenas():
+    """All arenas with their roster size and match status"""
+    result = []
+    for arena in arenas.all():
+        with arena.state.lock:
+            players = len(arena.state.players())
+            version = arena.state.version
+        result.append({
+            'id': arena.id,
+            'players': players,
+            'version': version,
+            'ended': arena.match_state['ended'],
+            'default': arena.id == DEFAULT_ARENA
+        })
+    return jsonify({'arenas': result})
+
+@app.route('/api/arenas', methods=['POST'])
+@idempotent
+def create_arena():
+    """Create an arena: {"id": "arena2"} (existing ids are left as they are)"""
+    data = request.json or {}
     try:
-        with open(EXTERNAL_COUNTER_FILE, 'r') as f:
-            data = json.load(f)
-        counter = data.get('counter', 0) + 1
-        with open(EXTERNAL_COUNTER_FILE, 'w') as f:
-            json.dump({'counter': counter}, f)
-        return str(counter)
-    except:
-        return "1"
-
-def convert_to_leaderboard_format(game_stats):
-    """Convert game_stats.json format to React leaderboard format"""
-    team1 = []
-    team2 = []
-    
-    # Handle new format with 'players' array
-    if 'players' in game_stats and isinstance(game_stats['players'], list):
-        for player in game_stats['players']:
-            player_data = {
-                'rfid': player.get('id', ''),
-                'name': player.get('name', 'Unknown'),
-                'kills': player.get('kills', 0),
-                'deaths': player.get('deaths', 0)
-            }
-            
-            if player.get('teamId') == 1:
-                team1.append(player_data)
-            elif player.get('teamId') == 2:
-                team2.append(player_data)
-    else:
-        # Handle old format (for backward compatibility)
-        for player_id, stats in game_stats.items():
-            if not isinstance(stats, dict):
-                continue
-                
-            player_data = {
-                'rfid': player_id,
-                'name': stats.get('name', player_id.replace('_', ' ').title()),
-                'kills': stats.get('kills', 0),
-                'deaths': stats.get('deaths', 0)
-            }
-            
-            if stats.get('team') == 1:
-                team1.append(player_data)
-            elif stats.get('team') == 2:
-                team2.append(player_data)
-    
-    return {'team1': team1, 'team2': team2}
-
-def find_player_by_id(game_stats, player_id):
-    """Find a player by ID in the new format"""
-    if 'players' in game_stats:
-        for player in game_stats['players']:
-            if player.get('id') == player_id:
-                return player
-    return None
-
-@app.route('/api/players', methods=['GET'])
-def get_players():
-    """Get current leaderboard in React format"""
-    game_stats = load_game_stats()
-    result = convert_to_leaderboard_format(game_stats)
-    print(f"📊 Sending leaderboard: Team1={len(result['team1'])}, Team2={len(result['team2'])}")
-    return jsonify(result)
+        arena, created = arenas.create(data.get('id'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if created:
+        log.info(f"🏟️ Created arena: {arena.id}")
+    return jsonify({'success': True, 'id': arena.id, 'created': created}), 201 if created else 200
+
+@arena_route('/players', methods=['GET'])
+def get_players(arena):
+    """Get current leaderboard in React format.
 
-@app.route('/api/register', methods=['POST'])
-def register_player():
+    Supports If-None-Match (304 when unchanged) and long-polling with
+    ?since=<version>: the request blocks until the state version differs
+    from <version> or ?timeout= seconds (max LONG_POLL_TIMEOUT) pass.
+    """
+    state = arena.state
+    since = request.args.get('since', type=int)
+    if since is not None:
+        timeout = min(request.args.get('timeout', LONG_POLL_TIMEOUT, type=float), LONG_POLL_TIMEOUT)
+        state.wait_for_change(since, timeout)
+    return arena.leaderboard_cache.respond(request)
+
+@arena_route('/register', methods=['POST'])
+def register_player(arena):
     """Register a player with RFID"""
-    data = request.json
-    rfid = str(data.get('rfid'))
-    name = data.get('name')
-    team = data.get('team')
+    state = arena.state
+    try:
+        event = registration_event(request.json)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    rfid, name, team_num = event['id'], event['name'], event['teamId']
     
-    if not all([rfid, name, team]):
-        return jsonify({'error': 'Missing data'}), 400
+    player, created = state.submit(event)
     
-    team_num = 1 if team == 'team1' else 2
-    
-    game_stats = load_game_stats()
+    if created:
+        log.info(f"✅ Registered NEW player: {name} (RFID: {rfid}, Team: {team_num})")
+    else:
+        log.info(f"⚠️ Updated existing player: {name} (RFID: {rfid})")
+    return jsonify({'success': True, 'message': f'{name} registered to team {team_num}'})
+
+@arena_route('/register_bulk', methods=['POST'])
+def register_bulk(arena):
+    """Register/update many players and remove others in one call.
+
+    Body: {"players": [{"rfid", "name", "team"}, ...], "remove": ["RFID", ...]}
+    """
+    state = arena.state
+    data = request.json or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Body must be an object'}), 400
+    players, remove = data.get('players', []), data.get('remove', [])
+    if not isinstance(players, list):
+        return jsonify({'error': 'players must be a list'}), 400
+    if not isinstance(remove, list) or not all(isinstance(rfid, str) and rfid for rfid in remove):
+        return jsonify({'error': 'remove must be a list of RFIDs (strings)'}), 400
+    try:
+        events = [registration_event(p) for p in players]
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    events += [{'op': 'remove', 'id': rfid} for rfid in remove]
     
-    # Ensure we have the new format
-    if 'players' not in game_stats:
-        game_stats = {'players': [], 'gameIsActive': False, 'team1Score': 0, 'team2Score': 0}
+    outcomes = state.submit_batch(events)
+    registered = sum(1 for e, o in zip(events, outcomes) if e['op'] == 'register' and not isinstance(o, Exception))
+    removed = sum(1 for e, o in zip(events, outcomes) if e['op'] == 'remove' and not isinstance(o, Exception))
     
-    # Check if player already exists
-    player = find_player_by_id(game_stats, rfid)
+    log.info(f"📝 Bulk registration: {registered} registered/updated, {removed} removed")
+    return jsonify({'success': True, 'registered': registered, 'removed': removed})
+
+@arena_route('/register_external', methods=['POST'])
+def register_external(arena):
+    """Self-service signup: {name, email, mobile, college, team}; assigns the player id"""
+    data = request.json or {}
+    if not isinstance(data, dict) or not all([data.get('name'), data.get('email'), data.get('mobile')]):
+        return jsonify({'error': 'Missing data'}), 400
+    team_num = 1 if data.get('team', 'team1') == 'team1' else 2
     
-    if player:
-        # Update existing player
-        player['name'] = name
-        player['teamId'] = team_num
-        print(f"⚠️ Updated existing player: {name} (RFID: {rfid})")
-    else:
-        # Add new player
-        new_player = {
-            'id': rfid,
-            'teamId': team_num,
-            'name': name,
-            'kills': 0,
-            'deaths': 0,
-            'killTimestamps': [],
-            'deathTimestamps': []
-        }
-        game_stats['players'].append(new_player)
-        print(f"✅ Registered NEW player: {name} (RFID: {rfid}, Team: {team_num})")
+    try:
+        rfid = arena.externals.register(data['name'], data['email'], data['mobile'], team_num, data.get('college', ''))
+    except DuplicateContact as e:
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    save_game_stats(game_stats)
-    return jsonify({'success': True, 'message': f'{name} registered to team {team_num}'})
+    log.info(f"✅ Registered EXTERNAL player: {data['name']} (ID: {rfid}, Team: {team_num})")
+    return jsonify({'success': True, 'rfid': rfid})
 
-@app.route('/api/registered_candidates', methods=['GET'])
-def get_registered_candidates():
-    """Get list of all externally registered players"""
-    game_stats = load_game_stats()
-    
-    external_players = []
-    if 'players' in game_stats:
-        for player in game_stats['players']:
-            if player.get('external', False):
-                external_players.append({
-                    'rfid': player.get('id'),
-                    'name': player.get('name', ''),
-                    'email': player.get('email', ''),
-                    'mobile': player.get('mobile', ''),
-                    'college': player.get('college', 'External'),
-                    'team': 'Team Hearts' if player.get('teamId') == 1 else 'Team Spades'
-                })
+@arena_route('/registered_candidates', methods=['GET'])
+def get_registered_candidates(arena):
+    """Get list of all externally registered players.
+
+    With ?limit= or ?cursor= returns one page in RFID order plus
+    nextCursor; ?team= and ?college= then narrow it down.
+    """
+    if not paging_requested():
+        external_players = [candidate_row(player) for player in arena.externals.candidates()]
+        return jsonify({
+            'success': True,
+            'count': len(external_players),
+            'candidates': external_players
+        })
     
+    limit, cursor = cursor_args()
+    try:
+        keys = filter_keys(team=parse_team(request.args.get('team')), college=request.args.get('college'), external=True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    with arena.state.lock:
+        players, next_cursor = arena.roster.page(keys, cursor, limit)
+        external_players = [candidate_row(player) for player in players]
     return jsonify({
         'success': True,
         'count': len(external_players),
-        'candidates': external_players
+        'candidates': external_players,
+        'nextCursor': next_cursor
     })
 
-@app.route('/api/kill', methods=['POST'])
-def register_kill():
+@arena_route('/kill', methods=['POST'])
+def register_kill(arena):
     """Register a kill for a player"""
+    state = arena.state
     data = request.json
     rfid = str(data.get('rfid'))
     
-    print(f"🎯 Kill request for RFID: {rfid}")
-    
-    game_stats = load_game_stats()
-    player = find_player_by_id(game_stats, rfid)
+    event = {'op': 'kill', 'id': rfid}
+    try:
+        ts = parse_timestamp(data.get('timestamp'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if ts is not None:
+        event['ts'] = ts
     
-    if not player:
-        print(f"❌ Player not found: {rfid}")
+    try:
+        player = state.submit(event)
+    except PlayerNotFound:
+        log.warning(f"❌ Player not found: {rfid}")
         return jsonify({'error': 'Player not registered'}), 404
     
-    player['kills'] += 1
-    
-    # Add timestamp (optional, for tracking)
-    now = datetime.now()
-    if 'killTimestamps' not in player:
-        player['killTimestamps'] = []
-    # We don't add timestamps here since they come from the simulation data
-    
-    print(f"✅ Kill registered for {player['name']}: Kills={player['kills']}, Deaths={player['deaths']}")
-    
-    save_game_stats(game_stats)
+    log.debug(f"✅ Kill registered for {player['name']}: Kills={player['kills']}, Deaths={player['deaths']}")
     return jsonify({'success': True})
 
-@app.route('/api/death', methods=['POST'])
-def register_death():
+@arena_route('/death', methods=['POST'])
+def register_death(arena):
     """Register a death for a player"""
+    state = arena.state
     data = request.json
     rfid = str(data.get('rfid'))
     
-    print(f"💀 Death request for RFID: {rfid}")
-    
-    game_stats = load_game_stats()
-    player = find_player_by_id(game_stats, rfid)
+    event = {'op': 'death', 'id': rfid}
+    try:
+        ts = parse_timestamp(data.get('timestamp'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if ts is not None:
+        event['ts'] = ts
     
-    if not player:
-        print(f"❌ Player not found: {rfid}")
+    try:
+        player = state.submit(event)
+    except PlayerNotFound:
+        log.warning(f"❌ Player not found: {rfid}")
         return jsonify({'error': 'Player not registered'}), 404
     
-    player['deaths'] += 1
-    
-    # Add timestamp (optional, for tracking)
-    if 'deathTimestamps' not in player:
-        player['deathTimestamps'] = []
-    # We don't add timestamps here since they come from the simulation data
+    log.debug(f"✅ Death registered for {player['name']}: Kills={player['kills']}, Deaths={player['deaths']}")
+    return jsonify({'success': True})
+
+@arena_route('/hit', methods=['POST'])
+def register_hit(arena):
+    """One tag: a kill for the shooter and a death for the victim, applied together"""
+    try:
+        event = hit_event(request.json or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    print(f"✅ Death registered for {player['name']}: Kills={player['kills']}, Deaths={player['deaths']}")
+    try:
+        shooter, victim = arena.state.submit(event)
+    except PlayerNotFound as e:
+        log.warning(f"❌ Player not found: {e.args[0]}")
+        return jsonify({'error': 'Player not registered', 'rfid': e.args[0]}), 404
+    except DuplicateHit as e:
+        return jsonify({'error': str(e), 'duplicate': True}), 409
     
-    save_game_stats(game_stats)
+    log.debug(f"✅ Hit registered: {shooter['name']} ➜ {victim['name']}")
     return jsonify({'success': True})
 
-@app.route('/api/reset', methods=['POST'])
-def reset_match():
-    """Reset leaderboard for new match"""
-    game_stats = load_game_stats()
+@arena_route('/events', methods=['POST'])
+def ingest_events(arena):
+    """Apply a batch of hit/kill/death events in one pass.
+
+    Body: {"events": [{"type": "hit", "shooter": "RFID001", "victim": "RFID005", "timestamp": 112156},
+    {"type": "kill", "rfid": "RFID001"}, ...]} (a bare array is accepted too).
+    A hit may carry a "hitId"; one already applied fails with "duplicate": true.
+    Returns one result per event, in order.
+    """
+    state = arena.state
+    data = request.json
+    raw_events = data.get('events') if isinstance(data, dict) else data
+    if not isinstance(raw_events, list):
+        return jsonify({'error': 'Expected a list of events'}), 400
     
-    if 'players' in game_stats:
-        for player in game_stats['players']:
-            player['kills'] = 0
-            player['deaths'] = 0
-            player['killTimestamps'] = []
-            player['deathTimestamps'] = []
-        game_stats['team1Score'] = 0
-        game_stats['team2Score'] = 0
+    results = [None] * len(raw_events)
+    valid = []
+    for i, raw in enumerate(raw_events):
+        try:
+            valid.append((i, parse_event(raw)))
+        except ValueError as e:
+            results[i] = {'success': False, 'error': str(e)}
     
-    save_game_stats(game_stats)
+    outcomes = state.submit_batch([event for _, event in valid])
+    for (i, event), outcome in zip(valid, outcomes):
+        if isinstance(outcome, PlayerNotFound):
+            results[i] = {'success': False, 'error': 'Player not registered', 'rfid': outcome.args[0]}
+        elif isinstance(outcome, DuplicateHit):
+            results[i] = {'success': False, 'error': str(outcome), 'duplicate': True}
+        elif isinstance(outcome, Exception):
+            results[i] = {'success': False, 'error': str(outcome)}
+        elif event['op'] == 'hit':
+            results[i] = {'success': True, 'shooter': event['shooter'], 'victim': event['victim']}
+        else:
+            results[i] = {'success': True, 'rfid': event['id']}
+    
+    applied = sum(1 for r in results if r['success'])
+    log.debug(f"📦 Batch ingest: {applied}/{len(results)} events applied")
+    return jsonify({
+        'success': True,
+        'applied': applied,
+        'failed': len(results) - applied,
+        'results': results
+    })
+
+@arena_route('/reset', methods=['POST'])
+def reset_match(arena):
+    """Reset leaderboard for new match"""
+    state = arena.state
+    state.submit({'op': 'reset'})
     
-    match_state['ended'] = False
-    match_state['victory_data'] = None
+    with state.lock:
+        arena.update_match(ended=False, victory_data=None, report=None, report_error=None)
+    arena.broadcaster.match_status_changed(False)
     
-    print("🔄 Match reset!")
+    log.info("🔄 Match reset!")
     return jsonify({'success': True, 'message': 'Match reset'})
 
-@app.route('/api/end_match', methods=['POST'])
-def end_match():
-    """End the match and calculate victory data"""
-    game_stats = load_game_stats()
-    leaderboard = convert_to_leaderboard_format(game_stats)
-    
-    team1_score = sum(p['kills'] for p in leaderboard['team1'])
-    team2_score = sum(p['kills'] for p in leaderboard['team2'])
+@arena_route('/end_match', methods=['POST'])
+def end_match(arena):
+    """End the match; archiving and the post-match report happen in the background.
+
+    The match is archived once; ending it again before the next reset only
+    rebuilds the report.
+    """
+    state = arena.state
+    with state.lock:
+        team1_score = state.ranking.team_totals(1)['kills']
+        team2_score = state.ranking.team_totals(2)['kills']
+        mvp_id = state.ranking.mvp()
+        mvp = leaderboard_row(state.find_player(mvp_id)) if mvp_id else {'name': 'N/A', 'kills': 0}
+        roster = report_roster(state)
+        
+        winning_team = 'team1' if team1_score > team2_score else 'team2' if team2_score > team1_score else 'tie'
+        victory = {
+            'winningTeam': winning_team,
+            'team1Score': team1_score,
+            'team2Score': team2_score,
+            'mvp': mvp
+        }
+        already_ended = arena.match_state['ended']
+        previous = arena.match_state['victory_data']
+        if already_ended and previous and 'matchId' in previous:
+            victory['matchId'] = previous['matchId']
+        arena.update_match(ended=True, victory_data=victory, report=None, report_error=None)
     
-    winning_team = 'team1' if team1_score > team2_score else 'team2' if team2_score > team1_score else 'tie'
+    reports.submit(arena, roster, victory, archive_match=not already_ended)
+    arena.broadcaster.match_status_changed(True)
     
-    all_players = leaderboard['team1'] + leaderboard['team2']
-    mvp = max(all_players, key=lambda p: p['kills']) if all_players else {'name': 'N/A', 'kills': 0}
+    log.info(f"🏁 Match ended! Winner: {winning_team}, MVP: {mvp['name']}")
+    return jsonify({'success': True, 'message': 'Match ended'})
+
+@arena_route('/team_scores', methods=['GET'])
+def get_team_scores(arena):
+    """Live team kill/death totals"""
+    return jsonify(team_scores(arena.state))
+
+@arena_route('/top', methods=['GET'])
+def get_top_players(arena):
+    """Top-N players by kills (?n=10, optional ?team=team1|team2)"""
+    state = arena.state
+    n = max(0, min(request.args.get('n', 10, type=int), 500))
+    try:
+        team = parse_team(request.args.get('team'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    match_state['ended'] = True
-    match_state['victory_data'] = {
-        'winningTeam': winning_team,
-        'team1Score': team1_score,
-        'team2Score': team2_score,
-        'mvp': mvp
-    }
+    with state.lock:
+        ids = state.ranking.top(n, team)
+        players = [ranked_row(state.find_player(pid), i + 1) for i, pid in enumerate(ids)]
+        total = state.ranking.size(team)
+    return jsonify({'players': players, 'total': total})
+
+@arena_route('/rank/<rfid>', methods=['GET'])
+def get_player_rank(arena, rfid):
+    """A player's overall and in-team rank"""
+    state = arena.state
+    with state.lock:
+        player = state.find_player(rfid)
+        if not player:
+            return jsonify({'error': 'Player not found'}), 404
+        row = ranked_row(player, state.ranking.rank(rfid))
+        row['teamRank'] = state.ranking.rank(rfid, player.get('teamId'))
+        row['total'] = state.ranking.size()
+    return jsonify(row)
+
+@arena_route('/rivals/<rfid>', methods=['GET'])
+def get_rivals(arena, rfid):
+    """Who a player killed most (mostKilled) and who killed them most (nemesis)"""
+    state = arena.state
+    with state.lock:
+        try:
+            victims, killed_by = state.rivals(rfid)
+        except PlayerNotFound:
+            return jsonify({'error': 'Player not found'}), 404
+
+        def ranked(counts):
+            rows = []
+            for other_id, kills in sorted(counts.items(), key=lambda item: -item[1]):
+                other = state.find_player(other_id)
+                rows.append({'rfid': other_id, 'name': other.get('name', other_id) if other else other_id, 'kills': kills})
+            return rows
+
+        victims, killed_by = ranked(victims), ranked(killed_by)
+    return jsonify({
+        'rfid': rfid,
+        'mostKilled': victims[0] if victims else None,
+        'nemesis': killed_by[0] if killed_by else None,
+        'victims': victims,
+        'killedBy': killed_by
+    })
+
+@arena_route('/mvp', methods=['GET'])
+def get_mvp(arena):
+    """Current MVP (most kills, fewest deaths on ties)"""
+    state = arena.state
+    with state.lock:
+        mvp_id = state.ranking.mvp()
+        if mvp_id is None:
+            return jsonify({'error': 'No players registered'}), 404
+        return jsonify(ranked_row(state.find_player(mvp_id), 1))
+
+@arena_route('/analytics', methods=['GET'])
+def get_analytics(arena):
+    """Live match dynamics (?window=<seconds> for momentum, default 30)"""
+    state = arena.state
+    window = max(1.0, min(request.args.get('window', 30, type=float), 3600.0))
     
-    print(f"🏁 Match ended! Winner: {winning_team}, MVP: {mvp['name']}")
-    return jsonify({'success': True, 'message': 'Match ended'})
+    with state.lock:
+        analytics = state.analytics
+        
+        def player_ref(player_id):
+            player = state.find_player(player_id)
+            return {
+                'rfid': player_id,
+                'name': player.get('name', player_id) if player else player_id,
+                'team': f"team{player.get('teamId')}" if player else None
+            }
+        
+        momentum = analytics.momentum(window * 1000)
+        momentum['leader'] = (
+            'team1' if momentum['team1'] > momentum['team2'] else
+            'team2' if momentum['team2'] > momentum['team1'] else 'even'
+        )
+        longest_len, longest_id = analytics.longest_streak()
+        first_blood = analytics.first_blood()
+        result = {
+            'killsPerMinute': analytics.kills_per_minute(),
+            'momentum': momentum,
+            'streaks': {
+                'current': [dict(player_ref(pid), streak=n) for pid, n in analytics.current_streaks()],
+                'longest': dict(player_ref(longest_id), streak=longest_len) if longest_id else None
+            },
+            'firstBlood': dict(player_ref(first_blood[1]), timestamp=first_blood[0]) if first_blood else None,
+            'version': state.version
+        }
+    return jsonify(result)
 
-@app.route('/api/match_status', methods=['GET'])
-def match_status():
+@arena_route('/match_status', methods=['GET'])
+def match_status(arena):
     """Check if match has ended"""
-    return jsonify({'ended': match_state['ended']})
+    return jsonify({'ended': arena.match_state['ended']})
 
-@app.route('/api/victory_data', methods=['GET'])
-def victory_data():
+@arena_route('/victory_data', methods=['GET'])
+def victory_data(arena):
     """Get victory screen data"""
-    if match_state['victory_data']:
-        return jsonify(match_state['victory_data'])
+    if arena.match_state['victory_data']:
+        return jsonify(arena.match_state['victory_data'])
     return jsonify({'error': 'No victory data available'}), 404
 
-@app.route('/api/clear_team', methods=['POST'])
-def clear_team():
+@arena_route('/match_report', methods=['GET'])
+def match_report(arena):
+    """Post-match report (victory data, awards, kill curves, player summaries).
+
+    202 while the worker is still building it after end_match, 500 if that
+    failed (/api/victory_data still has the scores).
+    """
+    entry = arena.match_state['report']
+    if entry is not None:
+        return cached_response(entry, request)
+    if arena.match_state['report_error']:
+        return jsonify({'error': f"Match report failed: {arena.match_state['report_error']}"}), 500
+    if arena.match_state['ended']:
+        response = jsonify({'pending': True})
+        response.headers['Retry-After'] = '1'
+        return response, 202
+    return jsonify({'error': 'No match report available'}), 404
+
+@arena_route('/history/matches', methods=['GET'])
+def get_match_history(arena):
+    """Archived matches of this arena, newest first (?limit=&offset=)"""
+    limit, offset = page_args()
+    return jsonify({'matches': archive.matches(arena.id, limit, offset), 'limit': limit, 'offset': offset})
+
+@app.route('/api/history/matches/<int:match_id>', methods=['GET'])
+def get_archived_match(match_id):
+    """One archived match and its final leaderboard (?limit=&offset=, ?timelines=1)"""
+    limit, offset = page_args(default_limit=50, max_limit=500)
+    found = archive.match(match_id, limit, offset, timelines=request.args.get('timelines') == '1')
+    if found is None:
+        return jsonify({'error': 'Match not found'}), 404
+    match, players = found
+    return jsonify(dict(match, players=players, limit=limit, offset=offset))
+
+@app.route('/api/history/players/<rfid>', methods=['GET'])
+def get_player_history(rfid):
+    """A player's career totals and archived matches, newest first (?limit=&offset=)"""
+    career = archive.career(rfid)
+    if career is None:
+        return jsonify({'error': 'No archived matches for this player'}), 404
+    limit, offset = page_args()
+    return jsonify(dict(career, history=archive.player_history(rfid, limit, offset), limit=limit, offset=offset))
+
+@app.route('/api/history/top', methods=['GET'])
+def get_all_time_top():
+    """All-time top players by career kills (?limit=&offset=)"""
+    limit, offset = page_args()
+    players = archive.top_careers(limit, offset)
+    for i, player in enumerate(players):
+        player['rank'] = offset + i + 1
+        player['kd'] = kd_ratio(player['kills'], player['deaths'])
+    return jsonify({'players': players, 'limit': limit, 'offset': offset})
+
+@app.route('/api/ratings', methods=['GET'])
+def get_ratings():
+    """Skill ratings, highest first (?limit=&offset=)"""
+    limit, offset = page_args()
+    players = archive.top_ratings(limit, offset)
+    for i, player in enumerate(players):
+        player['rank'] = offset + i + 1
+    return jsonify({'players': players, 'limit': limit, 'offset': offset})
+
+@arena_route('/balance', methods=['POST'])
+def balance_teams(arena):
+    """Split a pool of players into two teams of near-equal average skill rating.
+
+    Body: {"rfids": ["RFID", ...], "apply": false}. Players without a rating
+    count as DEFAULT_RATING. With "apply", registered players in the pool
+    are moved to their assigned team (if not already on it).
+    """
+    state = arena.state
+    data = request.json or {}
+    rfids = data.get('rfids')
+    if not isinstance(rfids, list) or len(rfids) < 2:
+        return jsonify({'error': 'rfids must list at least two players'}), 400
+    pool = list(dict.fromkeys(str(rfid) for rfid in rfids))
+    known = archive.ratings(pool)
+    ratings = {rfid: known.get(rfid, (DEFAULT_RATING, 0))[0] for rfid in pool}
+    sides = balance(ratings)
+
+    with state.lock:
+        current = {rfid: state.find_player(rfid) or {} for rfid in pool}
+        names = {rfid: player.get('name') for rfid, player in current.items()}
+        on_team = {rfid: player.get('teamId') for rfid, player in current.items()}
+    teams = {}
+    for team_num, ids in enumerate(sides, start=1):
+        teams[f"team{team_num}"] = {
+            'players': [{'rfid': rfid, 'name': names[rfid], 'rating': ratings[rfid]} for rfid in ids],
+            'rating': round(sum(ratings[rfid] for rfid in ids) / len(ids), 2)
+        }
+
+    moved = 0
+    if data.get('apply'):
+        events = [
+            {'op': 'register', 'id': rfid, 'name': names[rfid], 'teamId': team_num}
+            for team_num, ids in enumerate(sides, start=1) for rfid in ids
+            if names[rfid] is not None and on_team[rfid] != team_num
+        ]
+        state.submit_batch(events)
+        moved = len(events)
+        log.info(f"⚖️ Balanced {len(pool)} players, {moved} registered players reassigned")
+
+    return jsonify(dict(teams, diff=round(abs(teams['team1']['rating'] - teams['team2']['rating']), 2), applied=moved))
+
+@arena_route('/clear_team', methods=['POST'])
+def clear_team(arena):
     """Clear all players from a team"""
+    state = arena.state
     data = request.json
     team = data.get('team')
     team_num = 1 if team == 'team1' else 2
     
-    game_stats = load_game_stats()
-    
-    if 'players' in game_stats:
-        game_stats['players'] = [p for p in game_stats['players'] if p.get('teamId') != team_num]
-    
-    save_game_stats(game_stats)
-    print(f"🗑️ Cleared team {team_num}")
+    state.submit({'op': 'clear_team', 'teamId': team_num})
+    log.info(f"🗑️ Cleared team {team_num}")
     
     return jsonify({'success': True})
 
-@app.route('/api/remove_player', methods=['POST'])
-def remove_player():
+@arena_route('/remove_player', methods=['POST'])
+def remove_player(arena):
     """Remove a single player"""
+    state = arena.state
     data = request.json
     rfid = str(data.get('rfid'))
     
-    game_stats = load_game_stats()
-    
-    if 'players' in game_stats:
-        player = find_player_by_id(game_stats, rfid)
-        if player:
-            player_name = player.get('name', rfid)
-            game_stats['players'] = [p for p in game_stats['players'] if p.get('id') != rfid]
-            save_game_stats(game_stats)
-            print(f"🗑️ Removed player: {player_name}")
-            return jsonify({'success': True})
-    
-    return jsonify({'error': 'Player not found'}), 404
-
-@app.route('/api/registry', methods=['GET'])
-def get_registry():
-    """Get all registered RFIDs"""
-    game_stats = load_game_stats()
-    registry = {}
-    
-    if 'players' in game_stats:
-        for player in game_stats['players']:
-            registry[player.get('id')] = {
-                'name': player.get('name', ''),
-                'team': player.get('teamId', 1)
-            }
+    try:
+        player = state.submit({'op': 'remove', 'id': rfid})
+    except PlayerNotFound:
+        return jsonify({'error': 'Player not found'}), 404
+    
+    log.info(f"🗑️ Removed player: {player.get('name', rfid)}")
+    return jsonify({'success': True})
+
+@arena_route('/registry', methods=['GET'])
+def get_registry(arena):
+    """Get all registered RFIDs.
+
+    With ?limit= or ?cursor= returns one page in RFID order,
+    {"registry": {...}, "nextCursor": ...}, filtered by ?team=, ?college=
+    and ?external=.
+    """
+    if not paging_requested():
+        with arena.state.lock:
+            registry = registry_payload(arena.state)
+        return jsonify(registry)
     
-    return jsonify(registry)
+    limit, cursor = cursor_args()
+    try:
+        keys = roster_filter_keys()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    with arena.state.lock:
+        players, next_cursor = arena.roster.page(keys, cursor, limit)
+        registry = {
+            player['id']: {'name': player.get('name', ''), 'team': player.get('teamId', 1)}
+            for player in players
+        }
+    return jsonify({'registry': registry, 'nextCursor': next_cursor})
+
+@arena_route('/export/players', methods=['GET'])
+def export_players(arena):
+    """Stream every player's registration and match stats as CSV or NDJSON.
+
+    ?format=csv (default) or ndjson, plus the ?team=, ?college= and
+    ?external= filters. Rows are produced a chunk at a time, so memory
+    stays flat however many players there are.
+    """
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'error': f"Unknown format: {export_format}"}), 400
+    try:
+        keys = roster_filter_keys()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    chunks = arena.roster.chunks(keys, export_row, EXPORT_CHUNK)
+    
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        for rows in chunks:
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    
+    def generate_ndjson():
+        for rows in chunks:
+            yield ''.join(json.dumps(dict(zip(EXPORT_FIELDS, row)), separators=(',', ':')) + '\n' for row in rows)
+    
+    if export_format == 'csv':
+        response = Response(generate_csv(), mimetype='text/csv')
+    else:
+        response = Response(generate_ndjson(), mimetype='application/x-ndjson')
+    response.headers['Content-Disposition'] = f'attachment; filename="players-{arena.id}.{export_format}"'
+    return response
+
+@arena_route('/export', methods=['GET'])
+def export_stats(arena):
+    """Download the arena's state as readable JSON (game_stats.json layout)"""
+    response = Response(arena.state.export(), mimetype='application/json')
+    response.headers['Content-Disposition'] = f'attachment; filename="game_stats-{arena.id}.json"'
+    return response
+
+@socketio.on('connect')
+def on_connect():
+    """Send a full snapshot to every (re)connecting display.
+
+    Displays pick their arena with ?arena=<id> on the Socket.IO URL (the
+    default arena otherwise) and only get that arena's frames.
+    """
+    arena = arenas.get(request.args.get('arena', DEFAULT_ARENA))
+    if arena is None:
+        return False
+    join_room(arena.room)
+    emit('leaderboard_snapshot', live_snapshot(arena.state))
+    emit('match_status', {'ended': arena.match_state['ended']})
+
+@socketio.on('resync')
+def on_resync():
+    """Client asked for a full snapshot (e.g. after it missed frames)"""
+    on_connect()
 
 @app.route('/admin')
 def admin():
@@ -381,4 +1067,7 @@ if __name__ == '__main__':
     print("🔥 Blaze Server Starting...")
     print("📡 Backend API: http://0.0.0.0:5000")
     print("👑 Admin Panel: http://0.0.0.0:5000/admin")
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    print("📈 Metrics: http://0.0.0.0:5000/metrics")
+    # Dev server; allow it when stdin is not a TTY (e.g. started in the background). No reloader:
+    # its parent process would import this module too and compact the same event log and snapshot
+    socketio.run(app, host='0.0.0.0', port=5000, debug=True, use_reloader=False, allow_unsafe_werkzeug=True)
\ No newline at end of file
@@ -0,0 +1,188 @@
+import logging
+import mmap
+import os
+import struct
+import time
+
+log = logging.getLogger('blaze.shared_snapshot')
+
+MAGIC = b'BLZ1'
+SECTIONS = ('players', 'registry', 'match_status')
+# magic, flags, seq, version, then (offset, length) per section
+HEADER = struct.Struct('<4sIQQ' + 'QQ' * len(SECTIONS))
+SEQ = struct.Struct('<Q')
+SEQ_OFFSET = 8
+FLAG_SUPERSEDED = 1
+
+
+def snapshot_path(directory, arena_id):
+    return os.path.join(directory, f"blaze-{arena_id}.snapshot")
+
+
+class TornRead(RuntimeError):
+    """Raised when a consistent snapshot could not be read in time"""
+
+
+class SnapshotWriter:
+    """Publishes pre-serialized response bodies into a memory-mapped file.
+
+    The file is a fixed header followed by the section bytes. The header
+    holds a seqlock counter: ``publish()`` makes it odd, writes the
+    sections, their (offset, length) table and the state version, then
+    makes it even again. Readers in other processes copy what they need and
+    accept it only if they saw the same even counter before and after.
+    When the sections outgrow the mapping a bigger file is renamed into
+    place and the old one is flagged superseded, so readers reopen.
+
+    There is exactly one writer per file (the process that owns the arena).
+    """
+
+    def __init__(self, path, capacity=1 << 20):
+        self.path = path
+        self._mm = None
+        self._seq = 0
+        self._open(capacity)
+
+    def _open(self, capacity, in_progress=False):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.truncate(HEADER.size + capacity)
+        with open(tmp_path, 'r+b') as f:
+            mm = mmap.mmap(f.fileno(), 0)
+        if in_progress:
+            # Readers that switch over wait for the publish that caused the move
+            self._seq += 1
+        HEADER.pack_into(mm, 0, MAGIC, 0, self._seq, 0, *([0] * 2 * len(SECTIONS)))
+        old, self._mm = self._mm, mm
+        if old is None and os.path.exists(self.path):
+            # Left by a previous writer process; readers may still map it
+            with open(self.path, 'r+b') as f:
+                old = mmap.mmap(f.fileno(), 0)
+        os.replace(tmp_path, self.path)
+        if old is not None:
+            struct.pack_into('<I', old, 4, FLAG_SUPERSEDED)
+            old.close()
+
+    @property
+    def capacity(self):
+        return len(self._mm) - HEADER.size
+
+    def publish(self, version, sections):
+        """sections: {name: bytes} for every name in SECTIONS"""
+        bodies = [sections[name] for name in SECTIONS]
+        needed = sum(len(b) for b in bodies)
+        if needed > self.capacity:
+            capacity = self.capacity
+            while capacity < needed * 2:
+                capacity *= 2
+            self._open(capacity, in_progress=True)
+
+        mm = self._mm
+        if self._seq % 2 == 0:
+            self._seq += 1  # odd: write in progress
+            SEQ.pack_into(mm, SEQ_OFFSET, self._seq)
+        table = []
+        offset = 0
+        for body in bodies:
+            mm[HEADER.size + offset:HEADER.size + offset + len(body)] = body
+            table += [offset, len(body)]
+            offset += len(body)
+        HEADER.pack_into(mm, 0, MAGIC, 0, self._seq, version, *table)
+        self._seq += 1  # even: consistent again
+        SEQ.pack_into(mm, SEQ_OFFSET, self._seq)
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+
+class SnapshotReader:
+    """Lock-free reader of a SnapshotWriter file (any number of processes)"""
+
+    def __init__(self, path, max_attempts=1000):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._mm = None
+
+    def _reopen(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        try:
+            with open(self.path, 'rb') as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return False
+        return True
+
+    def read(self, section):
+        """(version, body bytes) of one section; None if nothing is published yet"""
+        index = SECTIONS.index(section)
+        for attempt in range(self.max_attempts):
+            if self._mm is None and not self._reopen():
+                return None
+            mm = self._mm
+            magic, flags, seq, version, *table = HEADER.unpack_from(mm, 0)
+            if magic != MAGIC:
+                return None
+            if flags & FLAG_SUPERSEDED:
+                self._reopen()
+                continue
+            if seq == 0:
+                return None
+            if seq % 2:
+                # Writer is mid-publish; let it finish
+                time.sleep(0 if attempt < 100 else 0.0001)
+                continue
+            offset, length = table[2 * index], table[2 * index + 1]
+            body = mm[HEADER.size + offset:HEADER.size + offset + length]
+            if SEQ.unpack_from(mm, SEQ_OFFSET)[0] == seq and len(body) == length:
+                return version, body
+        raise TornRead(f"no consistent snapshot of {self.path} after {self.max_attempts} attempts")
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+
+class SnapshotPublisher:
+    """Keeps one SnapshotWriter current from the owning process.
+
+    A background task wakes every ``interval`` seconds and republishes when
+    ``key_fn()`` (state version, match status, ...) changed since the last
+    publish; ``sections_fn()`` returns ``(version, {section: bytes})``.
+    Bursts of events therefore cost one publish per interval.
+    """
+
+    def __init__(self, socketio, writer, key_fn, sections_fn, interval=0.05):
+        self.socketio = socketio
+        self.writer = writer
+        self.key_fn = key_fn
+        self.sections_fn = sections_fn
+        self.interval = interval
+        self._published = None
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self.publish()
+            self._task = self.socketio.start_background_task(self._run)
+
+    def publish(self):
+        key = self.key_fn()
+        if key == self._published:
+            return False
+        version, sections = self.sections_fn()
+        self.writer.publish(version, sections)
+        self._published = key
+        return True
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.interval)
+            try:
+                self.publish()
+            except Exception as e:
+                log.error(f"❌ Snapshot publish error: {e}")
@@ -1,198 +1,260 @@
-import random
-import time
-import requests
-from datetime import datetime
+import argparse
+import asyncio
 import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import count, groupby
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 API_URL = 'http://localhost:5000'
 GAME_DURATION = 60
+WORKERS = 16
+REQUEST_TIMEOUT = 2  # short: a lost response is retried, and the server replays it instead of re-applying
 
-def load_game_data():
+def load_game_data(path='game_stats.json'):
     """Load player data from game_stats.json (new format with players array)"""
     try:
-        with open('game_stats.json', 'r') as f:
+        with open(path, 'r') as f:
             data = json.load(f)
             # Check if 'players' key exists in the new format
             if 'players' not in data:
-                print("❌ ERROR: No 'players' array found in game_stats.json!")
+                print(f"❌ ERROR: No 'players' array found in {path}!")
                 print("Expected format: {'players': [...], 'gameIsActive': false, ...}")
                 return None
             return data
     except FileNotFoundError:
-        print("❌ ERROR: game_stats.json not found!")
+        print(f"❌ ERROR: {path} not found!")
         return None
     except json.JSONDecodeError as e:
-        print(f"❌ ERROR: Invalid JSON in game_stats.json: {e}")
+        print(f"❌ ERROR: Invalid JSON in {path}: {e}")
         return None
 
-def register_all_players(game_data):
-    """Register all players from the players array"""
-    print("\n📝 Registering players...")
-    
-    for player in game_data['players']:
-        team = f"team{player['teamId']}"
-        
-        response = requests.post(f'{API_URL}/api/register', json={
-            'rfid': player['id'],
-            'name': player['name'],
-            'team': team
-        })
-        
-        if response.ok:
-            print(f"  ✓ {player['name']} registered ({player['id']}, Team {player['teamId']})")
-        else:
-            print(f"  ✗ Failed to register {player['name']}: {response.text}")
-        
-        time.sleep(0.1)
-
-def simulate_kill(killer_rfid):
-    """Simulate a kill event"""
-    try:
-        response = requests.post(f'{API_URL}/api/kill', json={'rfid': killer_rfid})
-        return response.ok
-    except Exception as e:
-        print(f"  ❌ Kill error for {killer_rfid}: {e}")
-        return False
-
-def simulate_death(victim_rfid):
-    """Simulate a death event"""
-    try:
-        response = requests.post(f'{API_URL}/api/death', json={'rfid': victim_rfid})
-        return response.ok
-    except Exception as e:
-        print(f"  ❌ Death error for {victim_rfid}: {e}")
-        return False
-
-def build_event_timeline(game_data):
+def build_event_timeline(game_data, id_prefix=''):
     """Build chronological timeline of all kill/death events from timestamps"""
     events = []
-    
-    # Collect all kill events
-    for player in game_data['players']:
-        for timestamp in player.get('killTimestamps', []):
-            events.append({
-                'type': 'kill',
-                'timestamp': timestamp,
-                'player_id': player['id'],
-                'player_name': player['name']
-            })
-    
-    # Collect all death events
+
     for player in game_data['players']:
-        for timestamp in player.get('deathTimestamps', []):
-            events.append({
-                'type': 'death',
-                'timestamp': timestamp,
-                'player_id': player['id'],
-                'player_name': player['name']
-            })
-    
+        for kind, key in (('kill', 'killTimestamps'), ('death', 'deathTimestamps')):
+            for timestamp in player.get(key, []):
+                events.append({
+                    'type': kind,
+                    'timestamp': timestamp,
+                    'player_id': f"{id_prefix}{player['id']}",
+                    'player_name': player['name']
+                })
+
     # Sort by timestamp (chronological order)
     events.sort(key=lambda x: x['timestamp'])
-    
+
     return events
 
-def run_simulation():
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))]
+
+
+class ReplayEngine:
+    """Replays recorded matches against the API on absolute deadlines.
+
+    Events are grouped by game timestamp. Each group gets a deadline of
+    ``start + timestamp / speed`` on the asyncio loop clock, so waiting never
+    accumulates drift, and long quiet gaps are honoured exactly. A group is
+    dispatched without waiting for earlier groups to finish, either as one
+    /api/events batch or as concurrent /api/kill|death calls, over a pooled
+    keep-alive session (blocking requests run in a bounded thread pool).
+    ``speed=None`` replays as fast as possible. Several matches can be
+    replayed at once; each gets its own scheduler.
+    """
+
+    def __init__(self, api_url=API_URL, speed=1.0, batch=True, workers=WORKERS, verbose=True):
+        self.api_url = api_url
+        self.speed = speed
+        self.batch = batch
+        self.verbose = verbose
+        self.session = requests.Session()
+        # Every request carries (source, sequence), so retrying a POST can't double-count
+        retry = Retry(total=5, backoff_factor=0.1, allowed_methods=None, status_forcelist=[502, 503, 504])
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retry))
+        self.source = f"sim-{uuid.uuid4().hex[:12]}"
+        self.sequence = count(1)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.timing_errors = []
+        self.sent = 0
+        self.ok = 0
+
+    def _post(self, path, payload):
+        try:
+            response = self.session.post(f'{self.api_url}{path}', json=payload, timeout=REQUEST_TIMEOUT, headers={
+                'X-Source': self.source, 'X-Sequence': str(next(self.sequence))
+            })
+        except requests.RequestException as e:
+            print(f"  ❌ {path} error: {e}")
+            return None
+        return response
+
+    async def post(self, path, payload):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._post, path, payload)
+
+    async def register(self, game_data, id_prefix=''):
+        response = await self.post('/api/register_bulk', {'players': [
+            {'rfid': f"{id_prefix}{p['id']}", 'name': p['name'], 'team': f"team{p['teamId']}"}
+            for p in game_data['players']
+        ]})
+        if response is None or not response.ok:
+            raise RuntimeError('Failed to register players')
+        print(f"📝 Registered {len(game_data['players'])} players{f' ({id_prefix})' if id_prefix else ''}")
+
+    async def dispatch(self, group):
+        """Send one group of simultaneous events; returns how many were applied"""
+        self.sent += len(group)
+        if self.batch:
+            response = await self.post('/api/events', {'events': [
+                {'type': e['type'], 'rfid': e['player_id'], 'timestamp': e['timestamp']} for e in group
+            ]})
+            applied = [r['success'] for r in response.json()['results']] if response is not None and response.ok else [False] * len(group)
+        else:
+            responses = await asyncio.gather(*(
+                self.post(f"/api/{e['type']}", {'rfid': e['player_id'], 'timestamp': e['timestamp']})
+                for e in group
+            ))
+            applied = [r is not None and r.ok for r in responses]
+
+        for event, success in zip(group, applied):
+            if self.verbose:
+                now = datetime.now().strftime('%H:%M:%S')
+                if success:
+                    icon, action = ("⚔️", "got a kill") if event['type'] == 'kill' else ("💀", "died")
+                    print(f"[{now}] {icon} {event['player_name']} {action} (game time: {event['timestamp']/1000:.1f}s)")
+                else:
+                    print(f"[{now}] ❌ Failed: {event['player_name']} {event['type']}")
+        self.ok += sum(applied)
+
+    async def replay_match(self, events, start):
+        loop = asyncio.get_running_loop()
+        inflight = []
+        for timestamp, group in groupby(events, key=lambda e: e['timestamp']):
+            group = list(group)
+            deadline = start + (timestamp / 1000.0 / self.speed if self.speed else 0.0)
+            delay = deadline - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.timing_errors.append(loop.time() - deadline)
+            inflight.append(asyncio.create_task(self.dispatch(group)))
+        await asyncio.gather(*inflight)
+
+    async def run(self, matches):
+        """matches: list of (game_data, id_prefix)"""
+        for game_data, prefix in matches:
+            await self.register(game_data, prefix)
+        timelines = [build_event_timeline(game_data, prefix) for game_data, prefix in matches]
+
+        loop = asyncio.get_running_loop()
+        start = loop.time() + 0.1
+        await asyncio.gather(*(self.replay_match(events, start) for events in timelines))
+        return loop.time() - start
+
+    def report(self, duration, intended):
+        errors = sorted(e * 1000 for e in self.timing_errors)
+        return {
+            'events': self.sent,
+            'applied': self.ok,
+            'actualDurationSec': round(duration, 3),
+            'intendedDurationSec': round(intended, 3),
+            'timingErrorMs': {
+                'mean': round(sum(errors) / len(errors), 3) if errors else 0.0,
+                'p50': round(percentile(errors, 50), 3),
+                'p95': round(percentile(errors, 95), 3),
+                'max': round(errors[-1], 3) if errors else 0.0,
+            }
+        }
+
+
+def run_simulation(paths=('game_stats.json',), speed=None, batch=True, verbose=True):
     print("\n" + "="*60)
     print("🔥 BLAZE GAME SIMULATION - TIMESTAMP-BASED REPLAY")
     print("="*60)
-    
-    # Load game data
-    game_data = load_game_data()
-    if not game_data:
-        return
-    
-    # Register all players
-    register_all_players(game_data)
-    
-    # Build event timeline
-    events = build_event_timeline(game_data)
-    
-    if not events:
-        print("\n⚠️ No events found in game_stats.json!")
+
+    matches = []
+    for i, path in enumerate(paths):
+        game_data = load_game_data(path)
+        if not game_data:
+            return None
+        # Several matches at once would share RFIDs; keep them apart
+        matches.append((game_data, f"M{i + 1}-" if len(paths) > 1 else ''))
+
+    max_timestamp = max(
+        (e['timestamp'] for game_data, _ in matches for e in build_event_timeline(game_data)), default=0
+    )
+    if not max_timestamp:
+        print("\n⚠️ No events found!")
         print("Make sure players have killTimestamps and deathTimestamps arrays.")
-        return
-    
-    print(f"\n🎮 Starting simulation with {len(events)} events...")
-    print(f"📊 Total players: {len(game_data['players'])}")
-    print(f"⚔️ Events to replay: {len(events)}\n")
-    
-    # Calculate time scaling factor to fit in GAME_DURATION
-    max_timestamp = max(e['timestamp'] for e in events) if events else 0
-    time_scale = GAME_DURATION / (max_timestamp / 1000.0) if max_timestamp > 0 else 1.0
-    
+        return None
+
+    # Default: compress the whole match into GAME_DURATION seconds
+    if speed == 'fit':
+        speed = (max_timestamp / 1000.0) / GAME_DURATION
+    intended = max_timestamp / 1000.0 / speed if speed else 0.0
+
     print(f"⏱️  Original game duration: {max_timestamp/1000:.1f}s")
-    print(f"⏱️  Time scale: {time_scale:.3f}x (compressed to {GAME_DURATION}s)\n")
-    
-    start_time = time.time()
-    event_count = 0
-    last_timestamp = 0
-    
-    # Replay each event
-    for event in events:
-        # Calculate wait time based on timestamp difference
-        timestamp_seconds = event['timestamp'] / 1000.0
-        wait_time = (timestamp_seconds - last_timestamp) * time_scale
-        last_timestamp = timestamp_seconds
-        
-        # Wait until it's time for this event
-        if wait_time > 0:
-            time.sleep(min(wait_time, 5.0))  # Cap at 5s for safety
-        
-        elapsed = time.time() - start_time
-        
-        # Stop if we've exceeded game duration (with 20% buffer)
-        if elapsed >= GAME_DURATION * 1.2:
-            print(f"\n⏰ Simulation time limit reached")
-            break
-        
-        # Execute the event
-        success = False
-        if event['type'] == 'kill':
-            success = simulate_kill(event['player_id'])
-            icon = "⚔️"
-            action = "got a kill"
-        else:  # death
-            success = simulate_death(event['player_id'])
-            icon = "💀"
-            action = "died"
-        
-        if success:
-            event_count += 1
-            timestamp = datetime.now().strftime('%H:%M:%S')
-            game_time = f"{event['timestamp']/1000:.1f}s"
-            print(f"[{timestamp}] {icon} {event['player_name']} {action} (game time: {game_time})")
-        else:
-            timestamp = datetime.now().strftime('%H:%M:%S')
-            print(f"[{timestamp}] ❌ Failed: {event['player_name']} {action}")
-        
-        time.sleep(0.05)  # Small delay for readability
-    
+    print(f"⏱️  Speed: {f'{speed:.3f}x' if speed else 'as fast as possible'} ({len(matches)} match(es))\n")
+
+    engine = ReplayEngine(speed=speed, batch=batch, verbose=verbose)
+    duration = asyncio.run(engine.run(matches))
+    result = engine.report(duration, intended)
+
     # Summary
     print("\n" + "="*60)
     print(f"✅ SIMULATION COMPLETE!")
-    print(f"📊 Total events replayed: {event_count}/{len(events)}")
-    print(f"⏱️  Actual duration: {time.time() - start_time:.1f}s")
-    print(f"🏆 Team 1 Score: {game_data.get('team1Score', 'N/A')}")
-    print(f"🏆 Team 2 Score: {game_data.get('team2Score', 'N/A')}")
+    print(f"📊 Total events replayed: {result['applied']}/{result['events']}")
+    print(f"⏱️  Actual duration: {result['actualDurationSec']:.1f}s (intended {result['intendedDurationSec']:.1f}s)")
+    print(f"🎯 Timing error: mean {result['timingErrorMs']['mean']:.1f}ms, "
+          f"p95 {result['timingErrorMs']['p95']:.1f}ms, max {result['timingErrorMs']['max']:.1f}ms")
     print(f"🌐 View leaderboard at: http://localhost:5173")
     print("="*60 + "\n")
+    return result
+
+def parse_speed(value):
+    if value == 'max':
+        return None
+    if value == 'fit':
+        return 'fit'
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError('speed must be positive')
+    return speed
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay recorded matches against the Blaze API')
+    parser.add_argument('matches', nargs='*', default=['game_stats.json'], help='match files to replay (concurrently)')
+    parser.add_argument('--speed', type=parse_speed, default='fit',
+                        help=f"playback multiplier, 'max' for as fast as possible, 'fit' (default) to fit {GAME_DURATION}s")
+    parser.add_argument('--no-batch', action='store_true', help='send simultaneous events as separate requests')
+    parser.add_argument('--quiet', action='store_true', help='no per-event output')
+    parser.add_argument('--json', action='store_true', help='print the timing report as JSON')
+    args = parser.parse_args()
+
     try:
         # Check if server is running
         try:
             requests.get(f'{API_URL}/api/players', timeout=2)
-        except:
+        except requests.RequestException:
             print("\n❌ ERROR: Server not running!")
             print(f"Please start server.py first: python server.py")
             exit(1)
-        
-        run_simulation()
-        
+
+        result = run_simulation(args.matches, args.speed, not args.no_batch, not args.quiet)
+        if args.json and result:
+            print(json.dumps(result, indent=2))
+
     except KeyboardInterrupt:
         print("\n\n⏹️  Simulation stopped by user")
     except Exception as e:
         print(f"\n❌ Unexpected error: {e}")
         import traceback
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
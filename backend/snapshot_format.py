@@ -0,0 +1,146 @@
+"""Schema-versioned compact snapshot encoding for GameState.
+
+A snapshot file is a small binary container:
+
+    header   magic b'BLZS', schema version (u16), metadata length (u32)
+    metadata minified UTF-8 JSON: every top-level field plus the players
+             without their timelines; each player carries 't': [kills, deaths],
+             the lengths of its two timelines
+    arrays   the kill then death timeline of each player, in roster order,
+             as raw little-endian int64
+
+Timelines decode straight into ``array('q')`` with no per-number parsing.
+Readers reject files with a newer schema than they know and upgrade older
+ones through ``UPGRADES``.
+
+    python snapshot_format.py export game_stats.snap -o game_stats.json
+    python snapshot_format.py import game_stats.json -o game_stats.snap
+"""
+import argparse
+import json
+import struct
+import sys
+from array import array
+
+from analytics import compact_timeline
+
+MAGIC = b'BLZS'
+SCHEMA_VERSION = 1
+HEADER = struct.Struct('<4sHxxI')
+TIMELINES = ('killTimestamps', 'deathTimestamps')
+
+# schema version -> fn(metadata) upgrading it to version + 1
+UPGRADES = {}
+
+
+def empty_stats():
+    """Fresh game_stats structure"""
+    return {'players': [], 'gameIsActive': False, 'team1Score': 0, 'team2Score': 0}
+
+
+def _to_le(timeline):
+    if sys.byteorder == 'big':
+        timeline = array('q', timeline)
+        timeline.byteswap()
+    return timeline.tobytes()
+
+
+def encode_snapshot(snapshot):
+    """Snapshot dict (players with array('q') timelines) to bytes"""
+    players = []
+    blobs = []
+    for player in snapshot['players']:
+        meta = {k: v for k, v in player.items() if k not in TIMELINES}
+        meta['t'] = [len(player[key]) for key in TIMELINES]
+        players.append(meta)
+        blobs.extend(_to_le(player[key]) for key in TIMELINES)
+    metadata = dict(snapshot, players=players)
+    meta_bytes = json.dumps(metadata, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return b''.join([HEADER.pack(MAGIC, SCHEMA_VERSION, len(meta_bytes)), meta_bytes] + blobs)
+
+
+def decode_snapshot(payload):
+    """Bytes from encode_snapshot() back to a snapshot dict with array('q') timelines"""
+    view = memoryview(payload)
+    magic, schema, meta_len = HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ValueError('Not a Blaze snapshot')
+    if schema > SCHEMA_VERSION:
+        raise ValueError(f"Snapshot schema v{schema} is newer than this server (v{SCHEMA_VERSION})")
+    offset = HEADER.size
+    metadata = json.loads(bytes(view[offset:offset + meta_len]))
+    offset += meta_len
+    while schema < SCHEMA_VERSION:
+        metadata = UPGRADES[schema](metadata)
+        schema += 1
+
+    for player in metadata['players']:
+        for key, count in zip(TIMELINES, player.pop('t')):
+            timeline = array('q')
+            timeline.frombytes(view[offset:offset + count * 8])
+            if sys.byteorder == 'big':
+                timeline.byteswap()
+            player[key] = timeline
+            offset += count * 8
+    return metadata
+
+
+def read_legacy_json(path):
+    """Read a game_stats.json (either JSON format) as a snapshot dict"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+
+    if 'players' in data and isinstance(data['players'], list):
+        players = data['players']
+    else:
+        # Oldest format: {rfid: {team, name, kills, deaths}}
+        players = [
+            {
+                'id': rfid,
+                'teamId': stats.get('team', 1),
+                'name': stats.get('name', rfid),
+                'kills': stats.get('kills', 0),
+                'deaths': stats.get('deaths', 0)
+            }
+            for rfid, stats in data.items()
+            if isinstance(stats, dict)  # Skip non-player keys
+        ]
+        data = empty_stats()
+    for player in players:
+        for key in TIMELINES:
+            player[key] = compact_timeline(player.get(key, []))
+    return dict(data, players=players)
+
+
+def export_json(snapshot, indent=2):
+    """Human-readable JSON in the legacy game_stats.json layout"""
+    return json.dumps(
+        snapshot, indent=indent, ensure_ascii=False,
+        default=lambda v: v.tolist() if isinstance(v, array) else str(v)
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['export', 'import'])
+    parser.add_argument('source')
+    parser.add_argument('-o', '--output', help='output file (export defaults to stdout)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        with open(args.source, 'rb') as f:
+            text = export_json(decode_snapshot(f.read()))
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(text + '\n')
+        else:
+            print(text)
+    else:
+        if not args.output:
+            parser.error('import needs -o <snapshot file>')
+        with open(args.output, 'wb') as f:
+            f.write(encode_snapshot(read_legacy_json(args.source)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else came in through extra={...}
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg plus any extra fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        entry.update((k, v) for k, v in vars(record).items() if k not in _STANDARD_ATTRS)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+_listener = None
+
+
+def flush_logging():
+    """Write out every queued record and stop the writer (for exits that skip atexit)"""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+def setup_logging(level=None, fmt=None):
+    """Route the 'blaze' loggers through a queue to a background writer.
+
+    Callers only enqueue the record; a QueueListener thread formats it and
+    writes to stderr, so a request thread never blocks on output. Level and
+    format come from BLAZE_LOG_LEVEL (default INFO) and BLAZE_LOG_FORMAT
+    ('json', the default, or 'text'). Safe to call more than once.
+    """
+    global _listener
+    logger = logging.getLogger('blaze')
+    if any(isinstance(h, QueueHandler) for h in logger.handlers):
+        return logger
+
+    handler = logging.StreamHandler(sys.stderr)
+    if (fmt or os.environ.get('BLAZE_LOG_FORMAT', 'json')) == 'text':
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    else:
+        handler.setFormatter(JsonFormatter())
+
+    records = queue.SimpleQueue()
+    _listener = QueueListener(records, handler)
+    _listener.start()
+    atexit.register(flush_logging)
+
+    logger.setLevel((level or os.environ.get('BLAZE_LOG_LEVEL', 'INFO')).upper())
+    logger.addHandler(QueueHandler(records))
+    logger.propagate = False
+    return logger
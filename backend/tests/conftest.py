@@ -0,0 +1,36 @@
+import itertools
+import os
+import sys
+
+import pytest
+
+# The backend is a flat set of modules run from backend/; import them the same way
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_arena_ids = itertools.count(1)
+
+
+@pytest.fixture(scope='session')
+def server(tmp_path_factory):
+    """server.py imported once, with its files in a scratch directory"""
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('server'))
+    os.environ.setdefault('BLAZE_LOG_LEVEL', 'WARNING')
+    try:
+        import server
+        yield server
+        server.arenas.stop()
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def client(server):
+    return server.app.test_client()
+
+
+@pytest.fixture
+def arena(server):
+    """URL prefix of a fresh arena, so tests do not see each other's players"""
+    arena, _ = server.arenas.create(f"test{next(_arena_ids)}")
+    return f"/api/arenas/{arena.id}"
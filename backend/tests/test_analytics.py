@@ -0,0 +1,62 @@
+import pytest
+
+from analytics import MatchAnalytics
+from game_state import DuplicateHit, GameState
+
+
+def make_state(tmp_path):
+    state = GameState(str(tmp_path / 'stats.bin'), str(tmp_path / 'events.log'))
+    for rfid, team in (('A', 1), ('B', 1), ('X', 2)):
+        state.submit({'op': 'register', 'id': rfid, 'name': rfid, 'teamId': team})
+    return state
+
+
+def test_teammates_killing_in_the_same_millisecond_both_count():
+    analytics = MatchAnalytics()
+    analytics.record_kill({'id': 'A', 'teamId': 1}, 60000)
+    analytics.record_kill({'id': 'B', 'teamId': 1}, 60000)
+    assert analytics.momentum(10000)['team1'] == 2
+    assert analytics.kills_per_minute()['team1'] == [0, 2]
+
+
+def test_events_in_the_same_millisecond_all_count(tmp_path):
+    state = make_state(tmp_path)
+    try:
+        for event in ({'op': 'kill', 'id': 'A', 'ts': 5}, {'op': 'kill', 'id': 'A', 'ts': 5},
+                      {'op': 'kill', 'id': 'A'}, {'op': 'hit', 'shooter': 'X', 'victim': 'A', 'ts': 7},
+                      {'op': 'hit', 'shooter': 'X', 'victim': 'B', 'ts': 7}):
+            state.submit(event)
+        a, x = state.find_player('A'), state.find_player('X')
+        assert a['kills'] == 3 and list(a['killTimestamps']) == [5, 5]
+        assert x['kills'] == 2 and list(x['killTimestamps']) == [7, 7]
+        assert x['victims'] == {'A': 1, 'B': 1}
+        assert state.analytics.momentum(1000)['team2'] == 2
+    finally:
+        state.stop()
+
+
+def test_repeated_hit_id_is_rejected(tmp_path):
+    state = make_state(tmp_path)
+    try:
+        state.submit({'op': 'hit', 'shooter': 'A', 'victim': 'X', 'ts': 7, 'hitId': 'A:1'})
+        version = state.version
+        with pytest.raises(DuplicateHit):
+            state.submit({'op': 'hit', 'shooter': 'A', 'victim': 'X', 'ts': 7, 'hitId': 'A:1'})
+        state.submit({'op': 'hit', 'shooter': 'A', 'victim': 'X', 'ts': 7, 'hitId': 'A:2'})
+        a, x = state.find_player('A'), state.find_player('X')
+        assert (a['kills'], x['deaths'], a['victims']) == (2, 2, {'X': 2})
+        assert state.version == version + 1
+    finally:
+        state.stop()
+
+
+def test_removed_player_leaves_streaks_and_first_blood(tmp_path):
+    state = make_state(tmp_path)
+    try:
+        state.submit({'op': 'kill', 'id': 'X', 'ts': 1})
+        state.submit({'op': 'kill', 'id': 'A', 'ts': 2})
+        state.submit({'op': 'remove', 'id': 'X'})
+        assert state.analytics.first_blood() == (2, 'A')
+        assert state.analytics.current_streaks() == [('A', 1)]
+    finally:
+        state.stop()
@@ -0,0 +1,41 @@
+import itertools
+
+_ids = itertools.count(1)
+
+
+def new_arena(client):
+    arena_id = f"iso{next(_ids)}"
+    response = client.post('/api/arenas', json={'id': arena_id})
+    assert response.status_code == 201 and response.get_json()['created']
+    return f"/api/arenas/{arena_id}"
+
+
+def roster(client, arena):
+    board = client.get(f'{arena}/players').get_json()
+    return {p['rfid']: (p['kills'], p['deaths']) for p in board['team1'] + board['team2']}
+
+
+def test_arenas_keep_separate_rosters_and_matches(client):
+    first, second = new_arena(client), new_arena(client)
+    for arena in (first, second):
+        client.post(f'{arena}/register', json={'rfid': 'A', 'name': 'A', 'team': 'team1'})
+        client.post(f'{arena}/register', json={'rfid': 'X', 'name': 'X', 'team': 'team2'})
+    client.post(f'{first}/register', json={'rfid': 'B', 'name': 'B', 'team': 'team1'})
+    client.post(f'{first}/hit', json={'shooter': 'A', 'victim': 'X'})
+
+    assert roster(client, first) == {'A': (1, 0), 'B': (0, 0), 'X': (0, 1)}
+    assert roster(client, second) == {'A': (0, 0), 'X': (0, 0)}
+    assert client.post(f'{second}/kill', json={'rfid': 'B'}).status_code == 404
+
+    client.post(f'{second}/end_match')
+    assert client.get(f'{second}/match_status').get_json()['ended']
+    assert not client.get(f'{first}/match_status').get_json()['ended']
+
+    client.post(f'{first}/reset')
+    assert roster(client, first) == {'A': (0, 0), 'B': (0, 0), 'X': (0, 0)}
+    assert client.get(f'{second}/match_status').get_json()['ended']
+
+
+def test_unknown_arena_is_404(client):
+    assert client.get('/api/arenas/missing/players').status_code == 404
+    assert client.post('/api/arenas', json={'id': '../etc'}).status_code == 400
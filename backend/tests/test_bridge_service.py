@@ -0,0 +1,96 @@
+from bridge_service import Bridge
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        return FakeCursor(sorted(self.docs, key=lambda d: d[key], reverse=direction < 0))
+
+    def limit(self, n):
+        return FakeCursor(self.docs[:n])
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+class FakeCollection:
+    """The slice of a pymongo collection the bridge polls"""
+
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+
+    def find(self, query):
+        low = query.get('game_no', {}).get('$gte')
+        return FakeCursor([d for d in self.docs if low is None or d['game_no'] >= low])
+
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self):
+        self.pushes = []
+
+    def post(self, url, json, timeout):
+        self.pushes.append(json)
+        return FakeResponse()
+
+
+def game(no, *rolls):
+    return {'game_no': no, 'team_one': [{'rollNumber': r, 'name': f'P{r}'} for r in rolls], 'team_two': []}
+
+
+def make_bridge(collection, checkpoint):
+    session = FakeSession()
+    return Bridge(collection, checkpoint_file=str(checkpoint), session=session), session
+
+
+def test_first_run_registers_only_the_newest_game(tmp_path):
+    games = FakeCollection(game(no, f'R{no}') for no in range(1, 6))
+    bridge, session = make_bridge(games, tmp_path / 'cp.json')
+    bridge.poll_once()
+    assert [[p['rfid'] for p in push['players']] for push in session.pushes] == [['R5']]
+    assert bridge.game_no == 5
+
+    bridge.poll_once()
+    assert len(session.pushes) == 1
+
+
+def test_first_run_with_no_games_waits_for_one(tmp_path):
+    games = FakeCollection()
+    bridge, session = make_bridge(games, tmp_path / 'cp.json')
+    bridge.poll_once()
+    assert session.pushes == [] and bridge.game_no is None
+
+    games.docs.append(game(7, 'A'))
+    bridge.poll_once()
+    assert [p['rfid'] for p in session.pushes[0]['players']] == ['A']
+
+
+def test_resume_from_checkpoint_pushes_only_changes(tmp_path):
+    games = FakeCollection([game(1, 'A'), game(2, 'B', 'C')])
+    bridge, _ = make_bridge(games, tmp_path / 'cp.json')
+    bridge.poll_once()
+
+    games.docs[1] = game(2, 'B', 'D')
+    restarted, session = make_bridge(games, tmp_path / 'cp.json')
+    assert restarted.game_no == 2
+    restarted.poll_once()
+    assert session.pushes == [{'players': [{'rfid': 'D', 'name': 'PD', 'team': 'team1'}], 'remove': ['C']}]
+
+
+def test_new_game_is_registered_in_full(tmp_path):
+    games = FakeCollection([game(1, 'A', 'B')])
+    bridge, session = make_bridge(games, tmp_path / 'cp.json')
+    bridge.poll_once()
+
+    games.docs.append(game(2, 'B', 'C'))
+    bridge.poll_once()
+    assert bridge.game_no == 2
+    # Not diffed against the previous game: everyone in it is (re-)registered, nobody removed
+    assert session.pushes[-1] == {'players': [{'rfid': 'B', 'name': 'PB', 'team': 'team1'},
+                                              {'rfid': 'C', 'name': 'PC', 'team': 'team1'}], 'remove': []}
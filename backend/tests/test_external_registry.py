@@ -0,0 +1,55 @@
+import threading
+
+import pytest
+
+from external_registry import BlockIdAllocator, DuplicateContact, ExternalRegistry
+from game_state import GameState
+
+
+@pytest.fixture
+def registry(tmp_path):
+    state = GameState(str(tmp_path / 'stats.bin'), str(tmp_path / 'events.log'))
+    yield ExternalRegistry(state, BlockIdAllocator(str(tmp_path / 'counter.json'), block_size=10))
+    state.stop()
+
+
+def test_registered_contact_cannot_sign_up_twice(registry):
+    registry.register('a', 'A@b.co', '98765 43210', 1)
+    with pytest.raises(DuplicateContact):
+        registry.register('b', 'a@b.co', '0000000000', 2)
+    with pytest.raises(DuplicateContact):
+        registry.register('c', 'c@b.co', '9876543210', 2)
+
+
+def test_concurrent_duplicate_signups_admit_one(registry):
+    outcomes = []
+
+    def sign_up(i):
+        try:
+            outcomes.append(registry.register(f'p{i}', 'same@b.co', f'{9000000000 + i}', 1))
+        except DuplicateContact:
+            outcomes.append(None)
+
+    threads = [threading.Thread(target=sign_up, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len([o for o in outcomes if o is not None]) == 1
+    assert len(registry.candidates()) == 1
+
+
+def test_register_event_from_elsewhere_claims_the_contact(registry):
+    # What a standby applies from the primary's stream, bypassing register()
+    registry.state.submit({'op': 'register', 'id': 'EXT0001', 'name': 'a', 'teamId': 1,
+                           'external': True, 'email': 'a@b.co', 'mobile': '9876543210'})
+    with pytest.raises(DuplicateContact):
+        registry.register('b', 'a@b.co', '1234567890', 1)
+    with pytest.raises(DuplicateContact):
+        registry.register('b', 'b@b.co', '9876543210', 1)
+
+
+def test_removal_frees_the_contact(registry):
+    player_id = registry.register('a', 'a@b.co', '9876543210', 1)
+    registry.state.submit({'op': 'remove', 'id': player_id})
+    assert registry.register('b', 'a@b.co', '9876543210', 1) != player_id
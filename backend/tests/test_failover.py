@@ -0,0 +1,133 @@
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from replication import ACK_TIMEOUT, PROMOTE_AFTER
+from test_serve_concurrency import BACKEND_DIR, free_port
+
+KEYS = 2000
+WORKERS = 32
+
+
+def start(tmp_path, name, *args):
+    workdir = tmp_path / name
+    workdir.mkdir()
+    env = dict(os.environ, BLAZE_LOG_LEVEL='WARNING')
+    return subprocess.Popen([sys.executable, os.path.join(BACKEND_DIR, 'serve.py'), '--host', '127.0.0.1', *args],
+                            cwd=workdir, env=env)
+
+
+def wait_for(check, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if check():
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError('condition not met in time')
+
+
+def kill_with_key(url, key):
+    return requests.post(f'{url}/api/kill', json={'rfid': 'A'}, headers={'Idempotency-Key': key}, timeout=5)
+
+
+def start_pair(tmp_path):
+    """(url, primary, standby) with a ready standby and player A registered"""
+    port, replication_port = free_port(), free_port()
+    url = f'http://127.0.0.1:{port}'
+    primary = start(tmp_path, 'primary', '--port', str(port), '--replication-listen', f'127.0.0.1:{replication_port}')
+    wait_for(lambda: requests.get(f'{url}/api/replication', timeout=1).ok)
+    requests.post(f'{url}/api/register', json={'rfid': 'A', 'name': 'A', 'team': 'team1'}, timeout=5).raise_for_status()
+    # Answered before the standby attached: its response must come over in the full sync
+    assert kill_with_key(url, 'early').status_code == 200
+
+    standby = start(tmp_path, 'standby', '--port', str(port), '--standby-of', f'127.0.0.1:{replication_port}')
+    wait_for(lambda: requests.get(f'{url}/api/replication', timeout=1).json().get('ready'))
+    return url, primary, standby
+
+
+def start_load(url, answered):
+    """WORKERS threads sending every key once; answered collects the ones that got a 200"""
+    def load(first):
+        for i in range(first, KEYS, WORKERS):
+            try:
+                if kill_with_key(url, f'kill-{i}').status_code == 200:
+                    answered.add(i)
+            except requests.RequestException:
+                pass
+
+    workers = [threading.Thread(target=load, args=(w,)) for w in range(WORKERS)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def check_taken_over(url, standby, answered):
+    """The standby serves now, has every answered kill once, and applies the rest exactly once"""
+    wait_for(lambda: requests.get(f'{url}/api/replication', timeout=1).json() == {'enabled': False})
+    assert standby.poll() is None
+
+    # Every key again, as clients whose request may or may not have landed would
+    replayed = set()
+    for i in range(KEYS):
+        response = kill_with_key(url, f'kill-{i}')
+        assert response.status_code == 200
+        if response.headers.get('Idempotent-Replayed') == 'true':
+            replayed.add(i)
+    assert answered <= replayed
+    assert kill_with_key(url, 'early').headers.get('Idempotent-Replayed') == 'true'
+
+    board = requests.get(f'{url}/api/players', timeout=5).json()
+    assert board['team1'][0]['kills'] == KEYS + 1
+
+
+def stop(*procs):
+    for proc in procs:
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+def test_retry_after_failover_is_not_applied_twice(tmp_path):
+    primary = standby = None
+    try:
+        url, primary, standby = start_pair(tmp_path)
+        answered = set()
+        workers = start_load(url, answered)
+        wait_for(lambda: len(answered) >= 200)
+        primary.send_signal(signal.SIGKILL)
+        primary.wait()
+        for worker in workers:
+            worker.join()
+        check_taken_over(url, standby, answered)
+    finally:
+        stop(primary, standby)
+
+
+def test_stalled_primary_acknowledges_nothing_the_standby_lacks(tmp_path):
+    primary = standby = None
+    try:
+        url, primary, standby = start_pair(tmp_path)
+        answered = set()
+        workers = start_load(url, answered)
+        wait_for(lambda: len(answered) >= 200)
+        # Long enough for the standby to give up on the primary and for the primary to drop it
+        primary.send_signal(signal.SIGSTOP)
+        time.sleep(PROMOTE_AFTER + ACK_TIMEOUT)
+        primary.send_signal(signal.SIGCONT)
+        # The primary is back and busy; it must not answer anything the standby could lack
+        time.sleep(1.0)
+        primary.send_signal(signal.SIGKILL)
+        primary.wait()
+        for worker in workers:
+            worker.join()
+        check_taken_over(url, standby, answered)
+    finally:
+        stop(primary, standby)
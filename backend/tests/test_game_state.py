@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+
+import pytest
+
+import event_log
+from game_state import GameState
+
+
+def make_state(tmp_path):
+    return GameState(str(tmp_path / 'stats.bin'), str(tmp_path / 'events.log'))
+
+
+def register(rfid):
+    return {'op': 'register', 'id': rfid, 'name': rfid, 'teamId': 1}
+
+
+def patch_log_fsync(monkeypatch, state, fn):
+    """Route fsyncs of the state's event log through fn; everything else fsyncs normally"""
+    log_fd = state.log._file.fileno()
+    monkeypatch.setattr(event_log, '_fsync', lambda fd: fn(fd) if fd == log_fd else os.fsync(fd))
+
+
+def test_event_is_published_only_once_durable(tmp_path, monkeypatch):
+    state = make_state(tmp_path)
+    seen = []
+    state.add_listener(lambda event, result: seen.append(event['id']))
+    disk = threading.Event()
+    patch_log_fsync(monkeypatch, state, lambda fd: disk.wait())
+    try:
+        submitter = threading.Thread(target=state.submit, args=(register('A'),))
+        submitter.start()
+        deadline = time.monotonic() + 5
+        while state.find_player('A') is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert state.find_player('A') is not None
+        assert (state.version, seen) == (0, [])
+        disk.set()
+        submitter.join(5)
+        assert (state.version, seen) == (1, ['A'])
+    finally:
+        disk.set()
+        state.stop()
+
+
+def test_failed_commit_stops_the_state(tmp_path, monkeypatch):
+    state = make_state(tmp_path)
+    seen = []
+    failures = []
+    state.add_listener(lambda event, result: seen.append(event['id']))
+    state.on_commit_failure = failures.append
+    state.submit(register('A'))
+
+    def broken(fd):
+        raise OSError(5, 'Input/output error')
+    patch_log_fsync(monkeypatch, state, broken)
+    try:
+        with pytest.raises(IOError):
+            state.submit(register('B'))
+        assert len(failures) == 1
+        assert (state.version, seen) == (1, ['A'])
+        with pytest.raises(IOError):
+            state.submit(register('C'))
+        assert state.find_player('C') is None
+        # No snapshot of a state the log cannot rebuild
+        assert not state.flush()
+    finally:
+        state.stop()
+    assert not os.path.exists(tmp_path / 'stats.bin')
+
+
+def test_rotation_waits_for_the_disk_outside_the_state_lock(tmp_path, monkeypatch):
+    state = make_state(tmp_path)
+    disk = threading.Event()
+    patch_log_fsync(monkeypatch, state, lambda fd: disk.wait())
+    try:
+        submitter = threading.Thread(target=state.submit, args=(register('A'),))
+        submitter.start()
+        while state.find_player('A') is None:
+            time.sleep(0.01)
+        state._dirty.set()
+        flusher = threading.Thread(target=state.flush)
+        flusher.start()
+        deadline = time.monotonic() + 5
+        while state.log._rotate_after is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # The log is stuck in fsync, yet the state stays usable
+        assert state.lock.acquire(timeout=1)
+        state.lock.release()
+        disk.set()
+        submitter.join(5)
+        flusher.join(5)
+        state.submit(register('B'))
+    finally:
+        disk.set()
+        state.stop()
+    assert not os.path.exists(tmp_path / 'events.log.1')
+    reloaded = make_state(tmp_path)
+    try:
+        assert [p['id'] for p in reloaded.players()] == ['A', 'B']
+    finally:
+        reloaded.stop()
+
+
+def test_replay_skips_a_torn_last_record(tmp_path):
+    state = make_state(tmp_path)
+    state.submit(register('A'))
+    state.submit({'op': 'kill', 'id': 'A', 'ts': 5})
+    # Crash mid-write: no snapshot, and half a record at the end of the log
+    state.log.close()
+    with open(tmp_path / 'events.log', 'ab') as f:
+        f.write(b'{"op":"kill","id":"A","ts":9,"se')
+
+    recovered = make_state(tmp_path)
+    a = recovered.find_player('A')
+    assert (recovered.version, a['kills'], list(a['killTimestamps'])) == (2, 1, [5])
+    # The next record starts on a fresh line
+    recovered.submit({'op': 'kill', 'id': 'A', 'ts': 7})
+    recovered.log.close()
+    again = make_state(tmp_path)
+    try:
+        assert list(again.find_player('A')['killTimestamps']) == [5, 7]
+    finally:
+        again.stop()
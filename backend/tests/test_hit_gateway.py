@@ -0,0 +1,91 @@
+import asyncio
+
+import requests
+
+import hit_gateway
+from hit_gateway import DedupeWindow, HitGateway, encode_hit
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_dedupe_window_forgets_after_the_window():
+    clock = Clock()
+    window = DedupeWindow(2.0, clock)
+    assert window.check(('seq', 'A', 1))
+    assert not window.check(('seq', 'A', 1))
+    clock.now = 2.5
+    assert window.check(('seq', 'A', 1))
+    assert len(window) == 1
+
+
+def failing_post(failures):
+    """A _post that raises each of failures in turn, then succeeds; records every call"""
+    calls = []
+
+    def post(events, seq):
+        calls.append((len(events), seq))
+        if len(calls) <= len(failures):
+            raise failures[len(calls) - 1]
+        return {'failed': 0}
+    return post, calls
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status}", response=response)
+
+
+def forward(gateway, records):
+    async def run():
+        for record in records:
+            gateway.ingest(record)
+        gateway.queue.put_nowait(None)
+        await gateway.forward()
+    asyncio.run(run())
+
+
+def test_failed_batch_is_retried_with_its_sequence(monkeypatch):
+    monkeypatch.setattr(hit_gateway, 'RETRY_DELAY', 0.001)
+    gateway = HitGateway()
+    gateway._post, calls = failing_post([requests.ConnectionError('down'), http_error(503)])
+    hit = encode_hit('A', 'X', 1000, 7)
+    forward(gateway, [hit, hit, encode_hit('B', 'Y', 1001, 3)])
+
+    assert calls == [(2, 1), (2, 1), (2, 1)]
+    assert gateway.stats['forwarded'] == 2 and gateway.stats['failed'] == 0
+    assert gateway.stats['duplicates'] == 1
+
+
+def test_rejected_batch_is_not_retried():
+    gateway = HitGateway()
+    gateway._post, calls = failing_post([http_error(400)])
+    forward(gateway, [encode_hit('A', 'X', 1000, 7)])
+    assert len(calls) == 1 and gateway.stats['failed'] == 1
+
+
+def test_stopping_gateway_gives_up_after_one_try():
+    gateway = HitGateway()
+    gateway.stopping = True
+    gateway._post, calls = failing_post([requests.ConnectionError('down')])
+    forward(gateway, [encode_hit('A', 'X', 1000, 7)])
+    assert len(calls) == 1 and gateway.stats['failed'] == 1
+
+
+def test_hit_the_server_already_had_counts_as_duplicate():
+    gateway = HitGateway()
+    sent = []
+
+    def post(events, seq):
+        sent.extend(events)
+        return {'failed': 1, 'results': [{'success': False, 'duplicate': True}]}
+    gateway._post = post
+    forward(gateway, [encode_hit('A', 'X', 1000, 7)])
+    assert sent[0]['hitId'] == 'A:7'
+    assert gateway.stats['duplicates'] == 1 and gateway.stats['rejected'] == 0
@@ -0,0 +1,42 @@
+from idempotency import ReplayCache
+
+
+def kills(client, arena):
+    return client.get(f'{arena}/players').get_json()['team1'][0]['kills']
+
+
+def test_retried_request_gets_the_first_response(client, arena):
+    client.post(f'{arena}/register', json={'rfid': 'A', 'name': 'A', 'team': 'team1'})
+    headers = {'Idempotency-Key': 'kill-1'}
+    first = client.post(f'{arena}/kill', json={'rfid': 'A'}, headers=headers)
+    retry = client.post(f'{arena}/kill', json={'rfid': 'A'}, headers=headers)
+    assert (retry.status_code, retry.get_data()) == (first.status_code, first.get_data())
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert 'Idempotent-Replayed' not in first.headers
+    assert kills(client, arena) == 1
+
+    sequenced = {'X-Source': 'gw', 'X-Sequence': '7'}
+    for _ in range(2):
+        client.post(f'{arena}/kill', json={'rfid': 'A'}, headers=sequenced)
+    client.post(f'{arena}/kill', json={'rfid': 'A'})
+    assert kills(client, arena) == 3
+
+
+def test_malformed_key_is_400(client, arena):
+    assert client.post(f'{arena}/kill', json={'rfid': 'A'}, headers={'X-Source': 'gw'}).status_code == 400
+    assert client.post(f'{arena}/kill', json={'rfid': 'A'}, headers={'Idempotency-Key': 'k' * 200}).status_code == 400
+
+
+def test_cache_is_bounded_and_expires():
+    now = [0]
+    cache = ReplayCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    for key in ('a', 'b'):
+        assert cache.begin(key) is None
+        cache.finish(key, key.upper())
+    assert cache.begin('a') == 'A'  # a is now the most recently used
+    assert cache.begin('c') is None
+    cache.finish('c', 'C')
+    assert [key for key, _ in cache.completed()] == ['a', 'c']
+    now[0] = 11
+    assert cache.begin('a') is None
+    assert len(cache) == 1
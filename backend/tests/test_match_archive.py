@@ -0,0 +1,51 @@
+import pytest
+
+from match_archive import MatchArchive
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = MatchArchive(str(tmp_path / 'matches.db'))
+    yield archive
+    archive.close()
+
+
+def player(rfid, team, kills, deaths, kill_ts=()):
+    return {'id': rfid, 'name': rfid, 'teamId': team, 'kills': kills, 'deaths': deaths,
+            'killTimestamps': list(kill_ts), 'deathTimestamps': []}
+
+
+def victory(winner, team1, team2, mvp):
+    return {'winningTeam': winner, 'team1Score': team1, 'team2Score': team2, 'mvp': {'rfid': mvp}}
+
+
+def test_careers_add_up_across_matches(archive):
+    first = archive.archive('main', [player('A', 1, 5, 1, (1000, 1000, 2500)), player('X', 2, 1, 5)],
+                            victory('team1', 5, 1, 'A'))
+    second = archive.archive('side', [player('A', 2, 2, 3), player('X', 1, 3, 2)], victory('team1', 3, 2, 'X'))
+
+    assert archive.career('A') == {'rfid': 'A', 'name': 'A', 'matches': 2, 'kills': 7, 'deaths': 4,
+                                   'wins': 1, 'lastMatchId': second}
+    assert archive.career('X')['wins'] == 1
+    assert archive.career('nobody') is None
+    assert [c['rfid'] for c in archive.top_careers(10)] == ['A', 'X']
+    assert [c['rfid'] for c in archive.top_careers(1, offset=1)] == ['X']
+
+    history = archive.player_history('A', 10)
+    assert [(h['matchId'], h['arena'], h['team'], h['won']) for h in history] == [
+        (second, 'side', 'team2', False), (first, 'main', 'team1', True)
+    ]
+    assert [m['id'] for m in archive.matches('main', 10)] == [first]
+
+
+def test_match_leaderboard_pages_and_timelines(archive):
+    match_id = archive.archive('main', [player('B', 1, 2, 2), player('A', 1, 5, 1, (1000, 2500)),
+                                        player('C', 2, 2, 1)], victory('team1', 7, 2, 'A'))
+    summary, page = archive.match(match_id, 2)
+    assert summary['victoryData']['mvp'] == {'rfid': 'A'} and summary['mvp'] == 'A'
+    assert [p['rfid'] for p in page] == ['A', 'C']
+    _, rest = archive.match(match_id, 2, offset=2, timelines=True)
+    assert [p['rfid'] for p in rest] == ['B']
+    _, top = archive.match(match_id, 1, timelines=True)
+    assert list(top[0]['killTimestamps']) == [1000, 2500]
+    assert archive.match(match_id + 1, 10) is None
@@ -0,0 +1,33 @@
+from arenas import Arena
+from match_report import ReportWorker
+
+
+class BrokenArchive:
+    def archive(self, *args, **kwargs):
+        raise OSError('disk full')
+
+
+def test_failed_report_is_published(tmp_path):
+    arena = Arena('a', str(tmp_path / 'stats.bin'), str(tmp_path / 'events.log'))
+    victory = {'winningTeam': 'tie', 'team1Score': 0, 'team2Score': 0, 'mvp': {'name': 'N/A', 'kills': 0}}
+    with arena.state.lock:
+        arena.update_match(ended=True, victory_data=victory, report=None, report_error=None)
+    worker = ReportWorker(BrokenArchive())
+    try:
+        worker.submit(arena, [], victory)
+        worker.join()
+        assert arena.match_state['report'] is None
+        assert arena.match_state['report_error'] == 'disk full'
+    finally:
+        arena.state.stop()
+
+
+def test_failure_of_a_superseded_job_is_ignored(tmp_path):
+    arena = Arena('a', str(tmp_path / 'stats.bin'), str(tmp_path / 'events.log'))
+    worker = ReportWorker(BrokenArchive())
+    try:
+        worker.submit(arena, [], {'winningTeam': 'tie'})
+        worker.join()
+        assert arena.match_state['report_error'] is None
+    finally:
+        arena.state.stop()
@@ -0,0 +1,29 @@
+from metrics import Registry
+
+
+def test_histogram_renders_cumulative_buckets_and_quantiles():
+    registry = Registry()
+    latency = registry.histogram('t_seconds', 'Latency', ['endpoint'], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 2.0):
+        latency.observe(value, endpoint='a"b')
+    lines = registry.render().splitlines()
+    assert lines[:2] == ['# HELP t_seconds Latency', '# TYPE t_seconds histogram']
+    assert lines[2:7] == [
+        't_seconds_bucket{endpoint="a\\"b",le="0.1"} 1',
+        't_seconds_bucket{endpoint="a\\"b",le="1.0"} 3',
+        't_seconds_bucket{endpoint="a\\"b",le="+Inf"} 4',
+        't_seconds_sum{endpoint="a\\"b"} 3.05',
+        't_seconds_count{endpoint="a\\"b"} 4',
+    ]
+    assert 't_seconds_quantile{endpoint="a\\"b",quantile="0.5"} 0.55' in lines
+
+
+def test_metrics_endpoint_counts_requests(client, arena):
+    client.get(f'{arena}/players')
+    response = client.get('/metrics')
+    assert response.mimetype == 'text/plain'
+    assert 'version=0.0.4' in response.headers['Content-Type']
+    text = response.get_data(as_text=True)
+    assert '# TYPE blaze_http_requests_total counter' in text
+    assert 'blaze_http_requests_total{endpoint="get_players",status="200"}' in text
+    assert 'blaze_http_request_duration_seconds_count{endpoint="get_players",method="GET"}' in text
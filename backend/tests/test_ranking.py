@@ -0,0 +1,34 @@
+from ranking import RankingIndex
+
+
+def player(pid, team, kills=0, deaths=0):
+    return {'id': pid, 'teamId': team, 'kills': kills, 'deaths': deaths}
+
+
+def test_order_follows_updates_and_removals():
+    a, b, c = player('A', 1, 3, 1), player('B', 2, 3, 0), player('C', 1, 1, 0)
+    ranking = RankingIndex([a, b, c])
+    assert ranking.top(3) == ['B', 'A', 'C']
+    assert ranking.mvp() == 'B' and ranking.rank('C', 1) == 2
+
+    c['kills'] = 5
+    ranking.update(c)
+    assert ranking.top(3) == ['C', 'B', 'A']
+    assert ranking.team_totals(1) == {'kills': 8, 'deaths': 1}
+
+    ranking.remove('C')
+    assert ranking.top(3) == ['B', 'A'] and ranking.rank('C') is None
+    assert ranking.team_totals(1) == {'kills': 3, 'deaths': 1}
+
+    a['teamId'] = 2
+    ranking.update(a)
+    assert ranking.top(5, 2) == ['B', 'A'] and ranking.size(1) == 0
+    assert ranking.rank('A', 1) is None and ranking.rank('A', 2) == 2
+
+
+def test_player_without_team_is_ranked_once():
+    ranking = RankingIndex([player('A', 1, 2), player('X', None, 1)])
+    assert ranking.top(5) == ['A', 'X']
+    assert ranking.size() == 2
+    ranking.remove('X')
+    assert ranking.top(5) == ['A']
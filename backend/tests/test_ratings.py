@@ -0,0 +1,58 @@
+import pytest
+
+from ratings import DEFAULT_RATING, K_ESTABLISHED, K_PROVISIONAL, PROVISIONAL_MATCHES, balance, rate_match
+
+
+def player(pid, team, kills=0, deaths=0):
+    return {'id': pid, 'teamId': team, 'kills': kills, 'deaths': deaths}
+
+
+def test_result_and_own_game_both_count():
+    roster = [player('A', 1, 5, 5), player('B', 1, 0, 4), player('X', 2, 8, 0), player('Y', 2, 1, 6)]
+    ratings = rate_match(roster, 'team1', {})
+    # Even teams, so expected is 0.5 and the change is K * (score - 0.5)
+    assert ratings['A'] == (DEFAULT_RATING + K_PROVISIONAL * 0.35, 1)
+    assert ratings['B'] == (DEFAULT_RATING + K_PROVISIONAL * 0.2, 1)
+    assert ratings['X'][0] > ratings['Y'][0]
+    assert ratings['Y'][0] < DEFAULT_RATING
+
+
+def test_established_players_move_slower_and_ties_are_half():
+    roster = [player('A', 1), player('X', 2)]
+    ratings = rate_match(roster, 'tie', {'A': (1500.0, PROVISIONAL_MATCHES), 'X': (1500.0, 0)})
+    assert ratings == {'A': (1500.0, PROVISIONAL_MATCHES + 1), 'X': (1500.0, 1)}
+    ratings = rate_match(roster, 'team1', {'A': (1500.0, PROVISIONAL_MATCHES)})
+    assert ratings['A'][0] == 1500.0 + K_ESTABLISHED * 0.35
+
+
+def test_one_sided_match_is_not_rated():
+    assert rate_match([player('A', 1), player('B', 1)], 'team1', {}) == {}
+
+
+def test_balance_finds_the_even_split():
+    sides = balance({'A': 2000.0, 'B': 1900.0, 'C': 1100.0, 'D': 1000.0})
+    assert sorted(map(sorted, sides)) == [['A', 'D'], ['B', 'C']]
+
+
+@pytest.mark.parametrize('count', [2, 3, 7, 40])
+def test_balance_places_everyone_on_near_equal_teams(count):
+    ratings = {f"P{i}": 1000.0 + (i * 397) % 1200 for i in range(count)}
+    team1, team2 = balance(ratings)
+    assert sorted(team1 + team2) == sorted(ratings)
+    assert abs(len(team1) - len(team2)) <= 1
+    if count > 3:
+        gap = abs(sum(ratings[p] for p in team1) / len(team1) - sum(ratings[p] for p in team2) / len(team2))
+        assert gap < 50
+
+
+def test_balance_endpoint_splits_and_applies(client, arena):
+    pool = ['BAL1', 'BAL2', 'BAL3', 'BAL4']  # never rated by other tests, so all at DEFAULT_RATING
+    for rfid in pool:
+        client.post(f'{arena}/register', json={'rfid': rfid, 'name': rfid, 'team': 'team1'})
+    body = client.post(f'{arena}/balance', json={'rfids': pool, 'apply': True}).get_json()
+    assert (len(body['team1']['players']), len(body['team2']['players'])) == (2, 2)
+    assert body['diff'] == 0
+    assert body['applied'] == 2
+    board = client.get(f'{arena}/players').get_json()
+    assert len(board['team1']) == 2 and len(board['team2']) == 2
+    assert client.post(f'{arena}/balance', json={'rfids': pool[:1]}).status_code == 400
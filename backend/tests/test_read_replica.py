@@ -0,0 +1,42 @@
+import json
+from collections import OrderedDict
+
+import pytest
+
+import read_replica
+from shared_snapshot import SnapshotWriter, snapshot_path
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    monkeypatch.setitem(read_replica.app.config, 'SNAPSHOT_DIR', str(tmp_path))
+    monkeypatch.setattr(read_replica, 'readers', OrderedDict())
+    return read_replica.app.test_client()
+
+
+def publish(directory, arena_id, version=1):
+    writer = SnapshotWriter(snapshot_path(str(directory), arena_id), capacity=4096)
+    writer.publish(version, {'players': json.dumps({'arena': arena_id}).encode(), 'registry': b'[]',
+                             'match_status': b'{}'})
+    return writer
+
+
+def test_unknown_arena_is_404_and_not_cached(replica):
+    response = replica.get('/api/arenas/nope/players')
+    assert response.status_code == 404
+    assert read_replica.readers == {}
+
+
+def test_reader_cache_is_bounded(replica, tmp_path, monkeypatch):
+    monkeypatch.setattr(read_replica, 'MAX_READERS', 2)
+    writers = [publish(tmp_path, arena_id) for arena_id in ('a', 'b', 'c')]
+    try:
+        for arena_id in ('a', 'b', 'a', 'c'):
+            response = replica.get(f"/api/arenas/{arena_id}/players")
+            assert response.json == {'arena': arena_id}
+        assert list(read_replica.readers) == ['a', 'c']
+    finally:
+        for reader in read_replica.readers.values():
+            reader.close()
+        for writer in writers:
+            writer.close()
@@ -0,0 +1,62 @@
+import csv
+import io
+
+from game_state import GameState
+from roster_index import RosterIndex, filter_keys
+
+
+def register(state, rfid, team=1, college=''):
+    state.submit({'op': 'register', 'id': rfid, 'name': rfid, 'teamId': team, 'college': college})
+
+
+def ids(players):
+    return [p['id'] for p in players]
+
+
+def test_pages_stay_stable_while_the_roster_changes(tmp_path):
+    state = GameState(str(tmp_path / 'stats.bin'), str(tmp_path / 'events.log'))
+    try:
+        for rfid in ('R02', 'R04', 'R06', 'R08', 'R10'):
+            register(state, rfid)
+        roster = RosterIndex(state)
+        everyone = filter_keys()
+        first, cursor = roster.page(everyone, None, 2)
+        assert (ids(first), cursor) == (['R02', 'R04'], 'R04')
+
+        register(state, 'R01')  # behind the cursor: not seen on this walk
+        register(state, 'R05')  # ahead of it: seen
+        state.submit({'op': 'remove', 'id': 'R04'})  # the cursor itself may go
+        state.submit({'op': 'remove', 'id': 'R06'})
+        second, cursor = roster.page(everyone, cursor, 2)
+        third, cursor = roster.page(everyone, cursor, 2)
+        assert (ids(second), ids(third), cursor) == (['R05', 'R08'], ['R10'], None)
+    finally:
+        state.stop()
+
+
+def test_filters_intersect_and_follow_team_changes(tmp_path):
+    state = GameState(str(tmp_path / 'stats.bin'), str(tmp_path / 'events.log'))
+    try:
+        roster = RosterIndex(state)
+        register(state, 'A', 1, 'MIT')
+        register(state, 'B', 2, 'mit ')
+        register(state, 'C', 2, 'Other')
+        assert ids(roster.page(filter_keys(team=2, college='MIT'))[0]) == ['B']
+        register(state, 'A', 2, 'MIT')
+        assert ids(roster.page(filter_keys(team=2, college='MIT'))[0]) == ['A', 'B']
+        assert ids(roster.page(filter_keys(team=1))[0]) == []
+    finally:
+        state.stop()
+
+
+def test_registry_pages_and_player_export(client, arena):
+    for rfid, team in (('P1', 'team1'), ('P2', 'team2'), ('P3', 'team1')):
+        client.post(f'{arena}/register', json={'rfid': rfid, 'name': rfid, 'team': team})
+    page = client.get(f'{arena}/registry?limit=2').get_json()
+    assert (list(page['registry']), page['nextCursor']) == (['P1', 'P2'], 'P2')
+    page = client.get(f"{arena}/registry?cursor={page['nextCursor']}&team=team1").get_json()
+    assert (page['registry'], page['nextCursor']) == ({'P3': {'name': 'P3', 'team': 1}}, None)
+
+    rows = list(csv.reader(io.StringIO(client.get(f'{arena}/export/players?team=team1').get_data(as_text=True))))
+    assert [row[0] for row in rows[1:]] == ['P1', 'P3']
+    assert client.get(f'{arena}/export/players?format=xml').status_code == 400
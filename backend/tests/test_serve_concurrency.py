@@ -0,0 +1,48 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import requests
+
+from benchmark import HttpTarget, generate_match, run_benchmark
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url, proc, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        assert proc.poll() is None, 'serve.py exited early'
+        try:
+            requests.get(f'{url}/api/players', timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    raise TimeoutError(f'{url} did not come up')
+
+
+def test_concurrent_kills_and_deaths_are_not_lost(tmp_path):
+    port = free_port()
+    url = f'http://127.0.0.1:{port}'
+    env = dict(os.environ, BLAZE_LOG_LEVEL='WARNING')
+    proc = subprocess.Popen([sys.executable, os.path.join(BACKEND_DIR, 'serve.py'), '--host', '127.0.0.1',
+                             '--port', str(port)], cwd=tmp_path, env=env)
+    try:
+        wait_until_up(url, proc)
+        roster, timeline = generate_match(players=16, events=4000, seed=7)
+        result = run_benchmark(HttpTarget(url), roster, timeline, concurrency=32)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    assert result['errors'] == 0
+    assert result['lostUpdates'] == 0
+    assert result['extraUpdates'] == 0
@@ -0,0 +1,28 @@
+def register(client, arena, *players):
+    for rfid, team in players:
+        client.post(f'{arena}/register', json={'rfid': rfid, 'name': rfid, 'team': team})
+
+
+def test_batch_reports_each_event_and_applies_the_valid_ones(client, arena):
+    register(client, arena, ('A', 'team1'), ('X', 'team2'))
+    response = client.post(f'{arena}/events', json={'events': [
+        {'type': 'hit', 'shooter': 'A', 'victim': 'X', 'timestamp': 1000},
+        {'type': 'kill', 'rfid': 'NOPE'},
+        {'type': 'jump', 'rfid': 'A'},
+        {'type': 'death', 'rfid': 'A', 'timestamp': -1},
+        {'type': 'death', 'rfid': 'A', 'timestamp': 2000},
+    ]})
+    body = response.get_json()
+    assert response.status_code == 200
+    assert (body['applied'], body['failed']) == (2, 3)
+    assert [r['success'] for r in body['results']] == [True, False, False, False, True]
+    assert body['results'][1] == {'success': False, 'error': 'Player not registered', 'rfid': 'NOPE'}
+    assert body['results'][2]['error'] == 'Unknown event type: jump'
+    assert body['results'][3]['error'] == 'Invalid timestamp'
+
+    board = client.get(f'{arena}/players').get_json()
+    assert [(p['kills'], p['deaths']) for p in board['team1'] + board['team2']] == [(1, 1), (0, 1)]
+
+
+def test_batch_must_be_a_list(client, arena):
+    assert client.post(f'{arena}/events', json={'events': {'type': 'kill'}}).status_code == 400
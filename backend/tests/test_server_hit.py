@@ -0,0 +1,37 @@
+def register(client, arena, *players):
+    for rfid, team in players:
+        client.post(f'{arena}/register', json={'rfid': rfid, 'name': rfid, 'team': team})
+
+
+def hit(client, arena, shooter, victim, **extra):
+    return client.post(f'{arena}/hit', json=dict(extra, shooter=shooter, victim=victim))
+
+
+def test_hits_build_pair_stats(client, arena):
+    register(client, arena, ('A', 'team1'), ('B', 'team1'), ('X', 'team2'))
+    for shooter, victim in [('A', 'X'), ('A', 'X'), ('B', 'X'), ('X', 'A')]:
+        assert hit(client, arena, shooter, victim).status_code == 200
+
+    rivals = client.get(f'{arena}/rivals/X').get_json()
+    assert rivals['nemesis'] == {'rfid': 'A', 'name': 'A', 'kills': 2}
+    assert rivals['killedBy'][1] == {'rfid': 'B', 'name': 'B', 'kills': 1}
+    assert rivals['mostKilled'] == {'rfid': 'A', 'name': 'A', 'kills': 1}
+    assert client.get(f'{arena}/rivals/B').get_json()['nemesis'] is None
+    assert client.get(f'{arena}/rivals/NOPE').status_code == 404
+
+
+def test_hit_is_all_or_nothing(client, arena):
+    register(client, arena, ('A', 'team1'))
+    response = hit(client, arena, 'A', 'NOPE')
+    assert (response.status_code, response.get_json()['rfid']) == (404, 'NOPE')
+    assert hit(client, arena, 'A', 'A').status_code == 400
+    a = client.get(f'{arena}/players').get_json()['team1'][0]
+    assert (a['kills'], a['deaths']) == (0, 0)
+
+
+def test_replayed_hit_id_is_409(client, arena):
+    register(client, arena, ('A', 'team1'), ('X', 'team2'))
+    assert hit(client, arena, 'A', 'X', hitId='A:1').status_code == 200
+    response = hit(client, arena, 'A', 'X', hitId='A:1')
+    assert (response.status_code, response.get_json()['duplicate']) == (409, True)
+    assert client.get(f'{arena}/rivals/A').get_json()['mostKilled']['kills'] == 1
@@ -0,0 +1,46 @@
+import threading
+import time
+
+
+def register(client, arena, rfid, team='team1'):
+    assert client.post(f'{arena}/register', json={'rfid': rfid, 'name': rfid, 'team': team}).status_code == 200
+
+
+def test_unchanged_leaderboard_is_304(client, arena):
+    register(client, arena, 'A')
+    first = client.get(f'{arena}/players')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and first.headers['X-State-Version']
+
+    again = client.get(f'{arena}/players', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.headers['ETag'] == etag
+
+    register(client, arena, 'B')
+    changed = client.get(f'{arena}/players', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    assert [p['rfid'] for p in changed.get_json()['team1']] == ['A', 'B']
+
+
+def test_long_poll_returns_when_the_version_moves(server, client, arena):
+    register(client, arena, 'A')
+    version = int(client.get(f'{arena}/players').headers['X-State-Version'])
+
+    started = time.monotonic()
+    timed_out = client.get(f'{arena}/players?since={version}&timeout=0.2')
+    assert time.monotonic() - started >= 0.2
+    assert int(timed_out.headers['X-State-Version']) == version
+
+    polled = {}
+
+    def poll():
+        polled['response'] = server.app.test_client().get(f'{arena}/players?since={version}&timeout=10')
+    poller = threading.Thread(target=poll)
+    poller.start()
+    time.sleep(0.1)
+    started = time.monotonic()
+    register(client, arena, 'B')
+    poller.join(5)
+    assert time.monotonic() - started < 5
+    response = polled['response']
+    assert int(response.headers['X-State-Version']) == version + 1
+    assert [p['rfid'] for p in response.get_json()['team1']] == ['A', 'B']
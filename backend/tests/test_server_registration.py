@@ -0,0 +1,17 @@
+def test_register_bulk_registers_and_removes(client, arena):
+    response = client.post(f'{arena}/register_bulk', json={'players': [
+        {'rfid': 'A', 'name': 'A', 'team': 'team1'}, {'rfid': 'B', 'name': 'B', 'team': 'team2'}
+    ]})
+    assert response.get_json() == {'success': True, 'registered': 2, 'removed': 0}
+    response = client.post(f'{arena}/register_bulk', json={'remove': ['A', 'NOPE']})
+    assert response.get_json() == {'success': True, 'registered': 0, 'removed': 1}
+    board = client.get(f'{arena}/players').get_json()
+    assert [p['rfid'] for p in board['team1'] + board['team2']] == ['B']
+
+
+def test_register_bulk_rejects_malformed_remove(client, arena):
+    for remove in (5, 'A', [1], [None], ['']):
+        response = client.post(f'{arena}/register_bulk', json={'remove': remove})
+        assert response.status_code == 400, remove
+    assert client.post(f'{arena}/register_bulk', json={'players': {'rfid': 'A'}}).status_code == 400
+    assert client.post(f'{arena}/register_bulk', json=[1]).status_code == 400
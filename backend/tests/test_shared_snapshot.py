@@ -0,0 +1,54 @@
+import pytest
+
+import shared_snapshot
+from shared_snapshot import SEQ, SEQ_OFFSET, SnapshotReader, SnapshotWriter, TornRead
+
+
+def sections(players):
+    return {'players': players, 'registry': b'[]', 'match_status': b'{"ended": false}'}
+
+
+@pytest.fixture
+def writer(tmp_path):
+    writer = SnapshotWriter(str(tmp_path / 'blaze-a.snapshot'), capacity=64)
+    yield writer
+    writer.close()
+
+
+def start_publish(writer):
+    """Leave the seqlock odd, as a writer stopped mid-publish would"""
+    writer._seq += 1
+    SEQ.pack_into(writer._mm, SEQ_OFFSET, writer._seq)
+
+
+def test_reader_waits_out_a_publish_in_progress(writer, monkeypatch):
+    writer.publish(1, sections(b'[1]'))
+    reader = SnapshotReader(writer.path)
+    start_publish(writer)
+
+    def sleep(seconds):
+        # The writer finishes while the reader backs off
+        writer.publish(2, sections(b'[1,2]'))
+    monkeypatch.setattr(shared_snapshot.time, 'sleep', sleep)
+    assert reader.read('players') == (2, b'[1,2]')
+    reader.close()
+
+
+def test_reader_gives_up_on_a_stuck_writer(writer):
+    writer.publish(1, sections(b'[1]'))
+    start_publish(writer)
+    reader = SnapshotReader(writer.path, max_attempts=50)
+    with pytest.raises(TornRead):
+        reader.read('players')
+    reader.close()
+
+
+def test_reader_follows_the_file_when_it_grows(writer):
+    writer.publish(1, sections(b'[1]'))
+    reader = SnapshotReader(writer.path)
+    assert reader.read('players') == (1, b'[1]')
+    big = b'[' + b'1,' * 100 + b'1]'
+    writer.publish(2, sections(big))
+    assert reader.read('players') == (2, big)
+    assert reader.read('match_status') == (2, b'{"ended": false}')
+    reader.close()
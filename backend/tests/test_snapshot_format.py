@@ -0,0 +1,54 @@
+import json
+import os
+import struct
+from array import array
+
+import pytest
+
+from game_state import GameState
+from snapshot_format import SCHEMA_VERSION, decode_snapshot, encode_snapshot, read_legacy_json
+
+
+def test_round_trip_keeps_timelines_and_fields():
+    snapshot = {'players': [
+        {'id': 'A', 'name': 'Ájay', 'teamId': 1, 'kills': 2, 'deaths': 1,
+         'killTimestamps': array('q', [5, 2 ** 40]), 'deathTimestamps': array('q', [7])},
+        {'id': 'B', 'name': 'B', 'teamId': 2, 'kills': 0, 'deaths': 0,
+         'killTimestamps': array('q'), 'deathTimestamps': array('q')},
+    ], 'gameIsActive': True, 'team1Score': 2, 'team2Score': 0}
+    assert decode_snapshot(encode_snapshot(snapshot)) == snapshot
+
+
+def test_newer_schema_is_refused():
+    payload = bytearray(encode_snapshot({'players': []}))
+    struct.pack_into('<H', payload, 4, SCHEMA_VERSION + 1)
+    with pytest.raises(ValueError, match='newer'):
+        decode_snapshot(bytes(payload))
+
+
+def test_legacy_timelines_are_sorted_and_deduplicated(tmp_path):
+    path = tmp_path / 'game_stats.json'
+    path.write_text(json.dumps({'players': [
+        {'id': 'A', 'teamId': 1, 'kills': 3, 'deaths': 0, 'killTimestamps': [9, 3, 9.0]}
+    ], 'gameIsActive': False, 'team1Score': 3, 'team2Score': 0}))
+    player = read_legacy_json(str(path))['players'][0]
+    assert (list(player['killTimestamps']), list(player['deathTimestamps'])) == ([3, 9], [])
+
+
+def test_legacy_json_is_migrated_once(tmp_path):
+    legacy = tmp_path / 'game_stats.json'
+    legacy.write_text(json.dumps({'A': {'team': 2, 'name': 'Ann', 'kills': 4, 'deaths': 1}, 'meta': 1}))
+    stats, events = str(tmp_path / 'game_stats.snap'), str(tmp_path / 'events.log')
+
+    state = GameState(stats, events, legacy_file=str(legacy))
+    state.stop()
+    assert os.path.exists(stats)
+    # Later starts read the snapshot; the legacy file is no longer consulted
+    legacy.write_text('not json')
+    state = GameState(stats, events, legacy_file=str(legacy))
+    try:
+        a = state.find_player('A')
+        assert (a['teamId'], a['name'], a['kills'], a['deaths']) == (2, 'Ann', 4, 1)
+        assert len(state.players()) == 1
+    finally:
+        state.stop()
@@ -1,69 +1,81 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
+import { useNavigate } from 'react-router-dom';
 import { motion, AnimatePresence } from 'framer-motion';
 import { UserPlus } from 'lucide-react';
+import { io } from 'socket.io-client';
 
 const API_URL = 'http://localhost:5000';
-const POLL_INTERVAL = 2000;
+
+// Merge a leaderboard_delta frame into the current board, keeping row order
+const applyDelta = (board, delta) => {
+  const removed = new Set(delta.removed);
+  const updates = new Map(delta.players.map(p => [p.rfid, p]));
+  const next = { team1: [], team2: [], teams: delta.teams };
+
+  ['team1', 'team2'].forEach(team => {
+    board[team].forEach(player => {
+      if (removed.has(player.rfid)) return;
+      const update = updates.get(player.rfid);
+      if (!update) {
+        next[team].push(player);
+        return;
+      }
+      updates.delete(player.rfid);
+      next[update.team]?.push(update);
+    });
+  });
+  updates.forEach(player => next[player.team]?.push(player));
+  return next;
+};
+
+const EMPTY_TOTALS = { kills: 0, deaths: 0 };
 
 const BlazeLeaderboard = () => {
-  const [team1, setTeam1] = useState([]);
-  const [team2, setTeam2] = useState([]);
+  const [board, setBoard] = useState({
+    team1: [],
+    team2: [],
+    teams: { team1: EMPTY_TOTALS, team2: EMPTY_TOTALS }
+  });
   const [bloodSplatter, setBloodSplatter] = useState(false);
   const [bloodDrips, setBloodDrips] = useState([]);
   const [screenShake, setScreenShake] = useState(false);
   const [laserEffect, setLaserEffect] = useState(null);
-  const [lastKillCount, setLastKillCount] = useState(0);
-  const [lastDeathCount, setLastDeathCount] = useState(0);
+  const lastKillCount = useRef(0);
+  const lastDeathCount = useRef(0);
+  const navigate = useNavigate();
+  const { team1, team2, teams } = board;
 
   useEffect(() => {
-    const fetchLeaderboard = async () => {
-      try {
-        const response = await fetch(`${API_URL}/api/players`);
-        if (!response.ok) throw new Error('Failed to fetch');
-        const data = await response.json();
-
-        const allPlayers = [...data.team1, ...data.team2];
-        const totalKills = allPlayers.reduce((sum, p) => sum + p.kills, 0);
-        const totalDeaths = allPlayers.reduce((sum, p) => sum + p.deaths, 0);
-
-        if (totalKills > lastKillCount) {
-          triggerKillEffects();
-          setLastKillCount(totalKills);
-        }
-
-        if (totalDeaths > lastDeathCount) {
-          triggerDeathEffects();
-          setLastDeathCount(totalDeaths);
-        }
-
-        setTeam1(data.team1);
-        setTeam2(data.team2);
-      } catch (error) {
-        console.error('Failed to fetch leaderboard:', error);
-      }
-    };
+    // Server pushes a full snapshot on (re)connect and coalesced deltas after that
+    const socket = io(API_URL);
 
-    fetchLeaderboard();
-    const interval = setInterval(fetchLeaderboard, POLL_INTERVAL);
-    return () => clearInterval(interval);
-  }, [lastKillCount, lastDeathCount]);
+    socket.on('leaderboard_snapshot', data => setBoard(data));
+    socket.on('leaderboard_delta', delta => setBoard(prev => applyDelta(prev, delta)));
+    // Sent on connect and whenever the match starts or ends
+    socket.on('match_status', data => {
+      if (data.ended) navigate('/victory');
+    });
+    socket.on('connect_error', error => console.error('Leaderboard connection error:', error));
+
+    return () => socket.disconnect();
+  }, [navigate]);
 
   useEffect(() => {
-    const checkMatchStatus = async () => {
-      try {
-        const response = await fetch(`${API_URL}/api/match_status`);
-        if (!response.ok) return;
-        const data = await response.json();
-        //if (data.ended) {
-          //window.location.href = `${API_URL}/victory`;
-           //}
-      } catch (error) {
-        console.error('Error checking match status:', error);
-      }
-    };
-    const interval = setInterval(checkMatchStatus, 3000);
-    return () => clearInterval(interval);
-  }, []);
+    // Team totals are maintained by the server; no need to re-sum the roster
+    const totalKills = teams.team1.kills + teams.team2.kills;
+    const totalDeaths = teams.team1.deaths + teams.team2.deaths;
+
+    if (totalKills > lastKillCount.current) {
+      triggerKillEffects();
+    }
+
+    if (totalDeaths > lastDeathCount.current) {
+      triggerDeathEffects();
+    }
+
+    lastKillCount.current = totalKills;
+    lastDeathCount.current = totalDeaths;
+  }, [teams]);
 
   const triggerKillEffects = () => {
     setBloodSplatter(true);
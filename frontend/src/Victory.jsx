@@ -4,6 +4,18 @@ import { ArrowLeft, Skull, Crown, Swords } from 'lucide-react';
 
 const API_URL = 'http://localhost:5000';
 
+// Poll /api/match_report for up to 20s, then fall back to /api/victory_data
+const REPORT_POLL_MS = 250;
+const REPORT_MAX_POLLS = 80;
+
+const AWARD_TITLES = {
+  bestKD: 'BEST K/D',
+  longestStreak: 'LONGEST STREAK',
+  mostDeaths: 'MOST FALLEN',
+  clutch: 'CLUTCH (FINAL MINUTE)',
+  firstBlood: 'FIRST BLOOD'
+};
+
 const Victory = () => {
   const [victoryData, setVictoryData] = useState(null);
   const [winningPlayers, setWinningPlayers] = useState([]);
@@ -14,24 +26,40 @@ const Victory = () => {
     loadVictoryData();
   }, []);
 
+  // Scores and players without the report (no awards), shaped like it
+  const loadBasicVictoryData = async () => {
+    const [victoryResponse, playersResponse] = await Promise.all([
+      fetch(`${API_URL}/api/victory_data`),
+      fetch(`${API_URL}/api/players`)
+    ]);
+    if (!victoryResponse.ok || !playersResponse.ok) throw new Error('No victory data');
+    const victory = await victoryResponse.json();
+    const playersData = await playersResponse.json();
+    const players = ['team1', 'team2'].flatMap(team => playersData[team].map(p => ({ ...p, team })));
+    return { ...victory, players: players.sort((a, b) => b.kills - a.kills) };
+  };
+
+  const loadReport = async () => {
+    // One pre-built report; 202 while the server is still putting it together
+    for (let attempt = 0; attempt < REPORT_MAX_POLLS; attempt++) {
+      const response = await fetch(`${API_URL}/api/match_report`);
+      if (response.ok && response.status !== 202) return response.json();
+      if (response.status !== 202) break;
+      await new Promise(resolve => setTimeout(resolve, REPORT_POLL_MS));
+    }
+    console.warn('Match report unavailable; showing the basic results');
+    return loadBasicVictoryData();
+  };
+
   const loadVictoryData = async () => {
     try {
-      const [victoryResponse, playersResponse] = await Promise.all([
-        fetch(`${API_URL}/api/victory_data`),
-        fetch(`${API_URL}/api/players`)
-      ]);
-      
-      const victory = await victoryResponse.json();
-      const playersData = await playersResponse.json();
+      const report = await loadReport();
       
-      const winners = victory.winningTeam === 'team1' ? playersData.team1 : 
-                      victory.winningTeam === 'team2' ? playersData.team2 : 
-                      [...playersData.team1, ...playersData.team2];
+      const winners = report.winningTeam === 'tie' ? report.players :
+                      report.players.filter(p => p.team === report.winningTeam);
       
-      const sortedWinners = [...winners].sort((a, b) => b.kills - a.kills);
-      
-      setVictoryData(victory);
-      setWinningPlayers(sortedWinners);
+      setVictoryData(report);
+      setWinningPlayers(winners);
       setLoading(false);
 
       setTimeout(() => setShowPlayers(true), 2000);
@@ -41,7 +69,8 @@ const Victory = () => {
         winningTeam: 'unknown',
         team1Score: 0,
         team2Score: 0,
-        mvp: { name: 'N/A', kills: 0 }
+        mvp: { name: 'N/A', kills: 0 },
+        awards: []
       });
       setWinningPlayers([]);
       setLoading(false);
@@ -328,6 +357,27 @@ const Victory = () => {
           </motion.div>
         )}
 
+        {victoryData.awards && victoryData.awards.length > 0 && (
+          <motion.div
+            initial={{ opacity: 0, y: 30 }}
+            animate={{ opacity: 1, y: 0 }}
+            transition={{ delay: 1.8 }}
+            className="grid md:grid-cols-3 gap-4 mt-12"
+          >
+            {victoryData.awards.map(award => (
+              <div key={award.award} className="bg-black/80 border-2 border-red-800 rounded-lg p-4 text-center">
+                <div className="text-yellow-400 text-sm font-bold tracking-widest mb-2">
+                  {AWARD_TITLES[award.award] || award.award}
+                </div>
+                <div className="text-2xl font-black text-white">{award.name}</div>
+                <div className="text-gray-400 text-sm">
+                  {award.award === 'firstBlood' ? `${(award.value / 1000).toFixed(1)}s` : award.value}
+                </div>
+              </div>
+            ))}
+          </motion.div>
+        )}
+
         <motion.div
           initial={{ opacity: 0 }}
           animate={{ opacity: 1 }}